@@ -0,0 +1,384 @@
+import math
+import os
+import zlib
+from collections import namedtuple
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from heatmap import CongestionHeatmap
+from layouts import load_layout
+from model import Airplane, Simulation
+from recording import TraceRecorder
+from stats import RunAggregate
+from vectorized import EnsembleSimulation, VectorSimulation
+
+# Engines pro jednotlivé běhy - rychlý je objektový Simulation, vector je referenční engine
+# pro EnsembleSimulation (jeden běh není rychlejší). Mnoho běhů najednou: run_ensemble, aggregate_ensemble.
+ENGINES = {
+    'object': Simulation,
+    'vector': VectorSimulation,
+}
+
+# Výsledek jednoho běhu (repliky) dané konfigurace
+ReplicaResult = namedtuple('ReplicaResult', ['key', 'replica', 'seed', 'ticks', 'passenger_seated_at', 'wall_time'])
+
+# Odvození seedu úlohy - závisí jen na základním seedu, konfiguraci a čísle repliky,
+# nikoli na počtu workerů nebo pořadí dokončení
+def derive_seed(base_seed, replica, key=None):
+    spawn_key = (replica,) if key is None else (zlib.crc32(str(key).encode()), replica)
+    return int(np.random.SeedSequence(base_seed, spawn_key=spawn_key).generate_state(1)[0])
+
+def trace_path(trace_dir, key, replica):
+    return os.path.join(trace_dir, f"{key}_{replica}.trace")
+
+def run_replica(config, seed, engine='object', max_ticks=None, trace_file=None, heatmap=None):
+    """
+    Spustí jednu simulaci bez vizualizace s daným seedem.
+    Vrací (počet tiků, tiky usazení, reálný čas běhu).
+    S trace_file se průběh uloží pro pozdější přehrání (python view.py trace_file),
+    s heatmap (CongestionHeatmap) se do ní přičte vytížení buněk.
+    """
+    simulation = ENGINES[engine](seed=seed, heatmap=heatmap, **config)
+    if trace_file is not None:
+        simulation.add_observer(TraceRecorder(trace_file, metadata={'seed': seed, 'engine': engine}))
+    wall_time, ticks, passenger_seated_at = simulation.run(max_ticks)  # Bez sinků nic nevypisuje
+    return ticks, passenger_seated_at, wall_time
+
+# Spustí dávku úloh v jednom workeru (méně režie na úlohu než po jedné)
+def run_chunk(chunk):
+    results = []
+    for key, replica, seed, config, engine, max_ticks, trace_dir in chunk:
+        trace_file = None if trace_dir is None else trace_path(trace_dir, key, replica)
+        ticks, passenger_seated_at, wall_time = run_replica(config, seed, engine, max_ticks, trace_file)
+        results.append(ReplicaResult(key, replica, seed, ticks, passenger_seated_at, wall_time))
+    return results
+
+def count_seats(config):
+    if config.get('layout') is not None:
+        return load_layout(config['layout']).n_seats
+    airplane_config = {name: config[name] for name in ('seat_rows', 'seat_in_row', 'door_choice') if name in config}
+    return len(Airplane(**airplane_config).seat_positions)
+
+def merge_aggregates(aggregates, other):
+    for key, aggregate in other.items():
+        if key in aggregates:
+            aggregates[key].merge(aggregate)
+        else:
+            aggregates[key] = aggregate
+    return aggregates
+
+# Jako run_chunk, ale worker vrací jen sloučitelné agregáty {klíč: RunAggregate}
+def run_chunk_aggregate(task):
+    chunk, bin_size = task
+    aggregates = {}
+    for key, replica, seed, config, engine, max_ticks, trace_dir in chunk:
+        trace_file = None if trace_dir is None else trace_path(trace_dir, key, replica)
+        ticks, passenger_seated_at, _ = run_replica(config, seed, engine, max_ticks, trace_file)
+        if key not in aggregates:
+            aggregates[key] = RunAggregate(count_seats(config), bin_size)
+        aggregate = aggregates[key]
+        if np.count_nonzero(np.asarray(passenger_seated_at) >= 0) < aggregate.band.n_seats:
+            aggregate.add_unfinished(1, [passenger_seated_at])  # Přerušeno max_ticks
+        else:
+            aggregate.add(ticks, passenger_seated_at)
+    return aggregates
+
+# Jako run_chunk, ale worker vrací jen sloučitelné heatmapy {klíč: CongestionHeatmap}
+def run_chunk_heatmap(chunk):
+    heatmaps = {}
+    for key, replica, seed, config, engine, max_ticks, trace_dir in chunk:
+        trace_file = None if trace_dir is None else trace_path(trace_dir, key, replica)
+        if key not in heatmaps:
+            heatmaps[key] = CongestionHeatmap()
+        run_replica(config, seed, engine, max_ticks, trace_file, heatmaps[key])
+    return heatmaps
+
+# Třída BatchRunner - Monte Carlo běhy rozložené do ProcessPoolExecutor
+class BatchRunner:
+    """
+    Spouští num_runs replik každé konfigurace (configs: klíč -> parametry Simulation).
+    Každá replika má vlastní odvozený seed, takže výsledky jsou stejné pro libovolný
+    počet workerů i pořadí dokončení. S common_random_numbers=True sdílí replika
+    se stejným číslem seed napříč konfiguracemi (jako původní run_simulation.py).
+    S trace_dir se každá replika zaznamená do trace_dir/<klíč>_<replika>.trace.
+    """
+    def __init__(self, configs, num_runs=10, workers=None, base_seed=0, engine='object',
+                 chunk_size=1, max_ticks=None, common_random_numbers=False, trace_dir=None):
+        self.configs = configs
+        self.num_runs = num_runs
+        self.workers = os.cpu_count() if workers is None else workers
+        self.base_seed = base_seed
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.max_ticks = max_ticks
+        self.common_random_numbers = common_random_numbers
+        self.trace_dir = trace_dir
+
+    def tasks(self):
+        for key, config in self.configs.items():
+            for replica in range(self.num_runs):
+                seed = derive_seed(self.base_seed, replica, None if self.common_random_numbers else key)
+                yield key, replica, seed, config, self.engine, self.max_ticks, self.trace_dir
+
+    def chunks(self):
+        chunk = []
+        for task in self.tasks():
+            chunk.append(task)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def iter_results(self):
+        """
+        Vrací ReplicaResult postupně, jak jednotlivé běhy doběhnou.
+        """
+        if self.workers <= 1:
+            for chunk in self.chunks():
+                yield from run_chunk(chunk)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(run_chunk, chunk) for chunk in self.chunks()]
+            for future in as_completed(futures):
+                yield from future.result()
+
+    def aggregate(self, bin_size=1):
+        """
+        Spustí všechny běhy a vrátí {klíč: RunAggregate} (stats.py). Výsledky jednotlivých
+        běhů se nikde nedrží - každý worker agreguje svou dávku a rodič agregáty slučuje,
+        takže paměť nezávisí na num_runs. Pro statisíce běhů je vhodný větší chunk_size.
+        """
+        return self.merge_chunks(run_chunk_aggregate, ((chunk, bin_size) for chunk in self.chunks()))
+
+    def heatmaps(self):
+        """
+        Spustí všechny běhy a vrátí {klíč: CongestionHeatmap} (heatmap.py) sečtenou přes repliky.
+        """
+        return self.merge_chunks(run_chunk_heatmap, self.chunks())
+
+    def merge_chunks(self, function, tasks):
+        # function(úloha) vrací {klíč: sloučitelný objekt}, rodič výsledky workerů slučuje
+        merged = {}
+        if self.workers <= 1:
+            for task in tasks:
+                merge_aggregates(merged, function(task))
+            return merged
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(function, task) for task in tasks]
+            for future in as_completed(futures):
+                merge_aggregates(merged, future.result())
+        return merged
+
+    def run(self, on_result=None):
+        """
+        Spustí všechny běhy a vrátí {klíč: [počet tiků pro repliku 0, 1, ...]}.
+        on_result je volán pro každý výsledek hned po jeho doběhnutí.
+        """
+        results = {key: [None] * self.num_runs for key in self.configs}
+        for result in self.iter_results():
+            results[result.key][result.replica] = result.ticks
+            if on_result is not None:
+                on_result(result)
+        return results
+
+# Distribuční funkce Studentova t-rozdělení pro celočíselné df - konečná řada
+# v cos(theta) (Abramowitz, Stegun 26.7.3 a 26.7.4), bez scipy
+def student_t_cdf(t, df):
+    theta = math.atan(abs(t) / math.sqrt(df))
+    cos2 = math.cos(theta) ** 2
+    if df % 2:
+        term, total = 1.0, 1.0 if df > 1 else 0.0
+        for k in range(3, df - 1, 2):
+            term *= (k - 1) / k * cos2
+            total += term
+        inside = 2 / math.pi * (theta + math.sin(theta) * math.cos(theta) * total)
+    else:
+        term, total = 1.0, 1.0
+        for k in range(2, df - 1, 2):
+            term *= (k - 1) / k * cos2
+            total += term
+        inside = math.sin(theta) * total  # P(|T| < |t|)
+    return 0.5 + math.copysign(inside / 2, t)
+
+# Kvantil Studentova t-rozdělení: do df 30 přesně (půlení intervalu nad student_t_cdf),
+# výš Cornish-Fisherův rozvoj kolem normálního (chyba pod 0.01 %)
+def student_t_quantile(p, df):
+    z = NormalDist().inv_cdf(p)
+    if df > 30:
+        return (z + (z ** 3 + z) / (4 * df) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+                + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+    if p < 0.5:
+        return -student_t_quantile(1 - p, df)
+    low, high = 0.0, 1.0
+    while student_t_cdf(high, df) < p:
+        high *= 2
+    for _ in range(100):
+        middle = (low + high) / 2
+        if student_t_cdf(middle, df) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+def confidence_interval(values, confidence=0.95, quantile=None):
+    """
+    Vrací (odhad, dolní mez, horní mez) intervalu spolehlivosti průměru (t-rozdělení),
+    nebo s quantile (např. 0.9) daného kvantilu - z pořadových statistik, bez předpokladu
+    o rozdělení. Z méně než dvou hodnot je interval nekonečný.
+    """
+    values = np.sort(np.asarray(values, dtype=float))
+    n = len(values)
+    if n == 0:
+        return np.nan, -np.inf, np.inf
+    alpha = (1 - confidence) / 2
+    if quantile is None:
+        estimate = values.mean()
+        if n < 2:
+            return estimate, -np.inf, np.inf
+        half_width = student_t_quantile(1 - alpha, n - 1) * values.std(ddof=1) / np.sqrt(n)
+        return estimate, estimate - half_width, estimate + half_width
+
+    # Počet hodnot pod kvantilem je binomický - normální aproximace pořadí mezí
+    estimate = np.quantile(values, quantile)
+    spread = NormalDist().inv_cdf(1 - alpha) * np.sqrt(n * quantile * (1 - quantile))
+    low = int(np.floor(n * quantile - spread))
+    high = int(np.ceil(n * quantile + spread))
+    return (estimate, values[low - 1] if low >= 1 else -np.inf,
+            values[high - 1] if high <= n else np.inf)
+
+# Stav adaptivního odhadu jedné konfigurace; stopped je None (běží dál),
+# 'precise' (dosažená šířka), 'separated' (pořadí je jasné) nebo 'max_runs'
+Estimate = namedtuple('Estimate', ['runs', 'estimate', 'low', 'high', 'stopped'])
+
+# Třída AdaptiveRunner - repliky se přidávají jen tam, kde je odhad ještě nepřesný
+class AdaptiveRunner(BatchRunner):
+    """
+    Běží po kolech: každá aktivní konfigurace dostane step dalších replik (nejdřív
+    min_runs), potom se přepočítá interval spolehlivosti průměru (nebo kvantilu quantile)
+    počtu tiků. Konfigurace přestane dostávat repliky, když je interval užší než
+    ci_width, když se nepřekrývá s intervalem žádné jiné konfigurace (pořadí je jasné),
+    nebo po max_runs replikách. Repliky mají stejné seedy jako v BatchRunner, takže
+    prvních n výsledků je stejných jako při pevném num_runs = n.
+    """
+    def __init__(self, configs, ci_width, confidence=0.95, quantile=None, min_runs=5, max_runs=100,
+                 step=5, **kwargs):
+        super().__init__(configs, num_runs=max_runs, **kwargs)
+        self.ci_width = ci_width
+        self.confidence = confidence
+        self.quantile = quantile
+        self.min_runs = min(max(min_runs, 2), max_runs)
+        self.max_runs = max_runs
+        self.step = step
+        self.scheduled = {}  # Klíč -> range replik aktuálního kola
+        self.estimates = {key: Estimate(0, np.nan, -np.inf, np.inf, None) for key in configs}
+
+    def tasks(self):
+        for task in super().tasks():
+            key, replica = task[0], task[1]
+            if key in self.scheduled and replica in self.scheduled[key]:
+                yield task
+
+    def next_round(self):
+        self.scheduled = {}
+        for key, estimate in self.estimates.items():
+            if estimate.stopped is None:
+                runs = self.min_runs if estimate.runs == 0 else min(estimate.runs + self.step, self.max_runs)
+                self.scheduled[key] = range(estimate.runs, runs)
+        return self.scheduled
+
+    def update(self, results):
+        intervals = {key: confidence_interval(ticks, self.confidence, self.quantile) for key, ticks in results.items()}
+        for key, (estimate, low, high) in intervals.items():
+            if self.estimates[key].stopped is not None:
+                continue
+            separated = len(intervals) > 1 and all(high < other_low or low > other_high
+                                                   for other, (_, other_low, other_high) in intervals.items()
+                                                   if other != key)
+            if high - low <= self.ci_width:
+                stopped = 'precise'
+            elif separated:
+                stopped = 'separated'
+            elif len(results[key]) >= self.max_runs:
+                stopped = 'max_runs'
+            else:
+                stopped = None
+            self.estimates[key] = Estimate(len(results[key]), estimate, low, high, stopped)
+
+    def run(self, on_result=None):
+        """
+        Vrací {klíč: [počet tiků pro repliku 0, 1, ...]} - seznamy mají různou délku.
+        Intervaly a důvod zastavení jsou potom v self.estimates.
+        """
+        results = {key: [] for key in self.configs}
+        while self.next_round():
+            round_results = {}
+            for result in self.iter_results():
+                round_results[result.key, result.replica] = result.ticks
+                if on_result is not None:
+                    on_result(result)
+            for (key, replica), ticks in sorted(round_results.items()):
+                results[key].append(ticks)
+            self.update(results)
+        return results
+
+# Všechny repliky konfigurace najednou v jednom dávkovém poli (EnsembleSimulation)
+def run_ensemble(configs, num_runs=10, base_seed=0, max_ticks=None, on_result=None):
+    """
+    Stejný výstup jako BatchRunner.run - {klíč: [počet tiků pro repliku 0, 1, ...]} -
+    ale všech num_runs replik jedné konfigurace běží v jednom procesu najednou.
+    Repliky přerušené max_ticks mají jako u Simulation počet tiků max_ticks.
+    """
+    results = {}
+    for key, config in configs.items():
+        ensemble = EnsembleSimulation(replicas=num_runs, seed=derive_seed(base_seed, 0, key), **config)
+        ticks, seated_at = ensemble.run_until_done(max_ticks)
+        if max_ticks is not None:
+            ticks = np.where(ticks >= 0, ticks, max_ticks)  # EnsembleSimulation pro ně vrací -1
+        results[key] = ticks.tolist()
+        if on_result is not None:
+            for replica in range(num_runs):
+                on_result(ReplicaResult(key, replica, ensemble.seed, int(ticks[replica]),
+                                        seated_at[replica].tolist(), None))
+    return results
+
+def aggregate_ensemble(configs, num_runs=10, base_seed=0, max_ticks=None, batch_size=1000, bin_size=1):
+    """
+    Jako run_ensemble, ale repliky běží po dávkách batch_size (dávka b má seed
+    derive_seed(base_seed, b, klíč)) a výsledky jdou rovnou do {klíč: RunAggregate}.
+    Paměť je dána velikostí dávky, ne num_runs. Pro num_runs <= batch_size jsou běhy
+    stejné jako v run_ensemble.
+    """
+    aggregates = {}
+    for key, config in configs.items():
+        aggregate = None
+        for batch, start in enumerate(range(0, num_runs, batch_size)):
+            replicas = min(batch_size, num_runs - start)
+            ensemble = EnsembleSimulation(replicas=replicas, seed=derive_seed(base_seed, batch, key), **config)
+            ticks, seated_at = ensemble.run_until_done(max_ticks)
+            if aggregate is None:
+                aggregate = RunAggregate(ensemble.capacity, bin_size)
+            finished = ticks >= 0  # Nedokončené repliky mají -1
+            aggregate.add_many(ticks[finished], seated_at[finished])
+            aggregate.add_unfinished(int((~finished).sum()), seated_at[~finished])
+        aggregates[key] = aggregate
+    return aggregates
+
+def heatmap_ensemble(configs, num_runs=10, base_seed=0, max_ticks=None, batch_size=1000):
+    """
+    Heatmapy vytížení buněk {klíč: CongestionHeatmap} z EnsembleSimulation - stejné dávky
+    a seedy jako aggregate_ensemble, všechny repliky konfigurace se sčítají do jedné heatmapy.
+    """
+    heatmaps = {}
+    for key, config in configs.items():
+        heatmaps[key] = CongestionHeatmap()
+        for batch, start in enumerate(range(0, num_runs, batch_size)):
+            replicas = min(batch_size, num_runs - start)
+            ensemble = EnsembleSimulation(replicas=replicas, seed=derive_seed(base_seed, batch, key),
+                                          heatmap=heatmaps[key], **config)
+            ensemble.run_until_done(max_ticks)
+    return heatmaps
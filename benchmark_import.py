@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Benchmark studeného startu: každé měření je nový interpret, takže nic není v sys.modules
+# ani v paměti procesu. Jádro (engine a dávkové běhy) se musí načíst jen s NumPy -
+# vizualizace (pygame), grafy (matplotlib) a CLI (argparse) se načítají až při použití.
+CORE_MODULES = ['model', 'vectorized', 'batch', 'sweep', 'optimizer']
+HEAVY_MODULES = ['pygame', 'matplotlib', 'argparse']
+
+# Start = import + postavení a doběhnutí malé simulace (jako jeden krátký běh sweepu)
+STARTUP_CODE = "import model; model.Simulation(seat_rows=5, door_choice='both').run_until_done()"
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def run_python(args):
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable] + args, cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, completed
+
+def parse_importtime(stderr):
+    """
+    Vrací {modul: kumulativní čas importu v sekundách} z výstupu python -X importtime.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+def measure_import(module, repeats=5):
+    wall_times, import_times = [], []
+    for _ in range(repeats):
+        wall_time, completed = run_python(['-X', 'importtime', '-c', f"import {module}"])
+        times = parse_importtime(completed.stderr)
+        wall_times.append(wall_time)
+        import_times.append(times[module])
+
+    # Které těžké moduly import natáhne a které balíky trvají nejdéle (z posledního měření)
+    _, completed = run_python(['-c', f"import sys, json, {module}; "
+                                     f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"])
+    return {
+        'wall_time': float(np.median(wall_times)),
+        'import_time': float(np.median(import_times)),
+        'heavy_modules': json.loads(completed.stdout.splitlines()[-1]),  # pygame vypisuje pozdrav
+        'slowest': sorted(((name, seconds) for name, seconds in times.items() if '.' not in name and name != module),
+                          key=lambda item: -item[1])[:5],
+    }
+
+def measure_startup(repeats=5):
+    interpreter = float(np.median([run_python(['-c', 'pass'])[0] for _ in range(repeats)]))
+    startup = float(np.median([run_python(['-c', STARTUP_CODE])[0] for _ in range(repeats)]))
+    return {'interpreter_time': interpreter, 'startup_time': startup}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start import time of the simulation core")
+    parser.add_argument('--modules', type=str, nargs='+', default=CORE_MODULES, help='Modules to import')
+    parser.add_argument('--repeats', type=int, default=5, help='Fresh interpreters per measurement (median is reported)')
+    parser.add_argument('--top', action='store_true', help='Also print the slowest imported packages')
+    parser.add_argument('--output', type=str, default=None, help='Write results to this JSON file')
+    parser.add_argument('--max_import_ms', type=float, default=None,
+                        help='Exit with status 1 if importing a module takes longer (milliseconds)')
+    parser.add_argument('--max_startup_ms', type=float, default=None,
+                        help='Exit with status 1 if a fresh interpreter needs longer to import the engine '
+                             'and run a small simulation (milliseconds)')
+    args = parser.parse_args()
+
+    print(f"{'module':>12} {'import [ms]':>12} {'process [ms]':>13}  heavy modules")
+    results = {}
+    failures = []
+    for module in args.modules:
+        result = measure_import(module, args.repeats)
+        results[module] = result
+        print(f"{module:>12} {result['import_time'] * 1e3:>12.1f} {result['wall_time'] * 1e3:>13.1f}  "
+              f"{', '.join(result['heavy_modules']) or '-'}")
+        if args.top:
+            for name, seconds in result['slowest']:
+                print(f"{'':>12} {seconds * 1e3:>12.1f}  {name}")
+        if result['heavy_modules']:
+            failures.append(f"{module} načítá {', '.join(result['heavy_modules'])}")
+        if args.max_import_ms is not None and result['import_time'] * 1e3 > args.max_import_ms:
+            failures.append(f"{module}: import {result['import_time'] * 1e3:.1f} ms > {args.max_import_ms} ms")
+
+    startup = measure_startup(args.repeats)
+    results['startup'] = startup
+    print(f"Prázdný interpret: {startup['interpreter_time'] * 1e3:.1f} ms, "
+          f"import + malá simulace: {startup['startup_time'] * 1e3:.1f} ms")
+    if args.max_startup_ms is not None and startup['startup_time'] * 1e3 > args.max_startup_ms:
+        failures.append(f"start {startup['startup_time'] * 1e3:.1f} ms > {args.max_startup_ms} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Výsledky uloženy do {args.output}")
+    if failures:
+        print("Překročený rozpočet:")
+        for line in failures:
+            print(f"  {line}")
+        sys.exit(1)
@@ -0,0 +1,112 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from distance_cache import DistanceFieldCache, default_cache
+from layouts import LAYOUTS, Door, CabinLayout, load_layout
+from model import Simulation
+from routing import RoutingTable, clear_routing_tables
+
+# Benchmark stavby kabin: čas a paměť pro matici, routing tabulku a inicializaci simulace
+# na předdefinovaných kabinách a na syntetických kabinách až přes 1000 sedadel
+SYNTHETIC_ROWS = [40, 85, 120]
+
+def synthetic_layouts():
+    # 3-4-3 se dveřmi vpředu, vzadu a každých 20 řad (schody vzadu)
+    for seat_rows in SYNTHETIC_ROWS:
+        doors = [Door(position) for position in range(0, seat_rows, 20)] + [Door(seat_rows, kind='stairs')]
+        yield CabinLayout(seat_rows, [3, 4, 3], doors, name=f"{seat_rows}x3-4-3")
+
+def measure(layout, board=False, seed=0):
+    start = time.perf_counter()
+    matrix, door_positions, seat_positions, _ = layout.build()
+    build_time = time.perf_counter() - start
+
+    # Routing tabulka se studenou cache - BFS pro všechna sedadla
+    cache = DistanceFieldCache(max_entries=0)
+    start = time.perf_counter()
+    table = RoutingTable(matrix, seat_positions, distance_cache=cache)
+    routing_time = time.perf_counter() - start
+
+    # Celá inicializace simulace (routing tabulku znovu staví, cache je vyčištěná)
+    clear_routing_tables()
+    default_cache.clear()
+    start = time.perf_counter()
+    simulation = Simulation(layout=layout, seed=seed)
+    init_time = time.perf_counter() - start
+
+    # Paměť v samostatném běhu - tracemalloc zpomaluje alokace a zkreslil by časy
+    clear_routing_tables()
+    default_cache.clear()
+    tracemalloc.start()
+    Simulation(layout=layout)
+    init_retained, init_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        'seats': len(seat_positions),
+        'doors': len(door_positions),
+        'cells': int(matrix.size),
+        'build_time': build_time,
+        'routing_time': routing_time,
+        'routing_table_mb': table.nbytes / 1e6,
+        'init_time': init_time,
+        'init_retained_mb': init_retained / 1e6,
+        'init_peak_mb': init_peak / 1e6,
+    }
+    if board:
+        start = time.perf_counter()
+        result['ticks'] = simulation.run_until_done(max_ticks=50 * len(seat_positions))[0]
+        result['boarding_time'] = time.perf_counter() - start
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build time and memory of cabin layouts")
+    parser.add_argument('--layout', type=str, nargs='*', default=None,
+                        help='Layouts to measure (names, .json/.txt files or text descriptions); default = presets + synthetic')
+    parser.add_argument('--board', action='store_true', help='Also run a full boarding on each layout')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=str, default=None, help='Write results to this JSON file')
+    parser.add_argument('--max_init_time', type=float, default=None,
+                        help='Exit with status 1 if initialising a simulation takes longer (seconds)')
+    parser.add_argument('--max_init_mb', type=float, default=None,
+                        help='Exit with status 1 if simulation initialisation peaks above this many MB')
+    args = parser.parse_args()
+
+    if args.layout:
+        layouts = [load_layout(source) for source in args.layout]
+    else:
+        layouts = list(LAYOUTS.values()) + list(synthetic_layouts())
+
+    print(f"{'layout':>12} {'seats':>6} {'doors':>5} {'cells':>6} | {'build [ms]':>10} {'routing [ms]':>12} "
+          f"{'table':>9} | {'init [ms]':>9} {'retained':>9} {'peak':>9}"
+          + (f" | {'ticks':>6} {'board [s]':>9}" if args.board else ''))
+    results = {}
+    over_budget = []
+    for layout in layouts:
+        name = layout.name or repr(layout)
+        result = measure(layout, board=args.board, seed=args.seed)
+        results[name] = result
+        line = (f"{name:>12} {result['seats']:>6} {result['doors']:>5} {result['cells']:>6} | "
+                f"{result['build_time'] * 1e3:>10.2f} {result['routing_time'] * 1e3:>12.1f} "
+                f"{result['routing_table_mb']:>6.2f} MB | "
+                f"{result['init_time'] * 1e3:>9.1f} {result['init_retained_mb']:>6.2f} MB {result['init_peak_mb']:>6.2f} MB")
+        if args.board:
+            line += f" | {result['ticks']:>6} {result['boarding_time']:>9.2f}"
+        print(line)
+        if args.max_init_time is not None and result['init_time'] > args.max_init_time:
+            over_budget.append(f"{name}: init {result['init_time']:.3f} s > {args.max_init_time} s")
+        if args.max_init_mb is not None and result['init_peak_mb'] > args.max_init_mb:
+            over_budget.append(f"{name}: init peak {result['init_peak_mb']:.1f} MB > {args.max_init_mb} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Výsledky uloženy do {args.output}")
+    if over_budget:
+        print("Překročený rozpočet:")
+        for line in over_budget:
+            print(f"  {line}")
+        sys.exit(1)
@@ -0,0 +1,47 @@
+import argparse
+import tracemalloc
+
+from distance_cache import DistanceFieldCache, compute_distance_matrix
+from model import Airplane
+from routing import clear_routing_tables, get_routing_table
+
+# Porovnání paměti: vlastní float64 distance matice na pasažéra vs. sdílená next-hop tabulka
+LAYOUTS = [
+    (32, [3, 3]),
+    (60, [2, 4, 2]),
+    (80, [3, 4, 3]),
+]
+
+def measure_distance_matrices(airplane):
+    # Původní stav: každý pasažér drží vlastní float64 matici velikosti celé kabiny
+    matrices = [compute_distance_matrix(airplane.matrix, seat) for seat in airplane.seat_positions]
+    return sum(m.nbytes for m in matrices)
+
+def measure_routing_table(airplane):
+    # Stejná cesta jako Simulation (get_routing_table), cache se nečistí - co zůstane, drží i simulace
+    cache = DistanceFieldCache(max_entries=0)  # Bez sdílení s jinými měřeními
+    clear_routing_tables()
+    tracemalloc.start()
+    table = get_routing_table(airplane.matrix, airplane.seat_positions, distance_cache=cache)
+    routes = [table.route(seat) for seat in airplane.seat_positions]  # Pasažéři drží jen pohledy
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return table.nbytes, retained, peak, len(routes)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory benchmark of passenger routing representations")
+    parser.parse_args()
+
+    print(f"{'layout':>18} {'seats':>6} {'cells':>6} | {'float64/passenger':>18} | {'next-hop table':>15} {'retained':>10} {'build peak':>11} | {'ratio':>6}")
+    for seat_rows, seat_in_row in LAYOUTS:
+        airplane = Airplane(seat_rows=seat_rows, seat_in_row=seat_in_row, door_choice='both')
+        cells = airplane.matrix.size
+        seats = len(airplane.seat_positions)
+
+        matrices_bytes = measure_distance_matrices(airplane)
+        table_bytes, retained, peak, _ = measure_routing_table(airplane)
+
+        layout = f"{seat_rows}x{'-'.join(map(str, seat_in_row))}"
+        print(f"{layout:>18} {seats:>6} {cells:>6} | {matrices_bytes / 1e6:>15.2f} MB | "
+              f"{table_bytes / 1e6:>12.2f} MB {retained / 1e6:>7.2f} MB {peak / 1e6:>8.2f} MB | "
+              f"{matrices_bytes / table_bytes:>5.1f}x")
@@ -0,0 +1,174 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from batch import ENGINES
+from distance_cache import default_cache
+from profiling import PhaseProfiler
+from routing import clear_routing_tables
+
+# Škálovací benchmark: tiky za sekundu, čas nástupu, cena spawnu a špičková paměť
+# přes mřížku rozložení letadla, strategií a dveří. Výsledky jdou do JSON souboru,
+# který lze později použít jako baseline pro hledání zpomalení.
+SEAT_ROWS = [5, 10, 20, 40, 80]
+SEAT_IN_ROW = [[3, 3], [2, 4, 2], [3, 4, 3]]
+STRATEGIES = ['random', 'door_wise', 'window_wise', 'optimal']
+DOORS = ['left', 'right', 'both']
+
+# Zmenšená mřížka pro rychlou kontrolu (--quick)
+QUICK_SEAT_ROWS = [5, 20]
+QUICK_SEAT_IN_ROW = [[3, 3]]
+QUICK_DOORS = ['left', 'both']
+
+# Metriky a směr, kterým je výsledek horší
+METRICS = {
+    'ticks_per_second': 'lower',
+    'wall_time': 'higher',
+    'setup_time': 'higher',
+    'spawn_time': 'higher',
+    'peak_memory_mb': 'higher',
+}
+
+def case_key(seat_rows, seat_in_row, strategy, door_choice):
+    return f"{seat_rows}x{'-'.join(map(str, seat_in_row))}/{strategy}/{door_choice}"
+
+def cases(quick=False):
+    for seat_rows in QUICK_SEAT_ROWS if quick else SEAT_ROWS:
+        for seat_in_row in QUICK_SEAT_IN_ROW if quick else SEAT_IN_ROW:
+            for strategy in STRATEGIES:
+                for door_choice in QUICK_DOORS if quick else DOORS:
+                    yield dict(seat_rows=seat_rows, seat_in_row=seat_in_row,
+                               seating_strategy=strategy, door_choice=door_choice)
+
+def run_boarding(config, engine, seed, max_ticks, profiler=None):
+    # Studená cache - cena spawnu zahrnuje i BFS pro routing tabulku
+    default_cache.clear()
+    clear_routing_tables()
+    start = time.perf_counter()
+    simulation = ENGINES[engine](profiler=profiler, seed=seed, **config)
+    ticks, _ = simulation.run_until_done(max_ticks)
+    return ticks, simulation.finished, time.perf_counter() - start
+
+def measure(config, engine='object', repeats=3, seed=0, memory=True):
+    """
+    Změří jednu konfiguraci - medián přes repeats běhů se seedy seed, seed + 1, ...
+    Paměť se měří zvlášť (tracemalloc běh zpomaluje).
+    """
+    # Pojistka pro strategie, které na daném rozložení nemusí doběhnout
+    max_ticks = 50 * config['seat_rows'] * sum(config['seat_in_row'])
+
+    walls, rates, setups, spawns, all_ticks, finished = [], [], [], [], [], True
+    for repeat in range(repeats):
+        profiler = PhaseProfiler()
+        ticks, done, wall = run_boarding(config, engine, seed + repeat, max_ticks, profiler)
+        tick_time = profiler.summary()['total']
+        walls.append(wall)
+        rates.append(ticks / tick_time if tick_time else 0.0)
+        setups.append(profiler.setup_time)
+        spawns.append(profiler.summary()['phases']['spawn']['total'] + profiler.setup_time)
+        all_ticks.append(ticks)
+        finished &= done
+
+    result = {
+        'ticks': float(np.median(all_ticks)),
+        'finished': finished,
+        'wall_time': float(np.median(walls)),
+        'ticks_per_second': float(np.median(rates)),
+        'setup_time': float(np.median(setups)),
+        'spawn_time': float(np.median(spawns)),
+    }
+
+    if memory:
+        tracemalloc.start()
+        run_boarding(config, engine, seed, max_ticks)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['peak_memory_mb'] = peak / 1e6
+    return result
+
+def compare(baseline, results, threshold=0.2, min_time=1e-3):
+    """
+    Vrací seznam zhoršení (klíč, metrika, baseline, nová hodnota, relativní změna)
+    větších než threshold. Časy pod min_time se neporovnávají (šum).
+    """
+    regressions = []
+    for key, new in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        for metric, worse in METRICS.items():
+            if metric not in old or metric not in new or not old[metric]:
+                continue
+            if metric.endswith('_time') and max(old[metric], new[metric]) < min_time:
+                continue
+            change = (new[metric] - old[metric]) / old[metric]
+            if (change > threshold) if worse == 'higher' else (change < -threshold):
+                regressions.append((key, metric, old[metric], new[metric], change))
+    return regressions
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+def print_regressions(regressions, threshold):
+    if not regressions:
+        print(f"No regressions above {threshold:.0%}.")
+        return
+    print(f"{len(regressions)} regressions above {threshold:.0%}:")
+    for key, metric, old, new, change in regressions:
+        print(f"  {key:>28} {metric:>17}: {old:.4g} -> {new:.4g} ({change:+.1%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling benchmark of the boarding simulation with regression baselines")
+    parser.add_argument('--output', type=str, default=None, help='Write results to this JSON file')
+    parser.add_argument('--baseline', type=str, default=None,
+                        help='Compare the new results with this JSON file and exit with 1 on regressions')
+    parser.add_argument('--compare', type=str, nargs=2, metavar=('BASELINE', 'RESULTS'), default=None,
+                        help='Only compare two existing result files, do not run anything')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Relative change reported as a regression')
+    parser.add_argument('--engine', type=str, choices=sorted(ENGINES), default='object', help='Simulation engine')
+    parser.add_argument('--repeats', type=int, default=3, help='Runs per configuration (median is reported)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the first run of every configuration')
+    parser.add_argument('--quick', action='store_true', help='Small grid for a fast check')
+    parser.add_argument('--no_memory', action='store_true', help='Skip the separate tracemalloc run')
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(load_results(args.compare[0]), load_results(args.compare[1]), args.threshold)
+        print_regressions(regressions, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    print(f"{'case':>28} {'ticks':>7} {'ticks/s':>9} {'wall [s]':>9} {'setup [ms]':>11} {'spawn [ms]':>11} {'peak [MB]':>10}")
+    results = {}
+    for config in cases(args.quick):
+        key = case_key(config['seat_rows'], config['seat_in_row'], config['seating_strategy'], config['door_choice'])
+        result = measure(config, args.engine, args.repeats, args.seed, memory=not args.no_memory)
+        results[key] = result
+        note = '' if result['finished'] else '  (did not finish)'
+        print(f"{key:>28} {result['ticks']:>7.0f} {result['ticks_per_second']:>9.0f} {result['wall_time']:>9.3f} "
+              f"{result['setup_time'] * 1e3:>11.2f} {result['spawn_time'] * 1e3:>11.2f} "
+              f"{result.get('peak_memory_mb', float('nan')):>10.2f}{note}")
+
+    if args.output:
+        meta = {
+            'engine': args.engine,
+            'repeats': args.repeats,
+            'seed': args.seed,
+            'quick': args.quick,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with open(args.output, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=1)
+
+    if args.baseline:
+        regressions = compare(load_results(args.baseline), results, args.threshold)
+        print_regressions(regressions, args.threshold)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,259 @@
+import pickle
+import random
+import time
+import zlib
+
+import numpy as np
+
+from model import Passenger, Simulation, SimulationObserver
+from random_streams import STREAM_MOVE
+from vectorized import VectorSimulation
+
+CHECKPOINT_VERSION = 2
+
+# Parametry Simulation, ze kterých se při forku znovu postaví letadlo, routing a plán strategie
+CONFIG_FIELDS = ['seat_rows', 'seat_in_row', 'door_choice', 'layout', 'baggage_probability', 'ticks_per_second',
+                 'seating_strategy', 'spawn_interval', 'skip_idle', 'seed']
+
+# Dynamický stav pasažéra - route a events se po obnovení znovu připojí ze simulace
+PASSENGER_FIELDS = ['ped_id', 'current_pos', 'seat_pos', 'next_move', 'seated', 'desired_move', 'swapping',
+                    'swapping_speed', 'swapping_progress', 'seating_in_progress', 'seating_steps_remaining',
+                    'has_baggage', 'baggage_steps_remaining', 'baggage_stopped']
+
+# Třída Checkpoint - stav simulace v tiku T, ze kterého lze pustit libovolně mnoho pokračování
+class Checkpoint:
+    """
+    config jsou parametry Simulation, state dynamický stav: pasažéři a jejich odpočty,
+    fronty sedadel, seat_status, mřížka obsazenosti, časování spawnu a stav proudů
+    náhodných čísel simulace. Routing tabulka, matice ani předlosované atributy pasažérů
+    se neukládají - dají se znovu odvodit z rozložení a seedu.
+    """
+    def __init__(self, config, state):
+        self.config = config
+        self.state = state
+
+    @property
+    def tick(self):
+        return self.state['tick']
+
+    def to_bytes(self):
+        return zlib.compress(pickle.dumps((CHECKPOINT_VERSION, self.config, self.state),
+                                          protocol=pickle.HIGHEST_PROTOCOL))
+
+    @classmethod
+    def from_bytes(cls, data):
+        version, config, state = pickle.loads(zlib.decompress(data))
+        if version != CHECKPOINT_VERSION:
+            raise ValueError(f"Nepodporovaná verze checkpointu {version}, očekávána {CHECKPOINT_VERSION}")
+        return cls(config, state)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+    def fork(self, seed=None, perturbations=None, **kwargs):
+        return fork(self, seed, perturbations, **kwargs)
+
+def take_checkpoint(simulation):
+    """
+    Uloží stav simulace po aktuálním tiku. Simulace se tím nemění a může běžet dál.
+    Podporuje jen objektový engine Simulation - VectorSimulation a EnsembleSimulation
+    drží stav v polích, která checkpoint neukládá, a vyvolají ValueError.
+    """
+    if isinstance(simulation, VectorSimulation):
+        raise ValueError("Checkpoint podporuje jen objektový engine Simulation")
+
+    grid = simulation.occupancy_grid
+    state = {
+        'tick': simulation.tick,
+        'last_spawn_ticks': list(simulation.last_spawn_ticks),
+        'seat_queues': [list(queue) for queue in simulation.seat_queues],
+        'seats_remaining': simulation.seats_remaining,
+        'n_seated': simulation.n_seated,
+        'ped_id_counter': simulation.ped_id_counter,
+        'passenger_seated_at': list(simulation.passenger_seated_at),
+        'occupied_seats': [seat for seat, occupied in simulation.seat_status.items() if occupied],
+        'occupancy_counts': [list(row) for row in grid.counts],
+        'seated_before': [list(column) for column in grid.seated_before],
+        'passengers': [tuple(getattr(passenger, name) for name in PASSENGER_FIELDS)
+                       for passenger in simulation.passengers],
+        'active': [passenger.ped_id for passenger in simulation.active_passengers],
+        'finished': simulation.finished,
+        'streams': {purpose: stream.getstate() for purpose, stream in simulation.streams.items()},
+    }
+    config = {name: getattr(simulation, name) for name in CONFIG_FIELDS}
+    return Checkpoint(config, state)
+
+def fork(checkpoint, seed=None, perturbations=None, **kwargs):
+    """
+    Vrátí novou Simulation ve stavu checkpointu. Bez seed pokračuje se stejnými proudy
+    náhodných čísel jako původní běh (stejný výsledek), se seed se od tiku T losuje z nových
+    proudů (včetně atributů dosud nespawnovaných pasažérů). perturbations (např. LatePassenger, BlockedCell) se použijí hned a zůstanou
+    připojené jako pozorovatelé. kwargs (observers, events, profiler, ...) jdou do Simulation.
+    """
+    state = checkpoint.state
+    config = dict(checkpoint.config)
+    if seed is not None:
+        config['seed'] = seed
+    simulation = Simulation(**config, **kwargs)
+
+    simulation.tick = state['tick']
+    simulation.events.tick = state['tick']
+    simulation.last_spawn_ticks = list(state['last_spawn_ticks'])
+    for queue, seats in zip(simulation.seat_queues, state['seat_queues']):
+        queue[:] = seats  # Na tytéž seznamy ukazuje door_queues
+    simulation.seats_remaining = state['seats_remaining']
+    simulation.n_seated = state['n_seated']
+    simulation.ped_id_counter = state['ped_id_counter']
+    simulation.passenger_seated_at = list(state['passenger_seated_at'])
+    for seat in state['occupied_seats']:
+        simulation.seat_status[seat] = True
+    simulation.occupancy_grid.counts = [bytearray(row) for row in state['occupancy_counts']]
+    simulation.occupancy_grid.seated_before = [list(column) for column in state['seated_before']]
+    simulation.finished = state['finished']
+
+    # Pasažéři bez konstruktoru - ten by losoval zavazadla a rychlost výměny
+    for values in state['passengers']:
+        passenger = Passenger.__new__(Passenger)
+        for name, value in zip(PASSENGER_FIELDS, values):
+            setattr(passenger, name, value)
+        passenger.route = simulation.routing.route(passenger.seat_pos)
+        passenger.events = simulation.events
+        passenger.rng = simulation.streams[STREAM_MOVE]
+        simulation.passengers.append(passenger)
+    simulation.active_passengers = [simulation.passengers[ped_id] for ped_id in state['active']]
+
+    if seed is None:
+        for purpose, stream_state in state['streams'].items():
+            simulation.streams[purpose].setstate(stream_state)
+
+    for perturbation in perturbations or []:
+        perturbation.apply(simulation)
+        simulation.add_observer(perturbation)
+    return simulation
+
+# Poruchy pro what-if pokračování - pozorovatelé, kteří změní stav při forku a případně ho po čase vrátí
+class Perturbation(SimulationObserver):
+    def apply(self, simulation):
+        # Přeskakování nečinných tiků by přeskočilo i tik, ve kterém porucha končí
+        simulation.skip_idle = False
+
+class LatePassenger(Perturbation):
+    """
+    Pasažér se sedadlem seat (dosud nespawnovaný) dorazí k nástupu o delay tiků později.
+    Pořadí nástupu se nemění - když je na řadě dřív, jeho fronta na něj čeká
+    (Simulation.held_seats). Porucha tak nástup nikdy neurychlí a delay 0 je stejné
+    pokračování jako bez poruchy.
+    """
+    def __init__(self, seat, delay):
+        self.seat = tuple(seat)
+        self.delay = delay
+        self.held = False
+
+    def apply(self, simulation):
+        super().apply(simulation)
+        if not any(self.seat in queue for queue in simulation.seat_queues):
+            raise ValueError(f"Sedadlo {self.seat} není ve frontě (pasažér už nastoupil?)")
+        if self.delay > 0:
+            simulation.held_seats.add(self.seat)
+            self.held = True
+            self.release_tick = simulation.tick + self.delay
+
+    def on_tick(self, simulation):
+        # Na konci tiku release_tick - nejdřív může nastoupit o delay tiků později než bez poruchy
+        if self.held and simulation.tick >= self.release_tick:
+            simulation.held_seats.discard(self.seat)
+            self.held = False
+
+class BlockedCell(Perturbation):
+    """
+    Buňka pos (např. v uličce) je ticks tiků neprůchodná (None = do konce běhu).
+    V mřížce obsazenosti se chová jako stojící pasažér, se kterým se nelze vyměnit.
+    Pasažér, který v buňce právě stojí, z ní normálně odejde, ale nikdo další nevstoupí.
+    """
+    def __init__(self, pos, ticks=None):
+        self.pos = tuple(pos)
+        self.ticks = ticks
+        self.blocked = False
+
+    def apply(self, simulation):
+        super().apply(simulation)
+        if not np.isfinite(simulation.matrix[self.pos]) or simulation.matrix[self.pos] != 0:
+            raise ValueError(f"Buňka {self.pos} není volná podlaha")
+        simulation.occupancy_grid.enter(self.pos)
+        self.blocked = True
+        self.release_tick = None if self.ticks is None else simulation.tick + self.ticks
+
+    def on_tick(self, simulation):
+        if self.blocked and self.release_tick is not None and simulation.tick >= self.release_tick:
+            simulation.occupancy_grid.leave(self.pos)
+            self.blocked = False
+
+def continuations(checkpoint, seeds, perturbations=None, max_ticks=None):
+    """
+    Pustí z checkpointu jedno pokračování pro každý seed a vrátí jejich celkové počty tiků.
+    perturbations je funkce (seed) -> seznam poruch, aby každé pokračování mělo vlastní instance.
+    """
+    ticks = []
+    for seed in seeds:
+        simulation = fork(checkpoint, seed, None if perturbations is None else perturbations(seed))
+        ticks.append(simulation.run_until_done(max_ticks)[0])
+    return ticks
+
+if __name__ == "__main__":
+    import argparse  # Jen pro spuštění ze skriptu
+
+    parser = argparse.ArgumentParser(description="Fork what-if continuations from a mid-run checkpoint")
+    parser.add_argument('--seat_rows', type=int, default=10)
+    parser.add_argument('--seat_in_row', type=int, nargs='+', default=[3, 3])
+    parser.add_argument('--door_choice', type=str, choices=['left', 'right', 'both'], default='both')
+    parser.add_argument('--layout', type=str, default=None, help='Cabin layout (overrides the three options above)')
+    parser.add_argument('--seating_strategy', type=str, default='random')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the shared prefix')
+    parser.add_argument('--at_tick', type=int, default=30, help='Tick at which the checkpoint is taken')
+    parser.add_argument('--forks', type=int, default=20, help='Number of continuations')
+    parser.add_argument('--late', type=int, default=0, help='Delay this many not yet spawned passengers in every fork')
+    parser.add_argument('--delay', type=int, default=30, help='Delay of a late passenger in ticks')
+    parser.add_argument('--block', type=int, nargs=2, default=None, metavar=('ROW', 'COL'),
+                        help='Block this aisle cell in every fork')
+    parser.add_argument('--block_ticks', type=int, default=20, help='How long the cell stays blocked')
+    parser.add_argument('--output', type=str, default=None, help='Save the checkpoint to this file')
+    args = parser.parse_args()
+
+    simulation = Simulation(seat_rows=args.seat_rows, seat_in_row=args.seat_in_row, door_choice=args.door_choice,
+                            layout=args.layout, seating_strategy=args.seating_strategy, seed=args.seed)
+    start = time.perf_counter()
+    while simulation.tick < args.at_tick and simulation.step():
+        pass
+    prefix_time = time.perf_counter() - start
+    checkpoint = take_checkpoint(simulation)
+    data = checkpoint.to_bytes()
+    print(f"Checkpoint v tiku {checkpoint.tick}: {len(simulation.passengers)} spawnovaných pasažérů, {len(data)} B")
+    if args.output:
+        checkpoint.save(args.output)
+
+    def perturbations(seed):
+        chosen = []
+        if args.late:
+            waiting = [seat for queue in checkpoint.state['seat_queues'] for seat in queue]
+            late = random.Random(seed).sample(waiting, min(args.late, len(waiting)))
+            chosen += [LatePassenger(seat, args.delay) for seat in late]
+        if args.block:
+            chosen.append(BlockedCell(args.block, args.block_ticks))
+        return chosen
+
+    seeds = range(args.seed + 1, args.seed + 1 + args.forks)
+    start = time.perf_counter()
+    baseline = continuations(checkpoint, seeds, max_ticks=50 * len(simulation.seat_positions))
+    disrupted = continuations(checkpoint, seeds, perturbations, max_ticks=50 * len(simulation.seat_positions))
+    forks_time = time.perf_counter() - start
+    print(f"Bez poruchy:  {np.mean(baseline):.1f} ± {np.std(baseline):.1f} tiků")
+    print(f"S poruchou:   {np.mean(disrupted):.1f} ± {np.std(disrupted):.1f} tiků "
+          f"(zpoždění {np.mean(np.array(disrupted) - baseline):+.1f} tiků na stejných seedech)")
+    print(f"Prefix {prefix_time * 1e3:.1f} ms, {2 * args.forks} pokračování {forks_time:.2f} s "
+          f"(bez checkpointu by se prefix počítal {2 * args.forks}x)")
@@ -0,0 +1,241 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict, deque
+
+import numpy as np
+
+# Funkce pro výpočet distance matrix pomocí BFS
+def compute_distance_matrix(matrix, seat_pos):
+    # Kontrola typu seat_pos
+    if not isinstance(seat_pos, tuple) or len(seat_pos) != 2:
+        raise ValueError(f"seat_pos musí být tuple se dvěma prvky, ale byl předán: {seat_pos} (type: {type(seat_pos)})")
+
+    # Kontrola platnosti seat_pos
+    x, y = seat_pos
+    if not (0 <= x < matrix.shape[0] and 0 <= y < matrix.shape[1]):
+        raise ValueError(f"seat_pos {seat_pos} je mimo rozsah matice s tvarem {matrix.shape}")
+
+    distance_matrix = np.full(matrix.shape, np.inf)
+    queue = deque()
+    queue.append((seat_pos, 0))
+    distance_matrix[seat_pos] = 0
+    while queue:
+        current, dist = queue.popleft()
+        neighbors = [
+            (current[0] - 1, current[1]),
+            (current[0] + 1, current[1]),
+            (current[0], current[1] - 1),
+            (current[0], current[1] + 1)
+        ]
+        for neighbor in neighbors:
+            if (0 <= neighbor[0] < matrix.shape[0] and
+                0 <= neighbor[1] < matrix.shape[1] and
+                matrix[neighbor] != np.inf and
+                distance_matrix[neighbor] > dist + 1):
+                distance_matrix[neighbor] = dist + 1
+                queue.append((neighbor, dist + 1))
+    return distance_matrix
+
+# Funkce pro výpočet distance matic pro více sedadel najednou (BFS po vrstvách nad bitovými množinami)
+def compute_distance_fields(matrix, seat_positions, out=None, chunk_size=1024):
+    """
+    Stejný výsledek jako compute_distance_matrix pro každé sedadlo, ale všechna sedadla
+    jednoho bloku se rozšiřují současně. Buňka drží bitovou množinu sedadel (uint64 slova),
+    jejichž fronta ji zasáhla, takže jeden krok BFS je pár operací nad polem
+    (řádky, sloupce, slova). Vzdálenost se počítá bitově rozloženým čítačem: v každém kroku
+    se všem dosud nenavštíveným buňkám přičte jednička.
+    """
+    if out is None:
+        out = np.empty((len(seat_positions),) + matrix.shape, dtype=np.float32)
+    rows, cols = matrix.shape
+    walkable = np.where(matrix != np.inf, ~np.uint64(0), np.uint64(0))[:, :, None]
+
+    for start in range(0, len(seat_positions), chunk_size):
+        seats = seat_positions[start:start + chunk_size]
+        for seat_pos in seats:
+            if not isinstance(seat_pos, tuple) or len(seat_pos) != 2:
+                raise ValueError(f"seat_pos musí být tuple se dvěma prvky, ale byl předán: {seat_pos} (type: {type(seat_pos)})")
+            if not (0 <= seat_pos[0] < matrix.shape[0] and 0 <= seat_pos[1] < matrix.shape[1]):
+                raise ValueError(f"seat_pos {seat_pos} je mimo rozsah matice s tvarem {matrix.shape}")
+
+        count = len(seats)
+        frontier = np.zeros((rows, cols, (count + 63) // 64), dtype=np.uint64)
+        for k, (x, y) in enumerate(seats):
+            frontier[x, y, k >> 6] |= np.uint64(1) << np.uint64(k & 63)
+        visited = frontier.copy()
+        grown = np.empty_like(frontier)
+        carry = np.empty_like(frontier)
+        spare = np.empty_like(frontier)
+        planes = []  # Bity čítače vzdálenosti, nejnižší první
+
+        dist = 0
+        while True:
+            # Přičtení jedničky nenavštíveným buňkám (čítač v kroku dist nepřesáhne dist)
+            dist += 1
+            if dist.bit_length() > len(planes):
+                planes.append(np.zeros_like(frontier))
+            np.invert(visited, out=carry)
+            for plane in planes:
+                np.bitwise_and(plane, carry, out=spare)
+                plane ^= carry
+                carry[...] = spare
+
+            grown.fill(0)
+            grown[1:, :] |= frontier[:-1, :]
+            grown[:-1, :] |= frontier[1:, :]
+            grown[:, 1:] |= frontier[:, :-1]
+            grown[:, :-1] |= frontier[:, 1:]
+            grown &= walkable
+            np.invert(visited, out=spare)
+            np.bitwise_and(grown, spare, out=frontier)
+            if not frontier.any():
+                break
+            visited |= frontier
+
+        # Rozbalení bitů na (řádky, sloupce, sedadla), nenavštívené buňky jsou nedosažitelné
+        def unpack(bits):
+            return np.unpackbits(bits.view(np.uint8), axis=-1, bitorder='little')[..., :count]
+        fields = np.zeros((rows, cols, count), dtype=out.dtype)
+        for bit, plane in enumerate(planes):
+            fields += unpack(plane) * out.dtype.type(1 << bit)
+        fields[unpack(visited) == 0] = np.inf
+        out[start:start + count] = fields.transpose(2, 0, 1)
+    return out
+
+# Otisk rozložení letadla - stejná matice dává stejný klíč napříč běhy i procesy
+def layout_fingerprint(matrix):
+    digest = hashlib.sha1()
+    digest.update(str(matrix.shape).encode())
+    digest.update(str(matrix.dtype).encode())
+    digest.update(np.ascontiguousarray(matrix).tobytes())
+    return digest.hexdigest()[:16]
+
+# Třída DistanceFieldCache - sdílená cache distance matic (výsledků BFS)
+class DistanceFieldCache:
+    """
+    LRU cache distance matic klíčovaná otiskem rozložení a pozicí sedadla.
+    Vrácené matice jsou pouze pro čtení, takže je může sdílet více pasažérů.
+
+    Kromě jednotlivých matic umí předpočítat matice pro všechna sedadla najednou
+    (precompute) a uložit je na disk jako memory-mapped .npy soubor, který se
+    při dalším běhu jen namapuje a BFS se vůbec nespouští. Předpočítaných tabulek
+    drží nanejvýš max_tables (také LRU).
+    """
+    def __init__(self, max_entries=1024, cache_dir=None, max_tables=4):
+        self.max_entries = max_entries
+        self.max_tables = max_tables
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()  # (fingerprint, seat_pos) : distance matrix
+        self.tables = OrderedDict()  # fingerprint : (seat_pos : index, stacked distance matrices)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, matrix, seat_pos, fingerprint=None):
+        if fingerprint is None:
+            fingerprint = layout_fingerprint(matrix)
+
+        # Předpočítaná tabulka pro celé rozložení
+        table = self.tables.get(fingerprint)
+        if table is not None:
+            seat_index, fields = table
+            index = seat_index.get(seat_pos)
+            if index is not None:
+                self.hits += 1
+                self.tables.move_to_end(fingerprint)
+                return fields[index]
+
+        key = (fingerprint, seat_pos)
+        distance_matrix = self.entries.get(key)
+        if distance_matrix is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return distance_matrix
+
+        self.misses += 1
+        distance_matrix = compute_distance_matrix(matrix, seat_pos)
+        distance_matrix.flags.writeable = False
+        self.entries[key] = distance_matrix
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)  # Vyhození nejdéle nepoužité matice
+        return distance_matrix
+
+    def precompute(self, matrix, seat_positions, fingerprint=None):
+        """
+        Spočítá (nebo načte z cache_dir) distance matice pro všechna sedadla
+        rozložení najednou. Vrací pole tvaru (počet sedadel, *matrix.shape).
+        """
+        if fingerprint is None:
+            fingerprint = layout_fingerprint(matrix)
+        seat_positions = [tuple(seat) for seat in seat_positions]
+
+        table = self.tables.get(fingerprint)
+        if table is not None and all(seat in table[0] for seat in seat_positions):
+            self.tables.move_to_end(fingerprint)
+            return table[1]
+
+        fields = None
+        if self.cache_dir is not None:
+            fields, seat_positions = self._load(fingerprint, matrix.shape, seat_positions)
+
+        if fields is None:
+            if self.cache_dir is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                fields_path, seats_path = self._paths(fingerprint)
+                # Vlastní dočasný soubor pro každý proces - souběžné workery si ho nepřepíšou
+                descriptor, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+                os.close(descriptor)
+                fields = np.lib.format.open_memmap(temp_path, mode='w+', dtype=np.float32,
+                                                   shape=(len(seat_positions),) + matrix.shape)
+            else:
+                fields = np.empty((len(seat_positions),) + matrix.shape, dtype=np.float32)
+
+            self.misses += len(seat_positions)
+            compute_distance_fields(matrix, seat_positions, out=fields)
+
+            if self.cache_dir is not None:
+                fields.flush()
+                del fields
+                descriptor, temp_seats_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+                with os.fdopen(descriptor, 'wb') as f:
+                    np.save(f, np.array(seat_positions, dtype=np.int32).reshape(-1, 2))
+                os.replace(temp_seats_path, seats_path)
+                os.replace(temp_path, fields_path)  # Atomicky - souběžné procesy nevidí půlku souboru
+                fields = np.load(fields_path, mmap_mode='r')
+            else:
+                fields.flags.writeable = False
+
+        seat_index = {seat: index for index, seat in enumerate(seat_positions)}
+        self.tables[fingerprint] = (seat_index, fields)
+        self.tables.move_to_end(fingerprint)
+        while len(self.tables) > max(self.max_tables, 1):  # Právě spočítaná tabulka zůstává
+            self.tables.popitem(last=False)  # Vyhození nejdéle nepoužité tabulky
+        return fields
+
+    def release(self, fingerprint):
+        # Uvolní předpočítanou tabulku rozložení (např. po stavbě RoutingTable), matice na disku zůstávají
+        self.tables.pop(fingerprint, None)
+
+    def clear(self):
+        self.entries.clear()
+        self.tables.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _paths(self, fingerprint):
+        base = os.path.join(self.cache_dir, f"distances-{fingerprint}")
+        return base + '.fields.npy', base + '.seats.npy'
+
+    def _load(self, fingerprint, shape, seat_positions):
+        fields_path, seats_path = self._paths(fingerprint)
+        if not (os.path.exists(fields_path) and os.path.exists(seats_path)):
+            return None, seat_positions
+
+        stored_seats = [tuple(seat) for seat in np.load(seats_path).tolist()]
+        fields = np.load(fields_path, mmap_mode='r')
+        if fields.shape[1:] != shape or not set(seat_positions) <= set(stored_seats):
+            return None, seat_positions
+        return fields, stored_seats
+
+# Sdílená cache pro všechny simulace v jednom procesu
+default_cache = DistanceFieldCache()
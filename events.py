@@ -0,0 +1,137 @@
+import sys
+from collections import deque, namedtuple
+from enum import IntEnum
+
+# Úrovně logování (stejné hodnoty jako v modulu logging)
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR, 'off': OFF}
+
+# Typy událostí simulace
+class EventType(IntEnum):
+    SPAWN = 1
+    BAGGAGE_START = 2
+    BAGGAGE_STEP = 3
+    BAGGAGE_FINISH = 4
+    BLOCKED = 5
+    SWAP_START = 6
+    SWAP_STEP = 7
+    SWAP_FINISH = 8
+    SEATED = 9
+    NO_MOVE = 10
+    INVALID_MOVE = 11
+    ROUTE_ERROR = 12
+    ALL_SEATED = 13
+
+# Úroveň každého typu - odpočty kroků jsou nejčastější, proto DEBUG
+EVENT_LEVELS = {
+    EventType.SPAWN: INFO,
+    EventType.BAGGAGE_START: INFO,
+    EventType.BAGGAGE_STEP: DEBUG,
+    EventType.BAGGAGE_FINISH: INFO,
+    EventType.BLOCKED: DEBUG,
+    EventType.SWAP_START: INFO,
+    EventType.SWAP_STEP: DEBUG,
+    EventType.SWAP_FINISH: INFO,
+    EventType.SEATED: INFO,
+    EventType.NO_MOVE: DEBUG,
+    EventType.INVALID_MOVE: WARNING,
+    EventType.ROUTE_ERROR: ERROR,
+    EventType.ALL_SEATED: INFO,
+}
+
+# Jedna událost: tik, typ, id pasažéra, jeho pozice a doplňující údaj podle typu
+# (sedadlo, zbývající kroky, cílová buňka, (id druhého pasažéra, doba výměny), ...)
+Event = namedtuple('Event', ['tick', 'type', 'ped_id', 'pos', 'data'])
+
+# Texty ve stejném znění jako původní výpisy simulace
+MESSAGES = {
+    EventType.SPAWN: lambda e: f"Spawning passenger {e.ped_id} at door {e.pos} with seat {e.data}",
+    EventType.BAGGAGE_START: lambda e: f"Passenger {e.ped_id} started storing baggage at column {e.pos[1]}",
+    EventType.BAGGAGE_STEP: lambda e: f"Passenger {e.ped_id} storing baggage, steps remaining: {e.data}",
+    EventType.BAGGAGE_FINISH: lambda e: f"Passenger {e.ped_id} finished storing baggage",
+    EventType.BLOCKED: lambda e: f"Passenger {e.ped_id} blocked from moving to {e.data}",
+    EventType.SWAP_START: lambda e: f"Passenger {e.ped_id} is swapping with {e.data[0]} for duration: {e.data[1]}",
+    EventType.SWAP_STEP: lambda e: f"Passenger {e.ped_id} swapping, steps remaining: {e.data}",
+    EventType.SWAP_FINISH: lambda e: f"Passenger {e.ped_id} swapped",
+    EventType.SEATED: lambda e: f"Passenger {e.ped_id} seated at {e.pos}",
+    EventType.NO_MOVE: lambda e: f"Passenger {e.ped_id} has no valid moves and stays at {e.pos}",
+    EventType.INVALID_MOVE: lambda e: f"Warning: Passenger {e.ped_id} has next_move set to None or invalid. Staying in place.",
+    EventType.ROUTE_ERROR: lambda e: f"Chyba při hledání cesty pro sedadlo {e.data}",
+    EventType.ALL_SEATED: lambda e: "Všichni pasažéři byli přiřazeni a dosáhli svých sedadel.",
+}
+
+def format_event(event):
+    return f"[{event.tick}] {MESSAGES[event.type](event)}"
+
+# Sinky - kam se události posílají
+class NullSink:
+    """
+    Události zahodí. EventLog jen s NullSink je vypnutý (enabled == False).
+    """
+    def write(self, event):
+        pass
+
+class PrintSink:
+    """
+    Vypíše událost jako řádek textu (výchozí sys.stdout).
+    """
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write(self, event):
+        print(format_event(event), file=self.stream or sys.stdout)
+
+class RingBufferSink:
+    """
+    Drží posledních capacity událostí v paměti, starší zahazuje.
+    """
+    def __init__(self, capacity=10000):
+        self.events = deque(maxlen=capacity)
+
+    def write(self, event):
+        self.events.append(event)
+
+    def of_type(self, event_type):
+        return [event for event in self.events if event.type == event_type]
+
+    def clear(self):
+        self.events.clear()
+
+# Třída EventLog - rozesílá události simulace do sinků
+class EventLog:
+    """
+    Simulace se před každým voláním emit ptá na atribut enabled - jediné čtení
+    atributu, takže vypnuté logování v tiku nic nestojí. Úroveň se filtruje až v emit.
+    Tik události doplňuje simulace přes atribut tick.
+    """
+    def __init__(self, sinks=None, level=INFO):
+        self.sinks = list(sinks) if sinks else []
+        self.tick = 0
+        self.set_level(level)
+
+    def set_level(self, level):
+        self.level = LEVELS[level] if isinstance(level, str) else level
+        self.update_enabled()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        self.update_enabled()
+
+    def update_enabled(self):
+        self.active_sinks = [sink for sink in self.sinks if not isinstance(sink, NullSink)]
+        self.enabled = bool(self.active_sinks) and self.level < OFF
+
+    def emit(self, event_type, ped_id=None, pos=None, data=None):
+        if EVENT_LEVELS[event_type] < self.level:
+            return
+        event = Event(self.tick, event_type, ped_id, pos, data)
+        for sink in self.active_sinks:
+            sink.write(event)
+
+# Vypnutý log pro pasažéry vytvořené mimo simulaci
+NULL_LOG = EventLog([NullSink()], level=OFF)
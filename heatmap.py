@@ -0,0 +1,144 @@
+import json
+
+import numpy as np
+
+# Vrstvy heatmapy - počty tiků, které pasažéři v buňce strávili:
+# occupancy = stál tam nesedící pasažér, blocked = chtěl jít dál a nemohl (lepší soused obsazený
+# nebo prohraný konflikt o buňku), swapping = vyměňoval se v uličce, storing = ukládal zavazadlo
+LAYER_OCCUPANCY = 0
+LAYER_BLOCKED = 1
+LAYER_SWAPPING = 2
+LAYER_STORING = 3
+
+LAYERS = ['occupancy', 'blocked', 'swapping', 'storing']
+
+# Třída CongestionHeatmap - počty tiků v každé buňce matice letadla, sčítané přes běhy
+class CongestionHeatmap:
+    """
+    Simulace s heatmap=CongestionHeatmap() v každém tiku připíše buňky pasažérů
+    do vrstev (add_cells - jeden np.add.at na vrstvu, žádné počítadlo na pasažéra).
+    Objektový engine přičte obsazenost celou mřížkou (add_grid), pozice ostatních
+    vrstev (add_positions) se hromadí v seznamech a do polí se přičtou po blocích
+    flush_size pozic. Jednu heatmapu může sdílet víc běhů
+    i replik EnsembleSimulation, heatmapy z různých procesů se sloučí přes merge.
+    Bez heatmapy simulace jen porovná self.heatmap s None.
+    """
+    def __init__(self, shape=None, flush_size=65536):
+        self.shape = None
+        self.counts = None  # (vrstva, buňka) - buňky ploše po řádcích matice
+        self.runs = 0
+        self.flush_size = flush_size
+        self.pending = [[] for _ in LAYERS]  # Dosud nepřičtené pozice (řádek, sloupec) s váhou 1
+        if shape is not None:
+            self.allocate(shape)
+
+    def allocate(self, shape):
+        self.shape = tuple(shape)
+        self.counts = np.zeros((len(LAYERS), self.shape[0] * self.shape[1]), dtype=np.int64)
+
+    def check_shape(self, shape):
+        # Volá Simulation.__init__ - první simulace určí tvar, další ho musí mít stejný
+        if self.shape is None:
+            self.allocate(shape)
+        elif self.shape != tuple(shape):
+            raise ValueError(f"Heatmapa má tvar {self.shape}, simulace {tuple(shape)}")
+
+    def begin_run(self, simulation):
+        # Volá simulace na začátku běhu - EnsembleSimulation přidá všechny své repliky
+        self.check_shape(simulation.matrix.shape)
+        self.runs += getattr(simulation, 'replicas', 1)
+
+    def add_cells(self, layer, cells, ticks=1):
+        # cells = ploché indexy buněk (řádek * počet sloupců + sloupec), mohou se opakovat
+        if len(cells):
+            np.add.at(self.counts[layer], cells, ticks)
+
+    def add_grid(self, layer, grid, ticks=1):
+        # grid = počty pro všechny buňky ploše po řádcích (např. OccupancyGrid.cells())
+        if ticks == 1:
+            self.counts[layer] += grid
+        else:
+            self.counts[layer] += grid.astype(np.int64) * ticks
+
+    def add_positions(self, layer, positions, ticks=1):
+        # positions = seznam dvojic (řádek, sloupec)
+        if ticks != 1:
+            self.flush_layer(layer, positions, ticks)
+            return
+        pending = self.pending[layer]
+        pending.extend(positions)
+        if len(pending) >= self.flush_size:
+            self.flush_layer(layer, pending)
+            self.pending[layer] = []
+
+    def flush_layer(self, layer, positions, ticks=1):
+        if positions:
+            positions = np.array(positions, dtype=np.int64)
+            self.add_cells(layer, positions[:, 0] * self.shape[1] + positions[:, 1], ticks)
+
+    def flush(self):
+        # Přičte nahromaděné pozice - volají ho všechny metody, které čtou counts
+        for layer, pending in enumerate(self.pending):
+            if pending:
+                self.flush_layer(layer, pending)
+                self.pending[layer] = []
+
+    def merge(self, other):
+        if other.shape is None:
+            return self
+        if self.shape is None:
+            self.allocate(other.shape)
+        elif self.shape != other.shape:
+            raise ValueError(f"Nelze sloučit heatmapy tvaru {self.shape} a {other.shape}")
+        self.flush()
+        other.flush()
+        self.counts += other.counts
+        self.runs += other.runs
+        return self
+
+    def layer(self, name):
+        """
+        Vrací matici tvaru Airplane.matrix s počty tiků vrstvy name (součet přes běhy).
+        """
+        self.flush()
+        return self.counts[LAYERS.index(name)].reshape(self.shape)
+
+    def per_run(self, name):
+        # Průměrný počet tiků na jeden běh
+        return self.layer(name) / max(self.runs, 1)
+
+    def to_dict(self):
+        return {'shape': list(self.shape), 'runs': self.runs,
+                'layers': {name: self.layer(name).tolist() for name in LAYERS}}
+
+    @classmethod
+    def from_dict(cls, data):
+        heatmap = cls(data['shape'])
+        heatmap.runs = data['runs']
+        for k, name in enumerate(LAYERS):
+            heatmap.counts[k] = np.array(data['layers'][name], dtype=np.int64).ravel()
+        return heatmap
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+def save_heatmaps(heatmaps, path):
+    # {klíč (např. strategie): CongestionHeatmap} do jednoho JSON
+    with open(path, 'w') as f:
+        json.dump({key: heatmap.to_dict() for key, heatmap in heatmaps.items()}, f)
+
+def load_heatmaps(path):
+    """
+    Načte soubor ze save_heatmaps nebo CongestionHeatmap.save. Vrací {klíč: CongestionHeatmap}.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if 'layers' in data:
+        return {'heatmap': CongestionHeatmap.from_dict(data)}
+    return {key: CongestionHeatmap.from_dict(value) for key, value in data.items()}
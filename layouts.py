@@ -0,0 +1,235 @@
+import json
+from collections import namedtuple
+
+import numpy as np
+
+# Hodnoty buněk matice letadla
+WALL = np.inf
+FLOOR = 0
+DOOR = -1
+SEAT = -3
+
+# Typy dveří a násobek spawn_interval simulace - nástupní most je rychlejší než schody,
+# zavřené dveře v letadle jsou (buňka dveří), ale nikdo jimi nenastupuje
+DOOR_KINDS = {'bridge': 1, 'stairs': 2, 'closed': None}
+SIDES = ['bottom', 'top']  # Strana trupu (řádek cols - 1, resp. 0 v transponované matici)
+
+# Dveře letadla:
+# position - příčná ulička, ve které dveře jsou: 0 = před první řadou sedadel,
+#            k = mezi řadami k - 1 a k, seat_rows = za poslední řadou
+# spawn_interval - vlastní interval spawnu v tikách (None = podle kind)
+Door = namedtuple('Door', ['position', 'side', 'kind', 'spawn_interval'])
+Door.__new__.__defaults__ = ('bottom', 'bridge', None)
+
+# Třída CabinLayout - popis kabiny, ze kterého Airplane staví matici
+class CabinLayout:
+    """
+    seat_rows řad sedadel, sekce seat_in_row oddělené podélnými uličkami a libovolný
+    počet dveří na přídi, zádi i uprostřed kabiny (na obou stranách). Každé dveře
+    přidají příčnou uličku, která vede od dveří přes všechny podélné uličky.
+    Lze sestavit přímo, z textu (parse_layout) nebo z JSON (load_layout).
+    """
+    def __init__(self, seat_rows=32, seat_in_row=(3, 3), doors=None, name=None):
+        self.seat_rows = int(seat_rows)
+        self.seat_in_row = [int(seats) for seats in seat_in_row]
+        if doors is None:
+            doors = [Door(0), Door(self.seat_rows)]
+        self.doors = [door if isinstance(door, Door) else Door(**door) for door in doors]
+        self.name = name
+        self.validate()
+
+    def validate(self):
+        if self.seat_rows < 1:
+            raise ValueError(f"seat_rows musí být alespoň 1, ne {self.seat_rows}")
+        if len(self.seat_in_row) < 2 or min(self.seat_in_row) < 1:
+            raise ValueError(f"Kabina potřebuje alespoň dvě neprázdné sekce (jednu uličku), ne {self.seat_in_row}")
+        if not self.doors:
+            raise ValueError("Kabina nemá žádné dveře")
+        seen = set()
+        for door in self.doors:
+            if not 0 <= door.position <= self.seat_rows:
+                raise ValueError(f"Pozice dveří {door.position} je mimo 0..{self.seat_rows}")
+            if door.side not in SIDES:
+                raise ValueError(f"Neznámá strana dveří {door.side}, dostupné: {', '.join(SIDES)}")
+            if door.kind not in DOOR_KINDS:
+                raise ValueError(f"Neznámý typ dveří {door.kind}, dostupné: {', '.join(DOOR_KINDS)}")
+            if (door.position, door.side) in seen:
+                raise ValueError(f"Dvoje dveře na stejném místě ({door.position}, {door.side})")
+            seen.add((door.position, door.side))
+        if not self.boarding_doors():
+            raise ValueError("Všechny dveře jsou zavřené")
+
+    @classmethod
+    def from_door_choice(cls, seat_rows=32, seat_in_row=(3, 3), door_choice='left'):
+        """
+        Původní rozložení Airplane: dveře vpředu a vzadu na spodní straně,
+        door_choice vybírá, kterými se nastupuje (left = přední, right = zadní, both = obě).
+        """
+        front = 'bridge' if door_choice in ('left', 'both') else 'closed'
+        rear = 'bridge' if door_choice in ('right', 'both') else 'closed'
+        return cls(seat_rows, seat_in_row, [Door(0, kind=front), Door(seat_rows, kind=rear)])
+
+    @property
+    def n_seats(self):
+        return self.seat_rows * sum(self.seat_in_row)
+
+    def boarding_doors(self):
+        return [door for door in self.doors if DOOR_KINDS[door.kind] is not None]
+
+    def door_interval(self, door, spawn_interval=1):
+        if door.spawn_interval is not None:
+            return door.spawn_interval
+        return spawn_interval * DOOR_KINDS[door.kind]
+
+    def build(self):
+        """
+        Vrací (matrix, door_positions, seat_positions, door_specs) - první tři ve stejném
+        tvaru a pořadí jako původní Airplane.initialize_matrix. door_positions obsahuje
+        jen dveře, kterými se nastupuje (zavřené zůstanou v matici jako buňky dveří),
+        door_specs je Door pro každou z nich.
+        """
+        sections = self.seat_in_row
+        rows = 2 + len(sections) - 1 + sum(sections)
+
+        # Řádky matice (napříč trupem): sedadla sekcí a uličky mezi nimi
+        seat_lanes = []
+        aisles = []
+        lane = 1
+        for section_index, seats in enumerate(sections):
+            seat_lanes.extend(range(lane, lane + seats))
+            lane += seats
+            if section_index < len(sections) - 1:
+                aisles.append(lane)
+                lane += 1
+
+        # Sloupce matice (podél trupu): zeď, příčná ulička, zeď, řada, zeď, ..., příčná ulička, zeď
+        cross_positions = sorted({door.position for door in self.doors} | {0, self.seat_rows})
+        kinds = [0]  # 0 = vnější zeď, 1 = přepážka mezi řadami, 2 = řada sedadel, 3 = příčná ulička
+        cross_columns = {}
+        for k in range(self.seat_rows + 1):
+            if k in cross_positions:
+                if k > 0:
+                    kinds.append(1)
+                cross_columns[k] = len(kinds)
+                kinds.append(3)
+            kinds.append(1)
+            if k < self.seat_rows:
+                kinds.append(2)
+        kinds[-1] = 0
+        kinds = np.array(kinds)
+
+        matrix = np.full((rows, len(kinds)), WALL)
+        body = (kinds == 1) | (kinds == 2)
+        matrix[np.ix_(aisles, np.flatnonzero(body))] = FLOOR  # Podélné uličky vedou přes přepážky
+        matrix[np.ix_(seat_lanes, np.flatnonzero(kinds == 2))] = SEAT
+
+        # Příčné uličky spojují všechny podélné uličky a dveře
+        for position, col in cross_columns.items():
+            doors = [door for door in self.doors if door.position == position]
+            low, high = aisles[0], aisles[-1]
+            if any(door.side == 'top' for door in doors):
+                low = 1
+            if any(door.side == 'bottom' for door in doors):
+                high = rows - 2
+            matrix[low:high + 1, col] = FLOOR
+            for door in doors:
+                matrix[0 if door.side == 'top' else rows - 1, col] = DOOR
+
+        # Stejné pořadí jako původní průchody maticí: dveře po sloupcích, sedadla po řádcích
+        boarding = {(0 if door.side == 'top' else rows - 1, cross_columns[door.position]): door
+                    for door in self.boarding_doors()}
+        door_positions = [(int(i), int(j)) for j, i in np.argwhere(matrix.T == DOOR) if (i, j) in boarding]
+        seat_positions = [(int(i), int(j)) for i, j in np.argwhere(matrix == SEAT)]
+        return matrix, door_positions, seat_positions, [boarding[door] for door in door_positions]
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'seat_rows': self.seat_rows,
+            'seat_in_row': list(self.seat_in_row),
+            'doors': [door._asdict() for door in self.doors],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['seat_rows'], data['seat_in_row'], data.get('doors'), data.get('name'))
+
+    def __repr__(self):
+        return f"CabinLayout({format_layout(self)!r})"
+
+# Kompaktní textový popis: "60x3-4-3 front rear 20:top:stairs 40::stairs:3"
+# Dveře: pozice[:strana[:typ[:interval]]], pozice je front, rear nebo číslo příčné uličky
+def parse_layout(text, name=None):
+    tokens = text.split()
+    if not tokens:
+        raise ValueError("Prázdný popis kabiny")
+    try:
+        seat_rows, sections = tokens[0].split('x')
+        seat_rows = int(seat_rows)
+        seat_in_row = [int(seats) for seats in sections.split('-')]
+    except ValueError:
+        raise ValueError(f"Chybný rozměr kabiny {tokens[0]!r}, očekáváno např. 32x3-3")
+
+    doors = []
+    for token in tokens[1:]:
+        fields = token.split(':')
+        if len(fields) > 4:
+            raise ValueError(f"Chybný popis dveří {token!r}")
+        position = {'front': 0, 'rear': seat_rows}.get(fields[0])
+        if position is None:
+            try:
+                position = int(fields[0])
+            except ValueError:
+                raise ValueError(f"Chybná pozice dveří {fields[0]!r}")
+        fields = fields[1:] + [''] * (4 - len(fields))
+        side, kind, interval = fields[0] or 'bottom', fields[1] or 'bridge', fields[2]
+        doors.append(Door(position, side, kind, int(interval) if interval else None))
+    return CabinLayout(seat_rows, seat_in_row, doors or None, name)
+
+FORMAT_DEFAULTS = [None, 'bottom', 'bridge', '']
+
+def format_layout(layout):
+    tokens = [f"{layout.seat_rows}x{'-'.join(map(str, layout.seat_in_row))}"]
+    for door in layout.doors:
+        position = {0: 'front', layout.seat_rows: 'rear'}.get(door.position, str(door.position))
+        fields = [position, door.side, door.kind, '' if door.spawn_interval is None else str(door.spawn_interval)]
+        while len(fields) > 1 and fields[-1] in ('', FORMAT_DEFAULTS[len(fields) - 1]):
+            fields.pop()  # Výchozí hodnoty na konci se vynechají
+        if len(fields) > 2 and fields[1] == 'bottom':
+            fields[1] = ''
+        tokens.append(':'.join(fields))
+    return ' '.join(tokens)
+
+def load_layout(source):
+    """
+    Načte kabinu ze jména v LAYOUTS, ze souboru .json (to_dict) nebo z textového
+    souboru či řetězce v kompaktním formátu (parse_layout).
+    """
+    if isinstance(source, CabinLayout):
+        return source
+    if source in LAYOUTS:
+        return LAYOUTS[source]
+    if source.endswith('.json'):
+        with open(source) as f:
+            return CabinLayout.from_dict(json.load(f))
+    if source.endswith('.txt'):
+        with open(source) as f:
+            lines = [line.split('#')[0].strip() for line in f]
+        return parse_layout(' '.join(line for line in lines if line), name=source)
+    return parse_layout(source)
+
+def save_layout(layout, path):
+    with open(path, 'w') as f:
+        if path.endswith('.json'):
+            json.dump(layout.to_dict(), f, indent=2)
+        else:
+            f.write(format_layout(layout) + '\n')
+
+# Předdefinované kabiny (jedna paluba, počty sedadel podle typických konfigurací)
+LAYOUTS = {
+    'a320': CabinLayout(30, [3, 3], [Door(0), Door(30, kind='stairs')], name='a320'),
+    'b767': CabinLayout(35, [2, 3, 2], [Door(0), Door(12), Door(35, kind='stairs')], name='b767'),
+    'b777': CabinLayout(42, [3, 4, 3], [Door(0), Door(10), Door(26), Door(42, kind='stairs')], name='b777'),
+    'a380': CabinLayout(85, [3, 4, 3], [Door(0), Door(20), Door(45), Door(65, kind='stairs'),
+                                        Door(85, kind='stairs'), Door(45, 'top', 'stairs')], name='a380'),
+}
@@ -1,189 +1,160 @@
-from random import randint
-
 import numpy as np
-import matplotlib.pyplot as plt
-import pygame
 import random
-from collections import deque, defaultdict
-import argparse
+from collections import defaultdict
 import time
 
-# Funkce pro výpočet distance matrix pomocí BFS
-def compute_distance_matrix(matrix, seat_pos):
-    # Kontrola typu seat_pos
-    if not isinstance(seat_pos, tuple) or len(seat_pos) != 2:
-        raise ValueError(f"seat_pos musí být tuple se dvěma prvky, ale byl předán: {seat_pos} (type: {type(seat_pos)})")
-
-    # Kontrola platnosti seat_pos
-    x, y = seat_pos
-    if not (0 <= x < matrix.shape[0] and 0 <= y < matrix.shape[1]):
-        raise ValueError(f"seat_pos {seat_pos} je mimo rozsah matice s tvarem {matrix.shape}")
-
-    distance_matrix = np.full(matrix.shape, np.inf)
-    queue = deque()
-    queue.append((seat_pos, 0))
-    distance_matrix[seat_pos] = 0
-    while queue:
-        current, dist = queue.popleft()
-        neighbors = [
-            (current[0] - 1, current[1]),
-            (current[0] + 1, current[1]),
-            (current[0], current[1] - 1),
-            (current[0], current[1] + 1)
-        ]
-        for neighbor in neighbors:
-            if (0 <= neighbor[0] < matrix.shape[0] and
-                0 <= neighbor[1] < matrix.shape[1] and
-                matrix[neighbor] != np.inf and
-                distance_matrix[neighbor] > dist + 1):
-                distance_matrix[neighbor] = dist + 1
-                queue.append((neighbor, dist + 1))
-    return distance_matrix
+from distance_cache import default_cache, layout_fingerprint
+from events import LEVELS, NULL_LOG, EventLog, EventType, PrintSink
+from heatmap import LAYER_BLOCKED, LAYER_OCCUPANCY, LAYER_STORING, LAYER_SWAPPING, LAYERS, CongestionHeatmap, load_heatmaps
+from layouts import CabinLayout, load_layout
+from random_streams import STREAM_CONFLICT, STREAM_MOVE, STREAM_PASSENGERS, STREAM_SEAT_ORDER, simulation_streams
+from profiling import (PHASE_APPLY, PHASE_CONFLICTS, PHASE_DECIDE, PHASE_OBSERVERS, PHASE_SPAWN, PHASE_SWAPPING,
+                       PhaseProfiler)
+from routing import DIRECTIONS, MASK_DIRECTIONS, get_routing_table, next_hop_masks
+from strategies import STRATEGIES, build_plan, load_strategy
 
 # Třída Airplane pro správu matice letadla
 class Airplane:
-    def __init__(self, seat_rows=32, seat_in_row=[3, 3], door_choice='left'):
-        self.seat_rows = seat_rows
-        self.seat_in_row = seat_in_row
+    """
+    Matici staví CabinLayout (layouts.py). Bez layout vznikne původní kabina s dveřmi
+    vpředu a vzadu, door_choice vybírá, kterými se nastupuje. S layout se door_choice
+    ignoruje a nastupuje se všemi dveřmi, které nejsou zavřené.
+    """
+    def __init__(self, seat_rows=32, seat_in_row=[3, 3], door_choice='left', layout=None):
+        if layout is None:
+            layout = CabinLayout.from_door_choice(seat_rows, seat_in_row, door_choice)
+        self.layout = layout
+        self.seat_rows = layout.seat_rows
+        self.seat_in_row = layout.seat_in_row
         self.door_choice = door_choice
         self.matrix, self.door_positions, self.seat_positions = self.initialize_matrix()
 
     def initialize_matrix(self):
-        seat_rows = self.seat_rows
-        seat_in_row = self.seat_in_row
-        door_choice = self.door_choice
-
-        # Rozměry letadla
-        rows = 2 * seat_rows + 1  # Počet řad v hlavní části (včetně pruhů zdí)
-        aisle_count = len(seat_in_row) - 1  # Počet uliček mezi sekcemi
-        cols = 2 + aisle_count + sum(seat_in_row)  # Celkový počet sloupců (sedadla + uličky + plášť)
-
-        # Inicializace matice
-        matrix = np.zeros((rows, cols))  # 0 = volné místo (bílá)
-
-        # Každý sudý řádek je zeď (černý pruh)
-        for i in range(0, rows, 2):
-            matrix[i, :] = np.inf
-
-        # Přidání černých krajních sloupců (plášť letadla)
-        matrix[:, 0] = np.inf  # Levý kraj
-        matrix[:, -1] = np.inf  # Pravý kraj
-
-        # Logika pro sedadla a uličky
-        current_col = 1  # Začátek za levou zdí
-
-        for section_index, seats in enumerate(seat_in_row):
-            # Přidání sedadel pro danou sekci
-            for i in range(1, rows, 2):  # Sudé řádky jsou sedadla
-                for s in range(seats):
-                    seat_pos = (i, current_col + s)
-                    matrix[seat_pos] = -3  # Sedadla označená jako -3
-
-            # Posun za sedadla
-            current_col += seats
-
-            # Přidání uličky (pokud není poslední sekce)
-            if section_index < aisle_count:
-                matrix[:, current_col] = 0  # Ulička
-                current_col += 1
-
-        # Přidání řádků nahoře a dole
-        top_row = np.full(cols, np.inf)  # Horní černý řádek
-        bottom_row = np.full(cols, np.inf)  # Dolní černý řádek
-        top_white_row = np.zeros(cols)  # Bílý řádek pod horní zdí
-        bottom_white_row = np.zeros(cols)  # Bílý řádek nad dolní zdí
-
-        # Umístění dveří na krajích bílých řádků
-        top_white_row[-1] = -1  # Dveře nahoře
-        bottom_white_row[-1] = -1  # Dveře dole
-        top_white_row[:seat_in_row[0] + 1] = np.inf  # Zeď vlevo nahoře
-        bottom_white_row[:seat_in_row[0] + 1] = np.inf  # Zeď vlevo dole
-
-        # Spojení do finální matice
-        matrix = np.vstack([top_row, top_white_row, matrix, bottom_white_row, bottom_row])
-
-        # Transpozice matice pro otočení o 90 stupňů doleva
-        matrix = matrix.T
-
-        # Identifikace dveří po transpozici
-        door_positions = []
-        for j in range(matrix.shape[1]):
-            for i in range(matrix.shape[0]):
-                if matrix[i, j] == -1:
-                    door_positions.append((i, j))
-
-        # Výběr dveří na základě volby
-        selected_doors = []
-        for pos in door_positions:
-            if door_choice == 'left' and pos[1] == 1:  # Levé dveře
-                selected_doors.append(pos)
-            elif door_choice == 'right' and pos[1] == matrix.shape[1] - 2:  # Pravé dveře
-                selected_doors.append(pos)
-            elif door_choice == 'both':
-                selected_doors.append(pos)
-
-        # Pokud žádné dveře nebyly nalezeny podle výběru, použijeme všechny
-        if not selected_doors:
-            selected_doors = door_positions.copy()
-
-        # Identifikace seat_positions po transpozici
-        seat_positions = []
-        for i in range(matrix.shape[0]):
-            for j in range(matrix.shape[1]):
-                if matrix[i, j] == -3:
-                    seat_positions.append((i, j))
-
-        return matrix, selected_doors, seat_positions
+        matrix, door_positions, seat_positions, self.door_specs = self.layout.build()
+        return matrix, door_positions, seat_positions
+
+    def spawn_intervals(self, spawn_interval=1):
+        # Interval spawnu pro každé dveře (ve stejném pořadí jako door_positions)
+        return [self.layout.door_interval(door, spawn_interval) for door in self.door_specs]
+
+# Třída OccupancyGrid - průběžně udržovaná obsazenost buněk a počty usazených pasažérů
+class OccupancyGrid:
+    """
+    Mění se jen při spawnu, pohybu a usazení pasažéra, dotazy jsou O(1):
+    is_free(pos) - nestojí v buňce žádný nesedící pasažér (i dveře při spawnu),
+    blockers(current_pos, seat_pos) - počet usazených ve sloupci mezi uličkou a sedadlem.
+    Mřížka drží počty pasažérů, ne jejich id - po dokončené výměně nebo přesunu na sedadlo
+    mohou v buňce krátce stát dva pasažéři. Řádky jsou bytearray, takže cells() je
+    jedno spojení bufferů bez smyčky přes pasažéry (heatmapa).
+    """
+    def __init__(self, shape):
+        rows, cols = shape
+        self.counts = [bytearray(cols) for _ in range(rows)]
+        # seated_before[col][r] = počet usazených ve sloupci col v řádcích menších než r
+        self.seated_before = [[0] * (rows + 1) for _ in range(cols)]
+
+    def is_free(self, pos):
+        return self.counts[pos[0]][pos[1]] == 0
+
+    def enter(self, pos):
+        self.counts[pos[0]][pos[1]] += 1
+
+    def leave(self, pos):
+        self.counts[pos[0]][pos[1]] -= 1
+
+    def cells(self):
+        # Počty nesedících pasažérů ploše po řádcích matice (np.uint8)
+        return np.frombuffer(b''.join(self.counts), dtype=np.uint8)
+
+    def add_seated(self, seat_pos):
+        seat_row, seat_col = seat_pos
+        prefix = self.seated_before[seat_col]
+        for row in range(seat_row + 1, len(prefix)):
+            prefix[row] += 1
+
+    def blockers(self, current_pos, seat_pos):
+        if current_pos[1] != seat_pos[1]:
+            return 0
+        low, high = sorted((current_pos[0], seat_pos[0]))
+        if high - low < 2:
+            return 0
+        prefix = self.seated_before[seat_pos[1]]
+        return prefix[high] - prefix[low + 1]
+
+# Kódy stavu pasažéra pro trasování a vykreslování (jeden bajt na pasažéra)
+# Spodní 3 bity = stav, bit 3 = neuložené zavazadlo, bity 4-6 = směr desired_move při výměně (index v DIRECTIONS + 1)
+STATE_NOT_SPAWNED = 0
+STATE_WALKING = 1
+STATE_STORING = 2
+STATE_SWAPPING = 3
+STATE_SEATING = 4
+STATE_SEATED = 5
+STATE_MASK = 7
+FLAG_BAGGAGE = 8
+DIRECTION_SHIFT = 4
+DIRECTION_CODES = {direction: k + 1 for k, direction in enumerate(DIRECTIONS)}
 
 # Třída Passenger pro správu jednotlivých pasažérů
 class Passenger:
-    def __init__(self, ped_id, spawn_pos, seat_pos, distance_matrix, baggage_probability=0.6):
+    def __init__(self, ped_id, spawn_pos, seat_pos, distance_matrix=None, baggage_probability=0.6, route=None,
+                 events=None, rng=None, attributes=None):
         self.ped_id = ped_id
+        self.rng = random if rng is None else rng  # RandomStream simulace, bez ní globální random
+        self.events = NULL_LOG if events is None else events  # EventLog simulace
         self.current_pos = spawn_pos
         self.seat_pos = seat_pos
-        self.distance_matrix = distance_matrix
+        # route = next-hop masky ke svému sedadlu (pohled do sdílené RoutingTable)
+        if route is None:
+            route = next_hop_masks(distance_matrix[np.newaxis])[0]
+        self.route = route
         self.next_move = spawn_pos  # Inicializace next_move na spawn_pos
         self.seated = False  # Stav pasažéra
 
         self.desired_move = None  # a space where a passenger wants to move but can't because another passenger is standing there
         self.swapping = False
-        self.swapping_speed = random.randint(1, 3)
         self.swapping_progress = None
 
         self.seating_in_progress = False
         self.seating_steps_remaining = 0
 
+        # attributes = (rychlost výměny, má zavazadlo, kroky ukládání) předlosované simulací
+        if attributes is None:
+            swapping_speed = self.rng.randint(1, 3)
+            has_baggage = self.rng.random() < baggage_probability
+            attributes = (swapping_speed, has_baggage, self.rng.randint(1, 3) if has_baggage else 0)
+        self.swapping_speed, self.has_baggage, baggage_steps = attributes
+
         # Přiřazení zavazadla s pravděpodobností
-        self.has_baggage = random.random() < baggage_probability
-        if self.has_baggage:
-            self.baggage_steps_remaining = random.randint(1, 3)
-            self.baggage_stopped = False
+        self.baggage_steps_remaining = baggage_steps if self.has_baggage else 0
+        self.baggage_stopped = False
+
+    # Stav pasažéra jako jeden bajt (STATE_*, FLAG_BAGGAGE, směr výměny) - priorita stejná jako barvy ve vizualizaci
+    def state_code(self):
+        if self.seated:
+            code = STATE_SEATED
+        elif self.has_baggage and self.baggage_stopped:
+            code = STATE_STORING
+        elif self.swapping:
+            code = STATE_SWAPPING
+        elif self.seating_in_progress:
+            code = STATE_SEATING
         else:
-            self.baggage_steps_remaining = 0
-            self.baggage_stopped = False
+            code = STATE_WALKING
+
+        if self.has_baggage and self.baggage_steps_remaining != 0:
+            code |= FLAG_BAGGAGE
+        if self.swapping and self.desired_move:
+            direction = (self.desired_move[0] - self.current_pos[0], self.desired_move[1] - self.current_pos[1])
+            code |= DIRECTION_CODES.get(direction, 0) << DIRECTION_SHIFT
+        return code
 
     # Slouží k vyhodnocení, zda není požadované sedadlo blokované
     # Např. pasažér sedící v uličce blokuje přístup k sedadlu u okna
-    def check_blocked_seats(self, current_pos, seat_pos, seat_status):
-        seat_row, seat_col = seat_pos
-        current_row, current_col = current_pos
-
-        if current_col != seat_col:
-            return False, 0
-
-        blocking_positions = []
-
-        for row in range(min(current_row, seat_row) + 1, max(current_row, seat_row)):
-            blocking_positions.append((row, seat_col))
-
-        blocking_count = 0
-        for pos in blocking_positions:
-            if seat_status[pos]:
-                blocking_count += 1
-
+    def check_blocked_seats(self, current_pos, seat_pos, occupancy):
+        blocking_count = occupancy.blockers(current_pos, seat_pos)
         return blocking_count > 0, blocking_count
 
-    def decide_move(self, occupied_positions, blocked_passengers, seat_status):
+    def decide_move(self, occupancy, blocked_passengers):
         if self.seated:
             self.next_move = self.current_pos  # Zůstat na místě, pokud je již seated
             return
@@ -195,16 +166,18 @@ class Passenger:
             if current_col == target_col:
                 # Zastaví se a začne ukládat zavazadlo
                 self.baggage_stopped = True
-                print(f"Passenger {self.ped_id} started storing baggage at column {current_col}")
+                if self.events.enabled:
+                    self.events.emit(EventType.BAGGAGE_START, self.ped_id, self.current_pos)
                 self.next_move = self.current_pos  # Zůstat na místě
                 return  # Nechce se pohybovat
 
         # Pokud má zavazadlo a je v procesu ukládání
         if self.has_baggage and self.baggage_stopped and self.baggage_steps_remaining > 0:
             self.baggage_steps_remaining -= 1
-            print(f"Passenger {self.ped_id} storing baggage, steps remaining: {self.baggage_steps_remaining}")
-            if self.baggage_steps_remaining == 0:
-                print(f"Passenger {self.ped_id} finished storing baggage")
+            if self.events.enabled:
+                self.events.emit(EventType.BAGGAGE_STEP, self.ped_id, self.current_pos, self.baggage_steps_remaining)
+                if self.baggage_steps_remaining == 0:
+                    self.events.emit(EventType.BAGGAGE_FINISH, self.ped_id, self.current_pos)
             self.next_move = self.current_pos  # Zůstat na místě
             return  # Nechce se pohybovat
 
@@ -216,51 +189,41 @@ class Passenger:
                 self.next_move = self.seat_pos
             return
 
-        seat_is_blocked, blocking_count = self.check_blocked_seats(self.current_pos, self.seat_pos, seat_status)
+        seat_is_blocked, blocking_count = self.check_blocked_seats(self.current_pos, self.seat_pos, occupancy)
         # Pokud je sedadlo blokované, doba do usazení se odvíjí od počtu blokujících pasažérů
         if seat_is_blocked:
             self.seating_in_progress = True
-            self.seating_steps_remaining = blocking_count * randint(3, 5)
+            self.seating_steps_remaining = blocking_count * self.rng.randint(3, 5)
             self.next_move = self.current_pos
             return
 
         if self.swapping:
             self.swapping_progress -= 1
-            print(f"Passenger {self.ped_id} swapping, steps remaining: {self.swapping_progress}")
+            if self.events.enabled:
+                self.events.emit(EventType.SWAP_STEP, self.ped_id, self.current_pos, self.swapping_progress)
             if self.swapping_progress == 0:
-                print(f"Passenger {self.ped_id} swapped")
+                if self.events.enabled:
+                    self.events.emit(EventType.SWAP_FINISH, self.ped_id, self.current_pos)
                 self.next_move = self.desired_move
                 self.desired_move = None
                 self.swapping_progress = None
                 self.swapping = False
             return
 
+        # Sousední buňky blíže k sedadlu (nahoru, dolů, vlevo, vpravo) - přímo z next-hop masky
         x, y = self.current_pos
-        min_dist = self.distance_matrix[x, y]
         candidates = []
-        # Sousední buňky (nahoru, dolů, vlevo, vpravo)
-        directions = [
-            (-1, 0),  # Nahoru
-            (1, 0),   # Dolů
-            (0, -1),  # Vlevo
-            (0, 1)    # Vpravo
-        ]
-        for dx, dy in directions:
-            nx, ny = x + dx, y + dy
-            if (0 <= nx < self.distance_matrix.shape[0] and
-                0 <= ny < self.distance_matrix.shape[1] and
-                self.distance_matrix[nx, ny] != np.inf):
-                    if self.distance_matrix[nx, ny] < min_dist:
-                        if (nx, ny) in occupied_positions:
-                            self.desired_move = (nx, ny)
-                            blocked_passengers[self.current_pos] = self
-                        else:  # if there isn't a passenger standing
-                            min_dist = self.distance_matrix[nx, ny]
-                            candidates = [(nx, ny)]
-                    elif self.distance_matrix[nx, ny] == min_dist:
-                        candidates.append((nx, ny))
+        for dx, dy in MASK_DIRECTIONS[self.route[x, y]]:
+            neighbour = (x + dx, y + dy)
+            if candidates:
+                candidates.append(neighbour)
+            elif not occupancy.is_free(neighbour):
+                self.desired_move = neighbour
+                blocked_passengers[self.current_pos] = self
+            else:  # if there isn't a passenger standing
+                candidates = [neighbour]
         if candidates:
-            self.next_move = random.choice(candidates)
+            self.next_move = self.rng.choice(candidates)
 
             # clean-up
             if self.current_pos in blocked_passengers: del blocked_passengers[self.current_pos]
@@ -268,243 +231,306 @@ class Passenger:
             self.swapping = False  # found a place to move so can't be swapping
         else:
             # Pokud nejsou žádni kandidáti, zůstat na místě
-            print(f"Passenger {self.ped_id} has no valid moves and stays at {self.current_pos}")
+            if self.events.enabled:
+                self.events.emit(EventType.NO_MOVE, self.ped_id, self.current_pos)
             self.next_move = self.current_pos  # Zůstat na místě
 
+    def idle_ticks(self, occupancy):
+        """
+        Kolik následujících tiků pasažér jen odpočítává (zavazadlo, usazování, výměna)
+        bez pohybu, změny stavu a losování - podle stejného pořadí větví jako decide_move.
+        Vrací (počet tiků, None), 0 = v příštím tiku se něco stane.
+        Zablokovaný pasažér bez volného kandidáta vrací (None, desired_move) - čeká neomezeně,
+        pokud s ním nezačne výměna (to posoudí Simulation.idle_ticks).
+        """
+        if self.has_baggage and not self.baggage_stopped and self.current_pos[1] == self.seat_pos[1]:
+            return 0, None
+        if self.has_baggage and self.baggage_stopped and self.baggage_steps_remaining > 0:
+            return self.baggage_steps_remaining, None
+        if self.seating_in_progress:
+            return self.seating_steps_remaining - 1, None
+        if occupancy.blockers(self.current_pos, self.seat_pos) > 0:
+            return 0, None
+        if self.swapping:
+            return self.swapping_progress - 1, None
+
+        x, y = self.current_pos
+        desired_move = None
+        for dx, dy in MASK_DIRECTIONS[self.route[x, y]]:
+            neighbour = (x + dx, y + dy)
+            if occupancy.is_free(neighbour):
+                return 0, None  # Má kandidáta -> rng.choice
+            desired_move = neighbour
+        return None, desired_move
+
+    def skip_idle_ticks(self, ticks):
+        # Odečte ticks kroků z odpočtu, ve kterém pasažér právě je (viz idle_ticks)
+        if self.has_baggage and self.baggage_stopped and self.baggage_steps_remaining > 0:
+            self.baggage_steps_remaining -= ticks
+        elif self.seating_in_progress:
+            self.seating_steps_remaining -= ticks
+        elif self.swapping:
+            self.swapping_progress -= ticks
+
     def move(self):
         if self.next_move and isinstance(self.next_move, tuple):
             self.current_pos = self.next_move
         else:
             # Pokud by se 'next_move' dostalo do 'None', zůstat na místě
-            print(f"Warning: Passenger {self.ped_id} has next_move set to None or invalid. Staying in place.")
-
-# Třída Simulation pro správu simulace a Pygame
+            if self.events.enabled:
+                self.events.emit(EventType.INVALID_MOVE, self.ped_id, self.current_pos)
+
+# Základní třída pro pozorovatele simulace (např. vizualizace)
+class SimulationObserver:
+    """
+    Pozorovatel, kterého simulace volá na začátku běhu, po každém tiku a na konci běhu.
+    Výchozí implementace nic nedělají, potomci přepisují jen to, co potřebují.
+    """
+    def on_start(self, simulation):
+        pass
+
+    def on_tick(self, simulation):
+        pass
+
+    def on_finish(self, simulation):
+        pass
+
+# Třída TickSnapshot - stav simulace po jednom tiku (Simulation.iter_ticks)
+class TickSnapshot:
+    """
+    Počty pasažérů a volitelně pozice a kódy stavu (index = ped_id, viz passenger_states).
+    iter_ticks vrací v každém tiku tentýž objekt s přepsanými hodnotami a poli -
+    kdo si snapshot chce ponechat, musí si vzít copy().
+    """
+    __slots__ = ('tick', 'spawned', 'seated', 'storing', 'swapping', 'finished', 'rows', 'cols', 'codes')
+
+    def __init__(self, capacity=None):
+        self.tick = 0
+        self.spawned = self.seated = self.storing = self.swapping = 0
+        self.finished = False
+        if capacity is None:
+            self.rows = self.cols = self.codes = None
+        else:
+            self.rows = np.zeros(capacity, dtype=np.int64)
+            self.cols = np.zeros(capacity, dtype=np.int64)
+            self.codes = np.zeros(capacity, dtype=np.int64)
+
+    @property
+    def walking(self):
+        # Spawnovaní, nesedící, kteří právě neukládají zavazadlo ani se nevyměňují
+        return self.spawned - self.seated - self.storing - self.swapping
+
+    def update(self, simulation):
+        self.tick = simulation.tick
+        self.spawned, self.seated, self.storing, self.swapping = simulation.passenger_counts()
+        self.finished = simulation.finished
+        if self.codes is not None:
+            simulation.passenger_states(self.rows, self.cols, self.codes)
+
+    def copy(self):
+        snapshot = TickSnapshot()
+        for name in self.__slots__:
+            value = getattr(self, name)
+            setattr(snapshot, name, value.copy() if isinstance(value, np.ndarray) else value)
+        return snapshot
+
+# Třída Simulation pro správu simulace (bez vizualizace)
 class Simulation:
     def __init__(self, seat_rows=32, seat_in_row=[3, 3], door_choice='left',
                  baggage_probability=0.6, ticks_per_second=10,
-                 seating_strategy='random'):
-        pygame.init()
-        # Nastavení parametrů
-        self.seat_rows = seat_rows
-        self.seat_in_row = seat_in_row
+                 seating_strategy='random', spawn_interval=1, observers=None,
+                 distance_cache=None, events=None, skip_idle=False, profiler=None, layout=None, seed=None,
+                 heatmap=None):
+        # Vlastní proudy náhodných čísel (random_streams.py), seed=None -> odvozen z np.random
+        if seed is None:
+            seed = int(np.random.randint(2 ** 31))
+        self.seed = seed
+        self.streams = simulation_streams(seed)
+
+        # Nastavení parametrů (layout = CabinLayout, jméno z LAYOUTS nebo textový popis kabiny)
+        self.layout = None if layout is None else load_layout(layout)
         self.door_choice = door_choice
         self.baggage_probability = baggage_probability
-        self.ticks_per_second = ticks_per_second
+        self.ticks_per_second = ticks_per_second  # Používá pouze vizualizace pro časování
         self.seating_strategy = seating_strategy
-        self.passenger_seated_at = [];
+        self.passenger_seated_at = []  # Tik, ve kterém se pasažér usadil
 
         # Inicializace Airplane
-        self.airplane = Airplane(seat_rows=self.seat_rows,
-                                 seat_in_row=self.seat_in_row,
-                                 door_choice=self.door_choice)
+        self.airplane = Airplane(seat_rows=seat_rows,
+                                 seat_in_row=seat_in_row,
+                                 door_choice=self.door_choice,
+                                 layout=self.layout)
+        self.seat_rows = self.airplane.seat_rows
+        self.seat_in_row = self.airplane.seat_in_row
 
         self.matrix = self.airplane.matrix
         self.door_positions = self.airplane.door_positions
         self.seat_positions = self.airplane.seat_positions.copy()
 
-        # Inicializace pasažérů
-        self.available_seats = self.seat_positions.copy()
+        # Cesty závisí jen na rozložení a sedadle - jedna sdílená tabulka pro všechny pasažéry i běhy
+        self.profiler = profiler  # PhaseProfiler nebo None
+        self.heatmap = heatmap  # heatmap.CongestionHeatmap nebo None
+        if heatmap is not None:
+            heatmap.check_shape(self.matrix.shape)  # step() jde volat i bez begin_run
+        setup_start = time.perf_counter()
+        self.distance_cache = default_cache if distance_cache is None else distance_cache
+        self.layout_key = layout_fingerprint(self.matrix)
+        self.routing = get_routing_table(self.matrix, self.seat_positions, self.layout_key, self.distance_cache)
+        if profiler is not None:
+            profiler.setup_time += time.perf_counter() - setup_start
+
+        # Fronty sedadel podle strategie - sestaví se jednou, přiřazení sedadla je pak O(1)
+        self.seating_plan = build_plan(seating_strategy, self.airplane)
+        self.build_seat_queues()
+        self.held_seats = set()  # Sedadla, na jejichž pasažéra fronta čeká (checkpoint.LatePassenger)
+        self.draw_passenger_attributes()
+
+        self.passengers = []  # Všichni spawnovaní pasažéři (index = ped_id)
+        self.active_passengers = []  # Spawnovaní a dosud nesedící - jen ti se účastní tiku
+        self.n_seated = 0
+        self.seat_status = {seat: False for seat in self.seat_positions}  # False = unoccupied
+        self.occupancy_grid = OccupancyGrid(self.matrix.shape)  # Nesedící pasažéři a usazení po sloupcích
+        self.ped_id_counter = 0
 
-        # Řazení pasažérů do optimální podoby
-        midpoint = int(np.floor(len(self.available_seats) / 2))
-        self.available_seats.sort(key=lambda x: x[1])
+        # Časování v celočíselných tikách simulace
+        self.tick = 0
+        self.spawn_interval = spawn_interval  # Interval spawnu v tikách
+        self.spawn_intervals = self.airplane.spawn_intervals(spawn_interval)  # Pro každé dveře (schody jsou pomalejší)
+        self.skip_idle = skip_idle  # Přeskakovat tiky, ve kterých se jen odpočítává
+        self.tick_limit = None  # max_ticks z run_until_done, přes který se nepřeskakuje
+        self.last_spawn_ticks = [0] * len(self.door_positions)  # Poslední pokus o spawn na dveřích
+        self.finished = False  # Všichni pasažéři sedí
+        self.stopped = False  # Běh přerušen zvenku (např. zavření okna)
 
-        # Rozdělení letadla na přední a zadní část
-        self.available_seats_split = [
-            self.available_seats[:midpoint],  # Left half
-            self.available_seats[midpoint:]  # Right half
-        ]
-        self.available_seats_split[0].sort(key=lambda x: (x[1], -x[0] if x[0] <= seat_in_row[0] else x[0]))
-        self.available_seats_split[1].sort(key=lambda x: (-x[1], -x[0] if x[0] <= seat_in_row[0] else x[0]))
+        self.observers = list(observers) if observers else []
+        self.events = EventLog() if events is None else events  # Bez sinků vypnutý
 
-        self.passengers = []
-        self.seat_status = {seat: False for seat in self.seat_positions}  # False = unoccupied
-        self.ped_id_counter = 0
+    def add_observer(self, observer):
+        self.observers.append(observer)
 
-        # Inicializace Pygame
-        pygame.init()
-        aspect_ratio = self.matrix.shape[1] / self.matrix.shape[0]
-
-        # Nastavení velikosti obrazovky a výpočet cell_size
-        screen_width = 1200  # Šířka okna
-        bar_height = 100      # Výška baru
-
-        # Výpočet velikosti buňky na základě šířky okna a počtu sloupců
-        self.cell_size = screen_width // self.matrix.shape[1]
-
-        # Výpočet výšky gridu
-        grid_height = self.matrix.shape[0] * self.cell_size
-
-        # Výpočet celkové výšky okna (grid + bar)
-        self.width = self.matrix.shape[1] * self.cell_size
-        self.height = grid_height + bar_height
-
-        self.screen = pygame.display.set_mode((self.width, self.height))
-        pygame.display.set_caption("Airplane Matrix with Passengers")
-
-        # Barvy
-        self.colors = {
-            0: (255, 255, 255),  # Bílá (volné místo)
-            np.inf: (0, 0, 0),    # Černá (zeď)
-            -1: (0, 0, 255),     # Modrá (dveře)
-            -3: (192, 192, 192), # Šedá (sedadla)
-        }
-
-        # Barvy pro pasažéry
-        self.passenger_color = (255, 165, 0)  # Oranžová
-        self.seated_color = (0, 255, 0)      # Zelená
-        self.storing_color = (0, 255, 255)   # Azurová (pro ukládání zavazadel)
-        self.seating_color = (255, 0, 0)  # Usazující se
-        self.swapping_color = (255, 100, 200)  # Switching protijdouci
-
-        # Inicializace fontů
-        pygame.font.init()
-        self.font = pygame.font.SysFont('Arial', 20)  # Nastavení fontu a velikosti
-
-        # Časování
-        self.spawn_interval = 1000 // self.ticks_per_second  # Interval spawnu v milisekundách
-        self.last_spawn_time = pygame.time.get_ticks()
-
-    def draw_grid(self):
-        for i in range(self.matrix.shape[0]):
-            for j in range(self.matrix.shape[1]):
-                value = self.matrix[i, j]
-                color = self.colors.get(value, (255, 0, 0))  # Defaultně červená pro neznámé hodnoty
-                pygame.draw.rect(self.screen, color, (j * self.cell_size, i * self.cell_size + 100, self.cell_size, self.cell_size))
-                pygame.draw.rect(self.screen, (200, 200, 200), (j * self.cell_size, i * self.cell_size + 100, self.cell_size, self.cell_size), 1)
-
-        # Vykreslení pasažérů
+    def passenger_states(self, rows, cols, codes):
+        """
+        Vyplní pozice a kódy stavu všech pasažérů do polí délky počtu sedadel (index = ped_id).
+        Nespawnovaní pasažéři mají kód STATE_NOT_SPAWNED.
+        """
+        codes[:] = STATE_NOT_SPAWNED
         for passenger in self.passengers:
-            x, y = passenger.current_pos
-            if passenger.seated:
-                color = self.seated_color
-            elif passenger.has_baggage and passenger.baggage_stopped:
-                color = self.storing_color
+            rows[passenger.ped_id], cols[passenger.ped_id] = passenger.current_pos
+            codes[passenger.ped_id] = passenger.state_code()
+
+    def passenger_counts(self):
+        """
+        Vrací (spawnovaní, usazení, ukládající zavazadlo, vyměňující se) - priorita stavů jako v state_code.
+        """
+        storing = swapping = 0
+        for passenger in self.active_passengers:
+            if passenger.has_baggage and passenger.baggage_stopped:
+                storing += 1
             elif passenger.swapping:
-                color = self.swapping_color
-            elif passenger.seating_in_progress:
-                color = self.seating_color
-            else:
-                color = self.passenger_color
-
-            center_x = int(y * self.cell_size + self.cell_size / 2)
-            center_y = int(x * self.cell_size + self.cell_size / 2) + 100  # Offset by 100 for the bar
-
-            pygame.draw.circle(
-                self.screen,
-                color,
-                (center_x, center_y),
-                self.cell_size // 3
-            )
-            if passenger.has_baggage and passenger.baggage_steps_remaining is not 0:
-                baggage_size = self.cell_size // 4
-                square_x = center_x - baggage_size // 2
-                square_y = center_y + self.cell_size // 4
-                pygame.draw.rect(
-                    self.screen,
-                    (0, 0, 155),  # Baggage color
-                    (square_x, square_y, baggage_size, baggage_size)
-                )
+                swapping += 1
+        return len(self.passengers), self.n_seated, storing, swapping
 
-            if passenger.swapping and passenger.desired_move:
-                desired_x, desired_y = passenger.desired_move
-                desired_center_x = int(desired_y * self.cell_size + self.cell_size / 2)
-                desired_center_y = int(desired_x * self.cell_size + self.cell_size / 2) + 100
-
-                arrow_length, arrow_width = 10, 2
-                arrow_color = (0, 0, 0)
-
-                def draw_arrowhead(start, end, color, width, length=10):
-                    angle = np.arctan2(end[1] - start[1], end[0] - start[0])
-                    point1 = (
-                        end[0] - length * np.cos(angle - np.pi / 6),
-                        end[1] - length * np.sin(angle - np.pi / 6)
-                    )
-                    point2 = (
-                        end[0] - length * np.cos(angle + np.pi / 6),
-                        end[1] - length * np.sin(angle + np.pi / 6)
-                    )
-                    pygame.draw.polygon(self.screen, color, [end, point1, point2])
-
-                pygame.draw.line(
-                    self.screen,
-                    arrow_color,
-                    (center_x, center_y),
-                    (desired_center_x, desired_center_y),
-                    arrow_width
-                )
-                draw_arrowhead((center_x, center_y), (desired_center_x, desired_center_y), arrow_color, arrow_width,
-                               arrow_length)
-                draw_arrowhead((desired_center_x, desired_center_y), (center_x, center_y), arrow_color, arrow_width,
-                               arrow_length)
-
-    def get_seat_by_priority(self, available_seats, seat_priority=[7, 1, 6, 2, 5, 3]):
-        for priority in seat_priority:
-            seats = [t for t in available_seats if t[0] == priority]
-            if len(seats) != 0:
-                selected_seat = random.choice(seats)
-                available_seats.remove(selected_seat)  # Remove from list
-                return selected_seat
-
-    def assign_seat(self, door, seating_strategy='random'):
-        if seating_strategy == 'random':
-            return self.available_seats.pop(random.randrange(len(self.available_seats)))
-        if seating_strategy == 'door_wise':
-            if len(self.door_positions) == 1:
-                return self.available_seats.pop(random.randrange(len(self.available_seats)))
-            else:
-                door_id = 0 if door[1] == 1 else 1
-                if len(self.available_seats_split[door_id]) > 0:
-                    seat_to_assign = self.available_seats_split[door_id].pop(random.randrange(len(self.available_seats_split[door_id])))
-                    self.available_seats.remove(seat_to_assign)
-                    return seat_to_assign
-                else:
-                    return None
-        if seating_strategy == 'window_wise':
-            return self.get_seat_by_priority(self.available_seats)
-        if seating_strategy == 'optimal':
-            if len(self.door_positions) == 1:
-                return self.available_seats.pop(random.randrange(len(self.available_seats)))
-            else:
-                door_id = 0 if door[1] == 1 else 1
-                if len(self.available_seats_split[door_id]) > 0:
-                    seat_to_assign = self.available_seats_split[door_id].pop()
-                    self.available_seats.remove(seat_to_assign)
-                    return seat_to_assign
-                else:
-                    return None
-
-
-    def spawn_passengers(self, seating_strategy):
+    def seat_order_keys(self, count):
+        # Náhodné klíče pro pořadí sedadel se stejným pořadím ve strategii
+        return self.streams[STREAM_SEAT_ORDER].generator.random(count).tolist()
+
+    def draw_passenger_attributes(self):
+        """
+        Hromadně předlosuje atributy všech pasažérů (index = ped_id): rychlost výměny,
+        zavazadlo a počet kroků jeho ukládání. Pasažér je pak při spawnu jen převezme.
+        """
+        self.passenger_draws = self.draw_attribute_block(len(self.seat_positions))
+
+    def draw_attribute_block(self, count):
+        generator = self.streams[STREAM_PASSENGERS].generator
+        swapping_speeds = generator.integers(1, 4, count).tolist()
+        has_baggage = (generator.random(count) < self.baggage_probability).tolist()
+        baggage_steps = generator.integers(1, 4, count).tolist()
+        return list(zip(swapping_speeds, has_baggage, baggage_steps))
+
+    def passenger_attributes(self, ped_id):
+        # Pasažérů může být víc než sedadel (např. opakovaný spawn po forku) - chybějící se dolosují po blocích
+        while ped_id >= len(self.passenger_draws):
+            self.passenger_draws += self.draw_attribute_block(len(self.seat_positions))
+        return self.passenger_draws[ped_id]
+
+    def build_seat_queues(self):
+        """
+        Seřadí sedadla každé fronty plánu podle (pořadí ve strategii, náhodný klíč).
+        Fronty jsou uložené pozpátku, aby assign_seat mohl brát sedadla pomocí pop().
+        """
+        plan = self.seating_plan
+        self.seat_queues = []
+        for seats, ranks in zip(plan.groups, plan.ranks):
+            keys = self.seat_order_keys(len(seats))
+            order = sorted(range(len(seats)), key=lambda i: (ranks[i], keys[i]), reverse=True)
+            self.seat_queues.append([seats[i] for i in order])
+        self.door_queues = {door: self.seat_queues[plan.door_groups[k]] for k, door in enumerate(self.door_positions)}
+        self.seats_remaining = sum(len(queue) for queue in self.seat_queues)
+
+    def assign_seat(self, door):
+        # Další sedadlo z fronty dveří, None pokud je fronta prázdná
+        queue = self.door_queues[door]
+        if not queue:
+            return None
+        self.seats_remaining -= 1
+        return queue.pop()
+
+    def spawn_attempts(self):
+        """
+        Dveře, na kterých v tomto tiku uplynul jejich interval spawnu - pokus o spawn
+        se započítá, i když jsou dveře obsazené.
+        """
+        doors = []
+        for k, door in enumerate(self.door_positions):
+            if self.tick - self.last_spawn_ticks[k] >= self.spawn_intervals[k]:
+                self.last_spawn_ticks[k] = self.tick
+                doors.append(door)
+        return doors
+
+    def can_spawn(self, door):
+        queue = self.door_queues[door]
+        if not queue or (self.held_seats and queue[-1] in self.held_seats):
+            return False
+        return self.occupancy_grid.is_free(door)
+
+    def spawn_passengers(self):
         """
         Spawnuje pasažéry pouze tehdy, když je dveřní buňka volná.
         Pokračuje ve spawnování, dokud nejsou všichni pasažéři spawnováni.
         """
-        for door in self.door_positions:
+        for door in self.spawn_attempts():
             # Zkontrolujte, zda je dveřní buňka volná (žádný pasažér momentálně není na dveřích)
-            door_occupied = any(p.current_pos == door and not p.seated for p in self.passengers)
-            if not door_occupied and self.available_seats:
+            if self.can_spawn(door):
                 # Spawnujte nového pasažéra na dveřní buňku
-                seat = self.assign_seat(door, seating_strategy)
+                seat = self.assign_seat(door)
 
                 if seat is None:
                     continue
 
                 try:
-                    distance_matrix = compute_distance_matrix(self.matrix, seat)
-                except ValueError as e:
-                    print(f"Chyba při výpočtu distance_matrix pro sedadlo {seat}: {e}")
-                    self.available_seats.append(seat)  # Vrať sedadlo zpět
+                    route = self.routing.route(seat)
+                except ValueError:
+                    if self.events.enabled:
+                        self.events.emit(EventType.ROUTE_ERROR, pos=door, data=seat)
+                    self.door_queues[door].append(seat)  # Vrať sedadlo zpět
+                    self.seats_remaining += 1
                     continue  # Přeskočí tento krok a pokračuje dále
                 passenger = Passenger(
                     ped_id=self.ped_id_counter,
                     spawn_pos=door,
                     seat_pos=seat,
-                    distance_matrix=distance_matrix,
-                    baggage_probability=self.baggage_probability
+                    route=route,
+                    baggage_probability=self.baggage_probability,
+                    events=self.events,
+                    rng=self.streams[STREAM_MOVE],
+                    attributes=self.passenger_attributes(self.ped_id_counter)
                 )
                 self.passengers.append(passenger)
-                print(f"Spawning passenger {self.ped_id_counter} at door {door} with seat {seat}")
+                self.active_passengers.append(passenger)
+                self.occupancy_grid.enter(door)
+                if self.events.enabled:
+                    self.events.emit(EventType.SPAWN, self.ped_id_counter, door, seat)
                 self.ped_id_counter += 1
 
     # Dočasná funkce, slouží k testování správného fungování
@@ -516,35 +542,49 @@ class Simulation:
 
         for seat in seat_positions:
             try:
-                distance_matrix = compute_distance_matrix(self.matrix, seat)
-            except ValueError as e:
-                print(f"Error computing distance_matrix for seat {seat}: {e}")
+                route = self.routing.route(seat)
+            except ValueError:
+                if self.events.enabled:
+                    self.events.emit(EventType.ROUTE_ERROR, pos=door, data=seat)
                 return
 
+            swapping_speed, _, baggage_steps = self.passenger_attributes(self.ped_id_counter)
             passenger = Passenger(
                 ped_id=self.ped_id_counter,
                 spawn_pos=door,
                 seat_pos=seat,
-                distance_matrix=distance_matrix,
-                baggage_probability=1
+                route=route,
+                baggage_probability=1,
+                events=self.events,
+                rng=self.streams[STREAM_MOVE],
+                attributes=(swapping_speed, True, baggage_steps)
             )
             self.passengers.append(passenger)
+            self.active_passengers.append(passenger)
             self.seat_status[seat] = True  # Mark seat as occupied
-            print(f"Spawning Passenger {self.ped_id_counter} at {door} -> Seat {seat}")
+            self.occupancy_grid.enter(door)
+            self.occupancy_grid.add_seated(seat)
+            if self.events.enabled:
+                self.events.emit(EventType.SPAWN, self.ped_id_counter, door, seat)
             self.ped_id_counter += 1
 
     def resolve_conflicts(self, move_requests):
         """
         Řeší konflikty, kdy více pasažérů chce vstoupit do stejné buňky.
         Vybere náhodně jednoho pasažéra, který může pokračovat, ostatní zůstanou na místě.
+        Vrací seznam pasažérů, kteří zůstali stát.
         """
+        losers = []
         for pos, peds in move_requests.items():
             if len(peds) > 1:
-                chosen_ped = random.choice(peds)
+                chosen_ped = self.streams[STREAM_CONFLICT].choice(peds)
                 for ped in peds:
                     if ped != chosen_ped:
                         ped.next_move = ped.current_pos  # Zůstat na místě
-                        print(f"Passenger {ped.ped_id} blocked from moving to {pos}")
+                        losers.append(ped)
+                        if self.events.enabled:
+                            self.events.emit(EventType.BLOCKED, ped.ped_id, ped.current_pos, pos)
+        return losers
 
     def resolve_swapping(self, blocked_passengers):
         """
@@ -566,109 +606,298 @@ class Simulation:
                         time_to_swap = max(this_passenger.swapping_speed, other_passenger.swapping_speed)
                         this_passenger.swapping_progress = time_to_swap
                         other_passenger.swapping_progress = time_to_swap
-                        print(f"Passenger {this_passenger.ped_id} is swapping with {other_passenger.ped_id} for duration: {time_to_swap}")
+                        if self.events.enabled:
+                            self.events.emit(EventType.SWAP_START, this_passenger.ped_id, current_pos,
+                                             (other_passenger.ped_id, time_to_swap))
+
+    def storing_positions(self):
+        # Buňky pasažérů, kteří v tomto tiku stojí kvůli zavazadlu - před decide_move, stejné větve
+        return [p.current_pos for p in self.active_passengers if p.has_baggage and
+                (p.baggage_steps_remaining > 0 if p.baggage_stopped else p.current_pos[1] == p.seat_pos[1])]
+
+    def record_congestion(self, storing, blocked, ticks=1):
+        """
+        Připíše do self.heatmap buňky pasažérů v tomto tiku (s ticks=n v n přeskočených ticích).
+        storing = storing_positions() ze začátku tiku, blocked = pasažéři, kteří chtěli jít a nemohli.
+        """
+        heatmap = self.heatmap
+        heatmap.add_grid(LAYER_OCCUPANCY, self.occupancy_grid.cells(), ticks)
+        heatmap.add_positions(LAYER_BLOCKED, [p.current_pos for p in blocked], ticks)
+        heatmap.add_positions(LAYER_SWAPPING, [p.current_pos for p in self.active_passengers if p.swapping], ticks)
+        heatmap.add_positions(LAYER_STORING, storing, ticks)
 
     def apply_moves(self):
         """
-        Aplikuje schválené pohyby pasažérů.
+        Aplikuje schválené pohyby pasažérů. Usazení pasažéři odchází z active_passengers.
+        Vrací počet pasažérů, kteří změnili buňku.
         """
-        for passenger in self.passengers:
+        grid = self.occupancy_grid
+        seated_now = 0
+        moved = 0
+        for passenger in self.active_passengers:
+            previous_pos = passenger.current_pos
             passenger.move()
+            if passenger.current_pos != previous_pos:
+                grid.leave(previous_pos)
+                grid.enter(passenger.current_pos)
+                moved += 1
 
             # Kontrola, zda pasažér dosáhl sedadla
-            if passenger.current_pos == passenger.seat_pos and not passenger.seated:
+            if passenger.current_pos == passenger.seat_pos:
                 passenger.seated = True
-                self.passenger_seated_at.append(pygame.time.get_ticks())
+                self.passenger_seated_at.append(self.tick)
                 self.seat_status[passenger.seat_pos] = True  # Mark seat as occupied
-                print(f"Passenger {passenger.ped_id} seated at {passenger.seat_pos}")
-
-    def run(self):
-        running = True
-        clock = pygame.time.Clock()
-        start_time = time.time()
-
-        while running:
-            current_time = pygame.time.get_ticks()
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-
-            # Spawn pasažérů na dveřích, pokud uplynul spawn_interval
-            if current_time - self.last_spawn_time > self.spawn_interval:
-                self.spawn_passengers(self.seating_strategy)
-                self.last_spawn_time = current_time
-
-            # Rozhodování o pohybu
-            occupied_positions = {p.current_pos for p in self.passengers if not p.seated}
-            blocked_passengers = {}  # current_position : passenger - implemented to resolve passenger <-> passenger conflicts
-            for passenger in self.passengers:
-                passenger.decide_move(occupied_positions, blocked_passengers, self.seat_status)
-
-            self.resolve_swapping(blocked_passengers)
-
-            # Shromáždění požadavků na pohyb
-            move_requests = defaultdict(list)
-            for passenger in self.passengers:
-                if passenger.next_move != passenger.current_pos and not passenger.seated:
-                    move_requests[passenger.next_move].append(passenger)
-
-            # Řešení konfliktů
-            self.resolve_conflicts(move_requests)
-
-            # Aplikace pohybů
-            self.apply_moves()
-
-            # Vykreslení
-            self.screen.fill((0, 0, 0))
-            self.draw_grid()
-
-            # Výpočty pro text
-            total_seats = len(self.seat_positions)
-            total_passengers = len(self.passengers) + len(self.available_seats)
-            yet_to_spawn = len(self.available_seats)
-            in_simulation_not_seated = len([p for p in self.passengers if not p.seated])
-
-            # Renderování textu
-            text_total = self.font.render(f"Total Passengers: {total_passengers} | Total Seats: {total_seats}", True, (255, 255, 255))
-            text_yet_to_spawn = self.font.render(f"Passengers yet to spawn: {yet_to_spawn}", True, (255, 255, 255))
-            text_in_simulation = self.font.render(f"Passengers in simulation not seated: {in_simulation_not_seated}", True, (255, 255, 255))
-
-            # Blitování textu na obrazovku (v horním baru)
-            self.screen.blit(text_total, (10, 10))  # Horní levý roh
-            self.screen.blit(text_yet_to_spawn, (10, 40))  # Pod total
-            self.screen.blit(text_in_simulation, (10, 70))  # Pod yet_to_spawn
+                grid.leave(passenger.seat_pos)
+                grid.add_seated(passenger.seat_pos)
+                seated_now += 1
+                if self.events.enabled:
+                    self.events.emit(EventType.SEATED, passenger.ped_id, passenger.seat_pos)
+
+        if seated_now:
+            self.n_seated += seated_now
+            self.active_passengers = [p for p in self.active_passengers if not p.seated]
+        return moved
+
+    def idle_ticks(self):
+        """
+        Počet následujících tiků, ve kterých se nikdo nepohne, nikdo nezačne novou činnost,
+        nikdo se nespawnuje a nic se nelosuje. Vrací (počet tiků, {pasažér: desired_move}).
+        """
+        grid = self.occupancy_grid
+        ticks = None if self.tick_limit is None else self.tick_limit - self.tick - 1
+
+        # Spawn na volných dveřích ukončí okno před dalším pokusem o spawn
+        for k, door in enumerate(self.door_positions):
+            if self.can_spawn(door):
+                next_attempt = max(self.last_spawn_ticks[k] + self.spawn_intervals[k], self.tick + 1)
+                ticks = next_attempt - self.tick - 1 if ticks is None else min(ticks, next_attempt - self.tick - 1)
+        if ticks is not None and ticks <= 0:
+            return 0, None
+
+        blocked = {}  # pozice -> (pasažér, desired_move)
+        for passenger in self.active_passengers:
+            passenger_ticks, desired_move = passenger.idle_ticks(grid)
+            if desired_move is not None:
+                if passenger.current_pos in blocked:
+                    return 0, None
+                blocked[passenger.current_pos] = (passenger, desired_move)
+            elif passenger_ticks is not None:
+                if passenger_ticks <= 0:
+                    return 0, None
+                ticks = passenger_ticks if ticks is None else min(ticks, passenger_ticks)
+
+        # Dva zablokovaní, kteří chtějí jít jeden na místo druhého, by začali výměnu (resolve_swapping)
+        for pos, (passenger, desired_move) in blocked.items():
+            other = blocked.get(desired_move)
+            if other is not None and other[1] == pos:
+                return 0, None
+
+        if ticks is None:  # Všichni jen čekají - bez max_ticks se nepřeskakuje
+            return 0, None
+        return ticks, {passenger: desired_move for passenger, desired_move in blocked.values()}
+
+    def skip_idle_ticks(self):
+        """
+        Posune čas přes tiky, ve kterých se jen odpočítává, a vrátí jejich počet.
+        Stav po přeskoku je stejný jako po jejich odkrokování.
+        """
+        ticks, blocked = self.idle_ticks()
+        if ticks <= 0:
+            return 0
+
+        if self.heatmap is not None:
+            self.record_congestion(self.storing_positions(), list(blocked), ticks)
+        for passenger in self.active_passengers:
+            passenger.skip_idle_ticks(ticks)
+        for passenger, desired_move in blocked.items():
+            passenger.desired_move = desired_move
+
+        # Pokusy o spawn (neúspěšné, dveře jsou obsazené) by posouvaly last_spawn_ticks
+        last_tick = self.tick + ticks
+        for k, interval in enumerate(self.spawn_intervals):
+            first_attempt = max(self.last_spawn_ticks[k] + interval, self.tick + 1)
+            if first_attempt <= last_tick:
+                self.last_spawn_ticks[k] = first_attempt + (last_tick - first_attempt) // interval * interval
+
+        self.tick = last_tick
+        return ticks
+
+    def stop(self):
+        """
+        Přeruší běh simulace (např. při zavření okna vizualizace).
+        """
+        self.stopped = True
 
-            pygame.display.flip()
+    def step(self):
+        """
+        Provede jeden tik simulace. Vrací True, pokud simulace může pokračovat.
+        """
+        if self.finished or self.stopped:
+            return False
+
+        # Tiky, ve kterých se jen odpočítává, se přeskočí (při zapnutém logu ne - události by chyběly)
+        if self.skip_idle and not self.events.enabled:
+            self.skip_idle_ticks()
+
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.begin_tick()
+
+        self.tick += 1
+        self.events.tick = self.tick
+
+        # Spawn pasažérů na dveřích, na kterých uplynul jejich interval spawnu
+        self.spawn_passengers()
+        if profiler is not None:
+            profiler.mark(PHASE_SPAWN)
+
+        heatmap = self.heatmap
+        if heatmap is not None:
+            storing = self.storing_positions()
+
+        # Rozhodování o pohybu
+        blocked_passengers = {}  # current_position : passenger - implemented to resolve passenger <-> passenger conflicts
+        for passenger in self.active_passengers:
+            passenger.decide_move(self.occupancy_grid, blocked_passengers)
+        if profiler is not None:
+            profiler.mark(PHASE_DECIDE)
+
+        self.resolve_swapping(blocked_passengers)
+        if profiler is not None:
+            profiler.mark(PHASE_SWAPPING)
+
+        # Shromáždění požadavků na pohyb
+        move_requests = defaultdict(list)
+        for passenger in self.active_passengers:
+            if passenger.next_move != passenger.current_pos:
+                move_requests[passenger.next_move].append(passenger)
+
+        # Řešení konfliktů
+        losers = self.resolve_conflicts(move_requests)
+        if profiler is not None:
+            profiler.mark(PHASE_CONFLICTS)
+
+        # Zablokovaní = bez volného souseda (a nezačali výměnu) nebo prohraný konflikt
+        if heatmap is not None:
+            self.record_congestion(storing, [p for p in blocked_passengers.values() if not p.swapping] + losers)
+
+        # Aplikace pohybů
+        moved = self.apply_moves()
+
+        # Kontrola, zda jsou všichni pasažéři seated
+        if not self.seats_remaining and not self.active_passengers:
+            if self.events.enabled:
+                self.events.emit(EventType.ALL_SEATED)
+            self.finished = True
+        if profiler is not None:
+            profiler.mark(PHASE_APPLY)
+
+        for observer in self.observers:
+            observer.on_tick(self)
+
+        if profiler is not None:
+            profiler.mark(PHASE_OBSERVERS)
+            profiler.end_tick(self.tick, moved, len(blocked_passengers),
+                              sum(1 for p in self.active_passengers if p.swapping))
+
+        return not (self.finished or self.stopped)
+
+    def run_until_done(self, max_ticks=None):
+        """
+        Krokuje simulaci tak rychle, jak to jde, dokud nejsou všichni usazeni
+        (nebo do max_ticks). Vrací počet tiků a seznam tiků usazení.
+        """
+        self.tick_limit = max_ticks
+        if self.heatmap is not None:
+            self.heatmap.begin_run(self)
+        for observer in self.observers:
+            observer.on_start(self)
 
-            # Kontrola, zda jsou všichni pasažéři seated
-            if not self.available_seats and all(p.seated for p in self.passengers):
-                print("Všichni pasažéři byli přiřazeni a dosáhli svých sedadel.")
-                running = False
+        while self.step():
+            if max_ticks is not None and self.tick >= max_ticks:
+                break
 
-            # Časování simulace
-            clock.tick(self.ticks_per_second)
+        for observer in self.observers:
+            observer.on_finish(self)
 
-        final_tick_time = pygame.time.get_ticks()
+        return self.tick, self.passenger_seated_at
 
-        pygame.quit()
+    def iter_ticks(self, max_ticks=None, positions=False):
+        """
+        Generátor: krokuje simulaci jako run_until_done a po každém tiku vrací TickSnapshot
+        (s positions=True i s pozicemi a kódy stavu všech pasažérů). Snapshot a jeho pole
+        se alokují jednou a v každém tiku se přepíšou. Pozorovatelé se volají jako
+        v run_until_done, on_finish i při předčasném ukončení generátoru.
+        """
+        snapshot = TickSnapshot(len(self.seat_positions) if positions else None)
+        self.tick_limit = max_ticks
+        if self.heatmap is not None:
+            self.heatmap.begin_run(self)
+        for observer in self.observers:
+            observer.on_start(self)
+
+        try:
+            while not (self.finished or self.stopped):
+                running = self.step()
+                snapshot.update(self)
+                yield snapshot
+                if not running or (max_ticks is not None and self.tick >= max_ticks):
+                    break
+        finally:
+            for observer in self.observers:
+                observer.on_finish(self)
+
+    def run(self, max_ticks=None):
+        start_time = time.time()
+        final_tick, passenger_seated_at = self.run_until_done(max_ticks)
         end_time = time.time()
 
-        return end_time-start_time, final_tick_time, self.passenger_seated_at
+        return end_time - start_time, final_tick, passenger_seated_at
 
 # Funkce pro načtení konfigurace od uživatele
 def get_user_configuration():
+    import argparse  # Jen pro spuštění ze skriptu - engine se importuje bez něj
     parser = argparse.ArgumentParser(description="Airplane Passenger Simulation Parameters")
     parser.add_argument('--seat_rows', type=int, default=5, help='Number of seat rows in the airplane')
     parser.add_argument('--seat_in_row', type=int, nargs='+', default=[3, 3],
                         help='Number of seats in each section (e.g., 3 3)')
     parser.add_argument('--door_choice', type=str, choices=['left', 'right', 'both'], default='both',
                         help='Choice of door(s) for passenger spawning')
+    parser.add_argument('--layout', type=str, default=None,
+                        help='Cabin layout: preset name (a320, b767, b777, a380), .json/.txt file or text such as '
+                             '"60x3-4-3 front 20 rear::stairs" (overrides --seat_rows, --seat_in_row and --door_choice)')
     parser.add_argument('--baggage_probability', type=float, default=0.6,
                         help='Probability that a passenger has baggage (0.0 - 1.0)')
     parser.add_argument('--ticks_per_second', type=int, default=5,
-                        help='Number of simulation ticks (frames) per second')
-    parser.add_argument('--seating_strategy', type=str, choices=['random', 'door_wise', 'window_wise', 'optimal'], default='random',
+                        help='Number of simulation ticks (frames) per second shown by the visualisation')
+    parser.add_argument('--seating_strategy', type=str, choices=sorted(STRATEGIES), default='random',
                         help='Seating strategy')
+    parser.add_argument('--strategy_file', type=str, default=None,
+                        help='Boarding order exported by optimizer.py (overrides --seating_strategy)')
+    parser.add_argument('--spawn_interval', type=int, default=1,
+                        help='Number of simulation ticks between two spawns at a door')
+    parser.add_argument('--seed', type=int, default=42, help='Seed of the simulation random streams')
+    parser.add_argument('--render_every', type=int, default=1,
+                        help='Draw only every Nth simulation tick in the pygame window')
+    parser.add_argument('--skip_idle', action='store_true',
+                        help='Jump over ticks in which passengers only count down (same results, fewer ticks executed)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Measure time spent in each phase of a tick and print a summary table')
+    parser.add_argument('--profile_json', type=str, default=None,
+                        help='Write the per-phase and per-tick profile to this JSON file (implies --profile)')
+    parser.add_argument('--headless', action='store_true',
+                        help='Run without the pygame window, as fast as possible')
+    parser.add_argument('--distance_cache_dir', type=str, default=None,
+                        help='Directory where precomputed distance matrices are stored and reused between runs')
+    parser.add_argument('--trace', type=str, default=None,
+                        help='Record per-tick passenger positions into this file (replay with python view.py FILE)')
+    parser.add_argument('--heatmap', type=str, default=None,
+                        help='Count per-cell occupancy, blocked, swap and baggage ticks and write them to this JSON file')
+    parser.add_argument('--overlay', type=str, default=None,
+                        help='Tint cells in the pygame window by a saved heatmap (JSON from --heatmap or run_simulation.py)')
+    parser.add_argument('--overlay_layer', type=str, choices=LAYERS, default='blocked', help='Heatmap layer used by --overlay')
+    parser.add_argument('--log_level', type=str, choices=list(LEVELS), default='off',
+                        help='Print simulation events of this level and above (debug = every step of every passenger)')
     args = parser.parse_args()
     return args
 
@@ -677,28 +906,52 @@ if __name__ == "__main__":
     # Načtení konfigurace
     args = get_user_configuration()
 
-    random.seed(42)
-    np.random.seed(42)
+    if args.distance_cache_dir:
+        default_cache.cache_dir = args.distance_cache_dir
 
     # Vytvoření a spuštění simulace
     simulation = Simulation(
         seat_rows=args.seat_rows,
         seat_in_row=args.seat_in_row,
         door_choice=args.door_choice,
+        layout=args.layout,
         baggage_probability=args.baggage_probability,
         ticks_per_second=args.ticks_per_second,
-        seating_strategy=args.seating_strategy
+        seating_strategy=load_strategy(args.strategy_file) if args.strategy_file else args.seating_strategy,
+        spawn_interval=args.spawn_interval,
+        skip_idle=args.skip_idle,
+        seed=args.seed,
+        profiler=PhaseProfiler() if args.profile or args.profile_json else None,
+        heatmap=CongestionHeatmap() if args.heatmap else None,
+        events=EventLog([PrintSink()], level=args.log_level)
     )
-    time_to_finish, final_tick_time, passenger_seated_at = simulation.run()
+    if args.trace:
+        from recording import TraceRecorder
+        simulation.add_observer(TraceRecorder(args.trace, metadata={'seed': args.seed}))
+    if not args.headless:
+        from view import SimulationView
+        overlay = None
+        if args.overlay:
+            overlay = next(iter(load_heatmaps(args.overlay).values())).per_run(args.overlay_layer)
+        simulation.add_observer(SimulationView(simulation, render_every=args.render_every, overlay=overlay))
+
+    time_to_finish, final_tick, passenger_seated_at = simulation.run()
     print(f'Simulace ukončena po {time_to_finish} sekundách.')
-    print(f"Simulation ticks: {final_tick_time}")
-
-    # Zobrazení grafu
-    passenger_seated_at_seconds = [t / 1000 for t in passenger_seated_at]
-    num_passengers = list(range(1, len(passenger_seated_at_seconds) + 1))
+    print(f"Simulation ticks: {final_tick}")
+    if simulation.profiler is not None:
+        print(simulation.profiler.format_table())
+        if args.profile_json:
+            simulation.profiler.to_json(args.profile_json)
+    if args.heatmap:
+        simulation.heatmap.save(args.heatmap)
+        print(f"Heatmapa uložena do {args.heatmap}")
+
+    # Zobrazení grafu (matplotlib se načítá až tady, engine ho nepotřebuje)
+    import matplotlib.pyplot as plt
+    num_passengers = list(range(1, len(passenger_seated_at) + 1))
     plt.figure(figsize=(8, 5))
-    plt.plot(passenger_seated_at_seconds, num_passengers, marker='o', linestyle='-', linewidth=2, color='b')
-    plt.xlabel("Čas [s]")
+    plt.plot(passenger_seated_at, num_passengers, marker='o', linestyle='-', linewidth=2, color='b')
+    plt.xlabel("Čas [tiky]")
     plt.ylabel("Počet usazených pasažérů")
     plt.title("Usazování pasažérů v čase")
     plt.grid(True)
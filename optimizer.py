@@ -0,0 +1,314 @@
+import json
+import math
+import os
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch import ENGINES, derive_seed
+from layouts import load_layout
+from model import Airplane
+from strategies import GroupOrder, seat_tiers
+from vectorized import EnsembleSimulation
+
+# Hledání pořadí nástupu: kandidát je pořadí skupin (pásmo řad, vrstva) v každé části
+# kabiny (GroupOrder). Skóre je průměr nebo 95. percentil počtu tiků nástupu přes
+# pevnou sadu seedů (common random numbers - všichni kandidáti vidí stejné pasažéry).
+OBJECTIVES = {
+    'mean': lambda ticks: float(np.mean(ticks)),
+    'p95': lambda ticks: float(np.percentile(ticks, 95)),
+}
+
+# Výsledek optimalizace
+OptimizationResult = namedtuple('OptimizationResult', ['strategy', 'score', 'history', 'evaluations',
+                                                       'cache_hits', 'rejected'])
+
+# Vyhodnocení jedné dávky replik kandidáta - top-level funkce kvůli ProcessPoolExecutor
+def evaluate_batch(task):
+    """
+    Spustí replicas nástupů se strategií strategy a vrací jejich počty tiků.
+    Engine ensemble je běží najednou v jednom poli, object a vector po jednom.
+    Nedoběhnuté repliky (ensemble vrací -1) mají max_ticks, jako objektový engine
+    přerušený na max_ticks - kandidát si nedoběhnutím skóre nevylepší.
+    """
+    config, strategy, seed, replicas, engine, max_ticks = task
+    if engine == 'ensemble':
+        ensemble = EnsembleSimulation(replicas=replicas, seed=seed, seating_strategy=strategy, **config)
+        ticks, _ = ensemble.run_until_done(max_ticks)
+        return [int(t) if t >= 0 else max_ticks for t in ticks]
+    ticks = []
+    for replica in range(replicas):
+        simulation = ENGINES[engine](seating_strategy=strategy, seed=derive_seed(seed, replica), **config)
+        ticks.append(simulation.run_until_done(max_ticks)[0])
+    return ticks
+
+# Třída BoardingOptimizer - simulované žíhání nebo genetický algoritmus nad GroupOrder
+class BoardingOptimizer:
+    """
+    config jsou parametry simulace (seat_rows, seat_in_row, door_choice nebo layout, ...).
+    Každý kandidát se hodnotí na dávkách replik se seedy seeds[0], seeds[1], ...
+    Výsledky dávek se ukládají do cache (kandidát, seed) -> tiky, takže žádná dávka
+    se nesimuluje dvakrát. Kandidát, jehož skóre po první dávce je horší než
+    reject_factor * nejlepší skóre, se dál nehodnotí (brzké zamítnutí).
+    """
+    def __init__(self, config, zones=4, objective='mean', replicas=50, batches=4, base_seed=0,
+                 engine='ensemble', workers=None, reject_factor=1.1, max_ticks=None, rng_seed=0):
+        self.config = dict(config)
+        self.zones = zones
+        self.objective = OBJECTIVES[objective]
+        self.replicas = replicas
+        self.seeds = [derive_seed(base_seed, batch) for batch in range(batches)]
+        self.engine = engine
+        self.workers = os.cpu_count() if workers is None else workers
+        self.reject_factor = reject_factor
+        self.rng = random.Random(rng_seed)
+
+        layout = self.config.get('layout')
+        airplane = Airplane(seat_rows=self.config.get('seat_rows', 32), seat_in_row=self.config.get('seat_in_row', [3, 3]),
+                            door_choice=self.config.get('door_choice', 'left'),
+                            layout=None if layout is None else load_layout(layout))
+        self.sections = len(airplane.door_positions)
+        self.tiers = max(seat_tiers(airplane.seat_in_row).values())
+        self.max_ticks = 50 * len(airplane.seat_positions) if max_ticks is None else max_ticks
+
+        self.cache = {}  # (kandidát, seed) -> tiky dávky
+        self.evaluations = 0  # Simulované dávky
+        self.cache_hits = 0
+        self.rejected = 0
+        self.best = None
+        self.best_score = math.inf
+        self.executor = None
+
+    # Kandidát je n-tice částí, každá část n-tice skupin (pásmo, vrstva)
+    def initial_candidate(self):
+        start = GroupOrder.back_to_front(self.zones, self.tiers, self.sections)
+        return tuple(tuple(section) for section in start.order)
+
+    def strategy(self, candidate, name='group_order'):
+        return GroupOrder(candidate, self.zones, name)
+
+    def cache_meta(self):
+        # Parametry, na kterých závisí tiky dávky (kandidát a seed jsou v klíči)
+        return {'config': self.config, 'zones': self.zones, 'engine': self.engine,
+                'replicas': self.replicas, 'max_ticks': self.max_ticks}
+
+    def load_cache(self, path):
+        """
+        Načte dávky ze save_cache. Soubor s jinou kabinou, enginem, replikami, zones
+        nebo max_ticks skončí chybou - jeho tiky by se s novými nedaly srovnat.
+        """
+        with open(path) as f:
+            data = json.load(f)
+        meta = json.loads(json.dumps(self.cache_meta()))  # Jako po uložení (n-tice -> seznamy)
+        if not isinstance(data, dict) or data.get('meta') != meta:
+            stored = data.get('meta') if isinstance(data, dict) else None
+            raise ValueError(f"{path} obsahuje dávky s parametry {stored}, ne {meta}")
+        for entry in data['batches']:
+            candidate = tuple(tuple(tuple(group) for group in section) for section in entry['order'])
+            self.cache[(candidate, entry['seed'])] = entry['ticks']
+
+    def save_cache(self, path):
+        with open(path, 'w') as f:
+            json.dump({'meta': self.cache_meta(),
+                       'batches': [{'order': [[list(group) for group in section] for section in candidate],
+                                    'seed': seed, 'ticks': ticks} for (candidate, seed), ticks in self.cache.items()]}, f)
+
+    def run_batches(self, requests):
+        """
+        Vyhodnotí dávky [(kandidát, seed)] - z cache, nebo paralelně ve workerech.
+        """
+        missing = []
+        for key in requests:
+            if key in self.cache:
+                self.cache_hits += 1
+            elif key not in missing:
+                missing.append(key)
+        tasks = [(self.config, self.strategy(candidate), seed, self.replicas, self.engine, self.max_ticks)
+                 for candidate, seed in missing]
+        if self.executor is not None and len(tasks) > 1:
+            results = list(self.executor.map(evaluate_batch, tasks))
+        else:
+            results = [evaluate_batch(task) for task in tasks]
+        for key, ticks in zip(missing, results):
+            self.cache[key] = ticks
+        self.evaluations += len(missing)
+
+    def score(self, candidates):
+        """
+        Skóre kandidátů (nižší je lepší). Nejdřív první dávka všech, pak zbylé dávky
+        jen pro ty, kteří nejsou zřetelně horší než dosud nejlepší.
+        """
+        self.run_batches([(candidate, self.seeds[0]) for candidate in candidates])
+        scores = {}
+        survivors = []
+        for candidate in candidates:
+            first = self.objective(self.cache[(candidate, self.seeds[0])])
+            if len(self.seeds) > 1 and first > self.reject_factor * self.best_score:
+                scores[candidate] = first
+                self.rejected += 1
+            else:
+                survivors.append(candidate)
+
+        self.run_batches([(candidate, seed) for candidate in survivors for seed in self.seeds[1:]])
+        for candidate in survivors:
+            ticks = [t for seed in self.seeds for t in self.cache[(candidate, seed)]]
+            scores[candidate] = self.objective(ticks)
+            if scores[candidate] < self.best_score:
+                self.best, self.best_score = candidate, scores[candidate]
+        return [scores[candidate] for candidate in candidates]
+
+    # Sousední kandidát: prohození dvou skupin nebo přesun skupiny v jedné části
+    def neighbour(self, candidate):
+        sections = [list(section) for section in candidate]
+        section = sections[self.rng.randrange(len(sections))]
+        i, j = self.rng.sample(range(len(section)), 2)
+        if self.rng.random() < 0.5:
+            section[i], section[j] = section[j], section[i]
+        else:
+            section.insert(j, section.pop(i))
+        return tuple(tuple(section) for section in sections)
+
+    def anneal(self, iterations=100, initial_temperature=0.02, cooling=None, on_iteration=None):
+        """
+        Simulované žíhání. V každé iteraci se paralelně ohodnotí tolik sousedů aktuálního
+        kandidáta, kolik je workerů, a nejlepší z nich se přijme podle Metropolisova kritéria.
+        Teplota začíná na initial_temperature * skóre výchozího kandidáta.
+        """
+        current = self.initial_candidate()
+        current_score = self.score([current])[0]
+        temperature = initial_temperature * current_score
+        if cooling is None:
+            cooling = 0.01 ** (1.0 / max(iterations, 1))  # Na konci setina počáteční teploty
+        history = [self.best_score]
+
+        proposals = max(1, self.workers)
+        for iteration in range(iterations):
+            candidates = list(dict.fromkeys(self.neighbour(current) for _ in range(proposals)))
+            scores = self.score(candidates)
+            best_index = int(np.argmin(scores))
+            delta = scores[best_index] - current_score
+            if delta <= 0 or (temperature > 0 and self.rng.random() < math.exp(-delta / temperature)):
+                current, current_score = candidates[best_index], scores[best_index]
+            temperature *= cooling
+            history.append(self.best_score)
+            if on_iteration is not None:
+                on_iteration(iteration, current_score, self.best_score)
+        return history
+
+    def evolve(self, generations=30, population=16, mutation=0.3, elite=2, on_iteration=None):
+        """
+        Genetický algoritmus: turnajový výběr, order crossover v každé části, mutace
+        sousedním tahem. Populace se v každé generaci hodnotí paralelně.
+        """
+        start = self.initial_candidate()
+        members = list(dict.fromkeys([start] + [self.shuffled(start) for _ in range(population - 1)]))
+        scores = self.score(members)
+        history = [self.best_score]
+
+        for generation in range(generations):
+            ranked = [members[k] for k in np.argsort(scores)]
+            children = ranked[:elite]
+            while len(children) < population:
+                parent_a = self.tournament(members, scores)
+                parent_b = self.tournament(members, scores)
+                child = tuple(self.crossover(a, b) for a, b in zip(parent_a, parent_b))
+                if self.rng.random() < mutation:
+                    child = self.neighbour(child)
+                children.append(child)
+            members = list(dict.fromkeys(children))
+            scores = self.score(members)
+            history.append(self.best_score)
+            if on_iteration is not None:
+                on_iteration(generation, min(scores), self.best_score)
+        return history
+
+    def shuffled(self, candidate):
+        sections = []
+        for section in candidate:
+            section = list(section)
+            self.rng.shuffle(section)
+            sections.append(tuple(section))
+        return tuple(sections)
+
+    def tournament(self, members, scores, size=3):
+        picks = self.rng.sample(range(len(members)), min(size, len(members)))
+        return members[min(picks, key=lambda k: scores[k])]
+
+    def crossover(self, a, b):
+        # Order crossover (OX): úsek z a, zbytek skupin v pořadí z b
+        i, j = sorted(self.rng.sample(range(len(a) + 1), 2))
+        middle = a[i:j]
+        rest = [group for group in b if group not in middle]
+        return tuple(rest[:i]) + middle + tuple(rest[i:])
+
+    def optimize(self, algorithm='anneal', iterations=100, on_iteration=None, **kwargs):
+        """
+        Spustí hledání a vrátí OptimizationResult s nejlepším nalezeným GroupOrder.
+        """
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        self.executor = executor
+        try:
+            if algorithm == 'anneal':
+                history = self.anneal(iterations, on_iteration=on_iteration, **kwargs)
+            elif algorithm == 'genetic':
+                history = self.evolve(iterations, on_iteration=on_iteration, **kwargs)
+            else:
+                raise ValueError(f"Neznámý algoritmus {algorithm}, dostupné: anneal, genetic")
+        finally:
+            self.executor = None
+            if executor is not None:
+                executor.shutdown()
+        return OptimizationResult(self.strategy(self.best), self.best_score, history,
+                                  self.evaluations, self.cache_hits, self.rejected)
+
+if __name__ == "__main__":
+    import argparse  # Workery tento modul importují jen kvůli funkcím
+    parser = argparse.ArgumentParser(description="Search for a boarding order that minimises boarding ticks")
+    parser.add_argument('--seat_rows', type=int, default=10)
+    parser.add_argument('--seat_in_row', type=int, nargs='+', default=[3, 3])
+    parser.add_argument('--door_choice', type=str, choices=['left', 'right', 'both'], default='both')
+    parser.add_argument('--layout', type=str, default=None, help='Cabin layout (see model.py --layout)')
+    parser.add_argument('--algorithm', type=str, choices=['anneal', 'genetic'], default='anneal')
+    parser.add_argument('--objective', type=str, choices=list(OBJECTIVES), default='mean')
+    parser.add_argument('--iterations', type=int, default=50, help='Annealing iterations or GA generations')
+    parser.add_argument('--population', type=int, default=16, help='GA population size')
+    parser.add_argument('--zones', type=int, default=4, help='Number of seat-row zones per door section')
+    parser.add_argument('--replicas', type=int, default=50, help='Boardings per evaluation batch')
+    parser.add_argument('--batches', type=int, default=4, help='Evaluation batches (seeds) per candidate')
+    parser.add_argument('--reject_factor', type=float, default=1.1,
+                        help='Stop evaluating a candidate whose first batch scores worse than this times the best')
+    parser.add_argument('--engine', type=str, choices=['ensemble'] + list(ENGINES), default='ensemble',
+                        help='Simulation engine (ensemble = all replicas in one batched array, the fast path; '
+                             'vector = reference array engine, not faster than object)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default = CPU count)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cache', type=str, default=None, help='JSON file with scored batches, loaded and updated')
+    parser.add_argument('--name', type=str, default='optimized', help='Name of the exported seating strategy')
+    parser.add_argument('--output', type=str, default='optimized_order.json',
+                        help='Export the best order here (use with model.py --strategy_file)')
+    args = parser.parse_args()
+
+    config = dict(seat_rows=args.seat_rows, seat_in_row=args.seat_in_row, door_choice=args.door_choice, layout=args.layout)
+    optimizer = BoardingOptimizer(config, zones=args.zones, objective=args.objective, replicas=args.replicas,
+                                  batches=args.batches, base_seed=args.seed, engine=args.engine,
+                                  workers=args.workers, reject_factor=args.reject_factor, rng_seed=args.seed)
+    if args.cache and os.path.exists(args.cache):
+        optimizer.load_cache(args.cache)
+
+    def report(iteration, score, best):
+        print(f"[{iteration + 1}/{args.iterations}] score {score:.1f}, best {best:.1f}")
+
+    extra = {'population': args.population} if args.algorithm == 'genetic' else {}
+    result = optimizer.optimize(args.algorithm, args.iterations, on_iteration=report, **extra)
+    if args.cache:
+        optimizer.save_cache(args.cache)
+
+    strategy = result.strategy
+    strategy.name = args.name
+    with open(args.output, 'w') as f:
+        json.dump(strategy.to_dict(), f, indent=2)
+    print(f"Nejlepší {args.objective}: {result.score:.1f} tiků, simulovaných dávek {result.evaluations}, "
+          f"z cache {result.cache_hits}, zamítnuto brzy {result.rejected}")
+    print(f"Pořadí uloženo do {args.output} jako strategie '{args.name}'")
@@ -0,0 +1,99 @@
+import json
+import time
+
+import numpy as np
+
+# Fáze tiku v pořadí, v jakém proběhnou
+PHASE_SPAWN = 0
+PHASE_DECIDE = 1
+PHASE_SWAPPING = 2
+PHASE_CONFLICTS = 3
+PHASE_APPLY = 4
+PHASE_EVENTS = 5  # pygame.event.get ve SimulationView
+PHASE_DRAW = 6  # draw_grid, draw_bar a update obrazovky
+PHASE_OBSERVERS = 7  # Ostatní pozorovatelé (záznam, ...)
+
+PHASES = ['spawn', 'decide', 'swapping', 'conflicts', 'apply', 'events', 'draw', 'observers']
+
+# Počty pasažérů v tiku
+COUNTS = ['moved', 'blocked', 'in_swap']
+
+# Třída PhaseProfiler - časy fází tiku a počty pasažérů
+class PhaseProfiler:
+    """
+    Simulace (a SimulationView) volá mark(fáze) na konci každé fáze tiku, profiler
+    připíše fázi čas od předchozí značky. Bez profileru simulace jen jednou za fázi
+    porovná self.profiler s None.
+
+    setup_time je doba stavby routing tabulky (BFS) při vytvoření simulace.
+    """
+    def __init__(self):
+        self.setup_time = 0.0
+        self.ticks = []  # Číslo tiku každého provedeného tiku
+        self.timings = []  # Časy fází každého tiku (řádek = tik)
+        self.counts = []
+        self.current = [0.0] * len(PHASES)
+        self.last = None
+
+    def begin_tick(self):
+        self.current = [0.0] * len(PHASES)
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def end_tick(self, tick, moved, blocked, in_swap):
+        self.ticks.append(tick)
+        self.timings.append(self.current)
+        self.counts.append((moved, blocked, in_swap))
+
+    def per_tick(self):
+        """
+        Vrací {'tick': pole, 'spawn': časy v s, ..., 'moved': počty, ...} - jeden prvek na tik.
+        """
+        timings = np.array(self.timings, dtype=float).reshape(-1, len(PHASES))
+        counts = np.array(self.counts, dtype=np.int64).reshape(-1, len(COUNTS))
+        result = {'tick': np.array(self.ticks, dtype=np.int64)}
+        result.update({phase: timings[:, k] for k, phase in enumerate(PHASES)})
+        result.update({name: counts[:, k] for k, name in enumerate(COUNTS)})
+        return result
+
+    def summary(self):
+        """
+        Souhrn po fázích: celkový čas, průměr a maximum na tik a podíl na celku.
+        """
+        data = self.per_tick()
+        total = sum(float(data[phase].sum()) for phase in PHASES)
+        phases = {}
+        for phase in PHASES:
+            times = data[phase]
+            phases[phase] = {
+                'total': float(times.sum()),
+                'mean': float(times.mean()) if len(times) else 0.0,
+                'max': float(times.max()) if len(times) else 0.0,
+                'share': float(times.sum()) / total if total else 0.0,
+            }
+        counts = {name: {'total': int(data[name].sum()), 'mean': float(data[name].mean()) if len(data[name]) else 0.0,
+                         'max': int(data[name].max()) if len(data[name]) else 0}
+                  for name in COUNTS}
+        return {'ticks': len(self.ticks), 'setup': self.setup_time, 'total': total, 'phases': phases, 'counts': counts}
+
+    def format_table(self):
+        summary = self.summary()
+        lines = [f"{'phase':>10} {'total [ms]':>11} {'mean [us]':>10} {'max [us]':>10} {'share':>7}"]
+        for phase, stats in summary['phases'].items():
+            lines.append(f"{phase:>10} {stats['total'] * 1e3:>11.2f} {stats['mean'] * 1e6:>10.1f} "
+                         f"{stats['max'] * 1e6:>10.1f} {stats['share']:>6.1%}")
+        lines.append(f"{'tick':>10} {summary['total'] * 1e3:>11.2f} ms over {summary['ticks']} ticks, "
+                     f"setup (routing BFS) {summary['setup'] * 1e3:.2f} ms")
+        for name, stats in summary['counts'].items():
+            lines.append(f"{name:>10} {stats['total']:>11} total, {stats['mean']:.2f} per tick, max {stats['max']}")
+        return "\n".join(lines)
+
+    def to_json(self, path):
+        data = self.per_tick()
+        with open(path, 'w') as f:
+            json.dump({'summary': self.summary(),
+                       'per_tick': {key: values.tolist() for key, values in data.items()}}, f)
@@ -0,0 +1,49 @@
+import numpy as np
+
+# Nezávislé proudy náhodných čísel jedné simulace - každý účel má vlastní,
+# takže změna počtu losování v jednom (např. víc konfliktů) neposune ostatní
+STREAM_SEAT_ORDER = 1  # Náhodné klíče pořadí sedadel ve frontách strategie
+STREAM_PASSENGERS = 2  # Zavazadla a rychlost výměny, losované hromadně při inicializaci
+STREAM_MOVE = 3  # Výběr kandidáta v decide_move a doba usazování
+STREAM_CONFLICT = 4  # Výběr vítěze v resolve_conflicts
+STREAMS = [STREAM_SEAT_ORDER, STREAM_PASSENGERS, STREAM_MOVE, STREAM_CONFLICT]
+
+# Třída RandomStream - vlastní numpy Generator s rozhraním modulu random
+class RandomStream:
+    """
+    random(), randint(a, b) a choice(seq) se stejným významem jako v modulu random,
+    takže ho Passenger používá místo globálního random. Čísla se losují po blocích
+    block_size (jedno volání Generatoru) a vydávají po jednom jako float.
+    Výsledek závisí jen na seedu, ne na vláknech, procesech ani jiných simulacích.
+    """
+    def __init__(self, seed_sequence, block_size=1024):
+        self.generator = np.random.Generator(np.random.PCG64(seed_sequence))
+        self.block_size = block_size
+        self.buffer = []
+        self.index = 0
+
+    def random(self):
+        if self.index == len(self.buffer):
+            self.buffer = self.generator.random(self.block_size).tolist()
+            self.index = 0
+        value = self.buffer[self.index]
+        self.index += 1
+        return value
+
+    def randint(self, a, b):
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def getstate(self):
+        return self.generator.bit_generator.state, self.buffer[self.index:]
+
+    def setstate(self, state):
+        self.generator.bit_generator.state, buffer = state
+        self.buffer = list(buffer)
+        self.index = 0
+
+def simulation_streams(seed):
+    # Proud účelu p je SeedSequence(seed, spawn_key=(p,)) - stejný princip jako batch.derive_seed
+    return {purpose: RandomStream(np.random.SeedSequence(seed, spawn_key=(purpose,))) for purpose in STREAMS}
@@ -0,0 +1,117 @@
+import json
+import os
+
+import numpy as np
+
+from model import STATE_NOT_SPAWNED, STATE_MASK, STATE_SEATED, SimulationObserver
+
+TRACE_VERSION = 1
+
+# Jeden pasažér v jednom snímku: pozice v matici a kód stavu (viz Passenger.state_code)
+PASSENGER_DTYPE = np.dtype([('row', '<u2'), ('col', '<u2'), ('code', 'u1')])
+
+def frame_dtype(capacity):
+    # Snímek = tik + všichni pasažéři letadla (index = ped_id)
+    return np.dtype([('tick', '<i4'), ('passengers', PASSENGER_DTYPE, (capacity,))])
+
+def meta_path(path):
+    return path + '.json'
+
+# Třída TraceRecorder - zapisuje stav pasažérů po každém tiku do binárního souboru
+class TraceRecorder(SimulationObserver):
+    """
+    Pozorovatel, který po každém tiku uloží pozice a kódy stavu všech pasažérů.
+    Snímky se hromadí v bufferu o chunk_ticks snímcích a zapisují se na disk po celých
+    blocích, paměť je tedy konstantní i u dlouhých běhů. Vedle souboru se snímky
+    vznikne path.json s rozložením letadla a počtem snímků.
+    """
+    def __init__(self, path, chunk_ticks=256, metadata=None):
+        self.path = path
+        self.chunk_ticks = chunk_ticks
+        self.metadata = dict(metadata) if metadata else {}
+        self.file = None
+
+    def on_start(self, simulation):
+        self.capacity = len(simulation.seat_positions)
+        self.dtype = frame_dtype(self.capacity)
+        self.buffer = np.zeros(self.chunk_ticks, dtype=self.dtype)
+        self.buffered = 0
+        self.frames = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, 'wb')
+        self.record(simulation)  # Snímek výchozího stavu (tik 0)
+
+    def on_tick(self, simulation):
+        self.record(simulation)
+
+    def on_finish(self, simulation):
+        self.flush()
+        self.file.close()
+        self.file = None
+
+        meta = {
+            'version': TRACE_VERSION,
+            'capacity': self.capacity,
+            'frames': self.frames,
+            'ticks': simulation.tick,
+            'matrix': simulation.matrix.tolist(),
+            'door_positions': [list(door) for door in simulation.door_positions],
+            'seating_strategy': str(simulation.seating_strategy),
+            'ticks_per_second': simulation.ticks_per_second,
+        }
+        meta.update(self.metadata)
+        with open(meta_path(self.path), 'w') as f:
+            json.dump(meta, f)
+
+    def record(self, simulation):
+        frame = self.buffer[self.buffered]
+        frame['tick'] = simulation.tick
+        passengers = frame['passengers']
+        simulation.passenger_states(passengers['row'], passengers['col'], passengers['code'])
+        self.buffered += 1
+        if self.buffered == self.chunk_ticks:
+            self.flush()
+
+    def flush(self):
+        self.buffer[:self.buffered].tofile(self.file)
+        self.frames += self.buffered
+        self.buffered = 0
+
+# Třída Trace - čtení uloženého záznamu (memory-mapped, snímky se načítají až při přístupu)
+class Trace:
+    def __init__(self, path):
+        self.path = path
+        with open(meta_path(path)) as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != TRACE_VERSION:
+            raise ValueError(f"Nepodporovaná verze záznamu {self.meta['version']}")
+
+        self.capacity = self.meta['capacity']
+        self.matrix = np.array(self.meta['matrix'], dtype=float)
+        self.door_positions = [tuple(door) for door in self.meta['door_positions']]
+        self.frames = np.memmap(path, dtype=frame_dtype(self.capacity), mode='r', shape=(self.meta['frames'],))
+        self.ticks = self.frames['tick']
+
+    def __len__(self):
+        return len(self.frames)
+
+    def frame(self, index):
+        """
+        Vrací (řádky, sloupce, kódy stavu) pasažérů ve snímku index.
+        """
+        passengers = self.frames[index]['passengers']
+        return passengers['row'], passengers['col'], passengers['code']
+
+    def index_of_tick(self, tick):
+        # Poslední snímek s tikem <= tick (pro přeskakování na konkrétní čas)
+        return max(int(np.searchsorted(self.ticks, tick, side='right')) - 1, 0)
+
+    def seated_counts(self):
+        # Počet usazených pasažérů v každém snímku
+        return np.count_nonzero((self.frames['passengers']['code'] & STATE_MASK) == STATE_SEATED, axis=1)
+
+    def spawned_counts(self):
+        return np.count_nonzero(self.frames['passengers']['code'] != STATE_NOT_SPAWNED, axis=1)
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from distance_cache import default_cache, layout_fingerprint
+
+# Směry v pořadí, ve kterém je prochází Passenger.decide_move, a jejich bity v next-hop masce
+DIRECTIONS = [
+    (-1, 0),  # Nahoru
+    (1, 0),   # Dolů
+    (0, -1),  # Vlevo
+    (0, 1)    # Vpravo
+]
+DIRECTION_BITS = [1 << k for k in range(len(DIRECTIONS))]
+
+# Rozbalení masky na seznam (dx, dy) - maska má jen 16 možných hodnot
+MASK_DIRECTIONS = [
+    [DIRECTIONS[k] for k in range(len(DIRECTIONS)) if mask & DIRECTION_BITS[k]]
+    for mask in range(1 << len(DIRECTIONS))
+]
+
+# Funkce pro převod distance matic na next-hop masky
+def next_hop_masks(distance_fields):
+    """
+    Pro každou buňku spočítá bitovou masku sousedů, kteří jsou blíže k sedadlu.
+    distance_fields má tvar (počet sedadel, řádky, sloupce), výsledek je uint8 stejného tvaru.
+    Grid je bipartitní, takže sousedé jsou vždy o 1 blíže, nebo o 1 dále - maska tedy
+    obsahuje přesně ty kandidáty, mezi kterými vybírá decide_move.
+    """
+    fields = np.asarray(distance_fields)
+    masks = np.zeros(fields.shape, dtype=np.uint8)
+    walkable = np.isfinite(fields)
+    for k, (dx, dy) in enumerate(DIRECTIONS):
+        # Buňky, které mají souseda ve směru (dx, dy), a jejich sousedé - pohledy, bez kopií
+        rows = slice(max(dx, 0), fields.shape[1] + min(dx, 0))
+        cols = slice(max(dy, 0), fields.shape[2] + min(dy, 0))
+        target_rows = slice(max(-dx, 0), fields.shape[1] + min(-dx, 0))
+        target_cols = slice(max(-dy, 0), fields.shape[2] + min(-dy, 0))
+        closer = fields[:, rows, cols] < fields[:, target_rows, target_cols]  # Nekonečný soused nikdy není blíž
+        closer &= walkable[:, target_rows, target_cols]
+        masks[:, target_rows, target_cols] |= np.left_shift(closer.view(np.uint8), k)
+    return masks
+
+# Třída RoutingTable - sdílená tabulka dalších kroků pro všechna sedadla jednoho rozložení
+class RoutingTable:
+    """
+    Jeden bajt na (buňku, cílové sedadlo) místo float64 distance matice na pasažéra.
+    Pasažér drží jen pohled route(seat) do sdílené tabulky.
+    Distance matice, které kvůli stavbě spočítal nebo načetl z disku, po stavbě uvolní.
+    Tabulky předpočítané předem (DistanceFieldCache.precompute) nechá v cache, takže
+    přestavba tabulky vyhozené z get_routing_table je pak spouštět BFS nemusí.
+    """
+    def __init__(self, matrix, seat_positions, distance_cache=None, fingerprint=None):
+        if distance_cache is None:
+            distance_cache = default_cache
+        if fingerprint is None:
+            fingerprint = layout_fingerprint(matrix)
+
+        self.fingerprint = fingerprint
+        self.seat_positions = [tuple(seat) for seat in seat_positions]
+        created = fingerprint not in distance_cache.tables
+        fields = distance_cache.precompute(matrix, self.seat_positions, fingerprint)
+
+        # precompute může vrátit tabulku načtenou z disku s jiným pořadím sedadel
+        table_seats = distance_cache.tables[fingerprint][0]
+        order = [table_seats[seat] for seat in self.seat_positions]
+        self.seat_index = {seat: index for index, seat in enumerate(self.seat_positions)}
+        self.next_hops = next_hop_masks(fields[order])
+        self.next_hops.flags.writeable = False
+        # Float32 matice jsou potřeba jen ke stavbě - simulace dál drží jen uint8 tabulku
+        if created:
+            distance_cache.release(fingerprint)
+
+    def route(self, seat_pos):
+        index = self.seat_index.get(seat_pos)
+        if index is None:
+            raise ValueError(f"seat_pos {seat_pos} není sedadlem tohoto rozložení")
+        return self.next_hops[index]
+
+    @property
+    def nbytes(self):
+        return self.next_hops.nbytes
+
+# Tabulky pro naposledy použitá rozložení (sdílené mezi běhy v jednom procesu)
+_routing_tables = OrderedDict()
+MAX_ROUTING_TABLES = 8
+
+def get_routing_table(matrix, seat_positions, fingerprint=None, distance_cache=None):
+    if fingerprint is None:
+        fingerprint = layout_fingerprint(matrix)
+
+    table = _routing_tables.get(fingerprint)
+    if table is not None and all(tuple(seat) in table.seat_index for seat in seat_positions):
+        _routing_tables.move_to_end(fingerprint)
+        return table
+
+    table = RoutingTable(matrix, seat_positions, distance_cache, fingerprint)
+    _routing_tables[fingerprint] = table
+    if len(_routing_tables) > MAX_ROUTING_TABLES:
+        _routing_tables.popitem(last=False)
+    return table
+
+def clear_routing_tables():
+    _routing_tables.clear()
@@ -1,46 +1,173 @@
-import numpy as np
-import random
-import matplotlib.pyplot as plt
-from collections import deque, defaultdict
-import pygame
 import argparse
-from time import time
-
-from model import Simulation
-
-# Define the seating strategies to compare
-seating_strategies = ['random', 'door_wise', 'window_wise', 'optimal']
-num_runs = 10
-results = {strategy: [] for strategy in seating_strategies}
-
-# Function to run a single simulation for a given strategy and return time to finish
-def run_simulation_for_strategy(strategy):
-    # Reinitialize simulation with the specific seating strategy
-    simulation = Simulation(
-        seat_rows=5,  # Example parameters
-        seat_in_row=[3, 3],
-        door_choice='both',
-        baggage_probability=0.6,
-        ticks_per_second=5000,
-        seating_strategy=strategy
-    )
-    time_to_finish, ticks, _ = simulation.run()
-    return time_to_finish / 1000, ticks  # Convert to seconds
-
-# Run the simulations for all strategies and store the results
-for strategy in seating_strategies:
-    for _ in range(num_runs):
-        random.seed(_)  # Use different seeds for each run
-        np.random.seed(_)  # Set the seed for reproducibility
-        time_taken, ticks_taken = run_simulation_for_strategy(strategy)
-        results[strategy].append(ticks_taken)
-
-# Create a boxplot comparing the time taken for each seating strategy
-plt.figure(figsize=(8, 6))
-plt.boxplot(results.values(), tick_labels=seating_strategies)  # Update labels to tick_labels
-plt.title("Comparison of Different Seating Strategies")
-plt.ylabel("Game ticks")
-plt.xlabel("Seating Strategy")
-plt.grid(True)
-plt.show()
+import json
 
+from batch import AdaptiveRunner, BatchRunner, ENGINES, aggregate_ensemble, heatmap_ensemble, run_ensemble
+from heatmap import LAYERS, save_heatmaps
+from strategies import STRATEGIES
+
+# Define the seating strategies to compare (všechny zaregistrované)
+seating_strategies = list(STRATEGIES)
+
+# Funkce pro načtení konfigurace dávkového běhu
+def get_batch_configuration():
+    parser = argparse.ArgumentParser(description="Compare seating strategies over many simulation runs")
+    parser.add_argument('--num_runs', type=int, default=10, help='Number of runs per seating strategy')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes (default: number of CPUs, 1 = no process pool)')
+    parser.add_argument('--seed', type=int, default=0, help='Base seed from which every run derives its own seed')
+    parser.add_argument('--engine', type=str, choices=sorted(ENGINES) + ['ensemble'], default='object',
+                        help='Simulation engine (vector = reference array engine, not faster for single runs; '
+                             'ensemble = all runs of a strategy in one batched array, the fast path)')
+    parser.add_argument('--chunk_size', type=int, default=1, help='Number of runs sent to a worker at once')
+    parser.add_argument('--trace_dir', type=str, default=None,
+                        help='Record every run into this directory for later replay (not with --engine ensemble)')
+    parser.add_argument('--ci_width', type=float, default=None,
+                        help='Adaptive mode: add runs to a strategy until the confidence interval of its '
+                             'boarding ticks is at most this wide (or its ranking is clear); --num_runs is ignored')
+    parser.add_argument('--confidence', type=float, default=0.95, help='Confidence level of the intervals')
+    parser.add_argument('--quantile', type=float, default=None,
+                        help='Estimate this quantile of boarding ticks (e.g. 0.9) instead of the mean')
+    parser.add_argument('--min_runs', type=int, default=5, help='Adaptive mode: runs per strategy before the first check')
+    parser.add_argument('--max_runs', type=int, default=100, help='Adaptive mode: hard cap on runs per strategy')
+    parser.add_argument('--step', type=int, default=5, help='Adaptive mode: runs added per strategy in each round')
+    parser.add_argument('--aggregate', action='store_true',
+                        help='Keep only streaming statistics (mean/std/quantiles and a seated-over-time band) '
+                             'instead of every result, for very many runs')
+    parser.add_argument('--bin_size', type=int, default=1, help='Aggregate mode: ticks per bin of the seated band')
+    parser.add_argument('--batch_size', type=int, default=1000,
+                        help='Aggregate and heatmap mode with --engine ensemble: replicas simulated at once')
+    parser.add_argument('--save_aggregates', type=str, default=None, help='Aggregate mode: write the statistics to this JSON file')
+    parser.add_argument('--heatmap', type=str, default=None,
+                        help='Heatmap mode: sum per-cell occupancy, blocked, swap and baggage ticks over all runs of '
+                             'each strategy, write them to this JSON file and plot them')
+    parser.add_argument('--heatmap_layer', type=str, choices=LAYERS, default=None,
+                        help='Heatmap mode: plot only this layer (default: all layers)')
+    args = parser.parse_args()
+    if args.aggregate and args.ci_width is not None:
+        parser.error('--aggregate cannot be combined with --ci_width')
+    if args.heatmap and (args.aggregate or args.ci_width is not None):
+        parser.error('--heatmap cannot be combined with --aggregate or --ci_width')
+    if args.ci_width is not None and args.engine == 'ensemble':
+        parser.error('--ci_width needs --engine object or vector')
+    return args
+
+# Souhrn a grafy z agregátů (stats.RunAggregate) - bez jednotlivých výsledků běhů
+def show_aggregates(aggregates, save_path=None):
+    print(f"{'strategy':>12} {'runs':>7} {'unfinished':>10} {'mean':>8} {'std':>7} {'p5':>5} {'p50':>5} {'p95':>5}")
+    for strategy, aggregate in aggregates.items():
+        summary = aggregate.summary()
+        print(f"{strategy:>12} {summary['runs']:>7} {summary['unfinished']:>10} {summary['mean']:>8.1f} "
+              f"{summary['std']:>7.1f} {summary['p5']:>5} {summary['p50']:>5} {summary['p95']:>5}")
+    if save_path is not None:
+        with open(save_path, 'w') as f:
+            json.dump({strategy: aggregate.to_dict() for strategy, aggregate in aggregates.items()}, f)
+        print(f"Agregáty uloženy do {save_path}")
+
+    import matplotlib.pyplot as plt  # Až po bězích - workery ho nenačítají
+    figure, (box_axes, band_axes) = plt.subplots(1, 2, figsize=(14, 6))
+    # Boxplot z kvantilů histogramu (vousy = p5 a p95), bez seznamu všech výsledků
+    boxes = []
+    for strategy, aggregate in aggregates.items():
+        histogram = aggregate.histogram
+        boxes.append({'label': strategy, 'whislo': histogram.quantile(0.05), 'q1': histogram.quantile(0.25),
+                      'med': histogram.quantile(0.5), 'q3': histogram.quantile(0.75),
+                      'whishi': histogram.quantile(0.95), 'fliers': []})
+    box_axes.bxp(boxes, showfliers=False)
+    box_axes.set_title("Comparison of Different Seating Strategies")
+    box_axes.set_ylabel("Game ticks")
+    box_axes.set_xlabel("Seating Strategy (whiskers: 5th and 95th percentile)")
+    box_axes.grid(True)
+
+    # Pás usazených v čase: medián a rozmezí p5-p95 přes běhy
+    for strategy, aggregate in aggregates.items():
+        band = aggregate.band
+        line, = band_axes.plot(band.ticks, band.quantile(0.5), label=strategy)
+        band_axes.fill_between(band.ticks, band.quantile(0.05), band.quantile(0.95), color=line.get_color(), alpha=0.2)
+    band_axes.set_title("Seated passengers over time (median, 5th-95th percentile)")
+    band_axes.set_xlabel("Game ticks")
+    band_axes.set_ylabel("Seated passengers")
+    band_axes.legend()
+    band_axes.grid(True)
+    plt.show()
+
+# Průměrné počty tiků na běh v každé buňce - řádek = strategie, sloupec = vrstva
+def show_heatmaps(heatmaps, layers=LAYERS):
+    import matplotlib.pyplot as plt  # Až po bězích - workery ho nenačítají
+    figure, axes = plt.subplots(len(heatmaps), len(layers), figsize=(4 * len(layers), 2.5 * len(heatmaps)),
+                                squeeze=False)
+    for row, (strategy, heatmap) in enumerate(heatmaps.items()):
+        for col, layer in enumerate(layers):
+            image = axes[row, col].imshow(heatmap.per_run(layer), cmap='hot_r')
+            axes[row, col].set_title(f"{strategy}: {layer}")
+            axes[row, col].set_xticks([])
+            axes[row, col].set_yticks([])
+            figure.colorbar(image, ax=axes[row, col], label="Ticks per run")
+    figure.suptitle("Congestion per cell (mean ticks per run)")
+    plt.tight_layout()
+    plt.show()
+
+if __name__ == "__main__":
+    args = get_batch_configuration()
+
+    configs = {
+        strategy: dict(
+            seat_rows=5,  # Example parameters
+            seat_in_row=[3, 3],
+            door_choice='both',
+            baggage_probability=0.6,
+            seating_strategy=strategy
+        )
+        for strategy in seating_strategies
+    }
+
+    # Run the simulations for all strategies, results stream back as they finish
+    report = lambda r: print(f"{r.key} run {r.replica}: {r.ticks} ticks")
+    if args.aggregate:
+        if args.engine == 'ensemble':
+            aggregates = aggregate_ensemble(configs, num_runs=args.num_runs, base_seed=args.seed,
+                                            batch_size=args.batch_size, bin_size=args.bin_size)
+        else:
+            runner = BatchRunner(configs, num_runs=args.num_runs, workers=args.workers, base_seed=args.seed,
+                                 engine=args.engine, chunk_size=args.chunk_size, trace_dir=args.trace_dir)
+            aggregates = runner.aggregate(bin_size=args.bin_size)
+    elif args.heatmap:
+        if args.engine == 'ensemble':
+            heatmaps = heatmap_ensemble(configs, num_runs=args.num_runs, base_seed=args.seed, batch_size=args.batch_size)
+        else:
+            runner = BatchRunner(configs, num_runs=args.num_runs, workers=args.workers, base_seed=args.seed,
+                                 engine=args.engine, chunk_size=args.chunk_size, trace_dir=args.trace_dir)
+            heatmaps = runner.heatmaps()
+    elif args.ci_width is not None:
+        runner = AdaptiveRunner(configs, ci_width=args.ci_width, confidence=args.confidence, quantile=args.quantile,
+                                min_runs=args.min_runs, max_runs=args.max_runs, step=args.step,
+                                workers=args.workers, base_seed=args.seed, engine=args.engine,
+                                chunk_size=args.chunk_size, trace_dir=args.trace_dir)
+        results = runner.run(on_result=report)
+        statistic = 'mean' if args.quantile is None else f"p{args.quantile * 100:g}"
+        print(f"{'strategy':>12} {'runs':>5} {statistic:>8} {f'{args.confidence:.0%} CI':>17}  stopped")
+        for strategy, estimate in runner.estimates.items():
+            print(f"{strategy:>12} {estimate.runs:>5} {estimate.estimate:>8.1f} "
+                  f"[{estimate.low:>7.1f}, {estimate.high:>7.1f}]  {estimate.stopped}")
+    elif args.engine == 'ensemble':
+        results = run_ensemble(configs, num_runs=args.num_runs, base_seed=args.seed, on_result=report)
+    else:
+        runner = BatchRunner(configs, num_runs=args.num_runs, workers=args.workers, base_seed=args.seed,
+                             engine=args.engine, chunk_size=args.chunk_size, trace_dir=args.trace_dir)
+        results = runner.run(on_result=report)
+
+    if args.aggregate:
+        show_aggregates(aggregates, args.save_aggregates)
+    elif args.heatmap:
+        save_heatmaps(heatmaps, args.heatmap)
+        print(f"Heatmapy uloženy do {args.heatmap} (python view.py TRACE --heatmap {args.heatmap} ukáže překryv)")
+        show_heatmaps(heatmaps, [args.heatmap_layer] if args.heatmap_layer else LAYERS)
+    else:
+        # Create a boxplot comparing the time taken for each seating strategy
+        import matplotlib.pyplot as plt  # Až po bězích - workery ho nenačítají
+        plt.figure(figsize=(8, 6))
+        plt.boxplot(results.values(), tick_labels=seating_strategies)  # Update labels to tick_labels
+        plt.title("Comparison of Different Seating Strategies")
+        plt.ylabel("Game ticks")
+        plt.xlabel("Seating Strategy")
+        plt.grid(True)
+        plt.show()
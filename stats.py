@@ -0,0 +1,278 @@
+import numpy as np
+
+# Průběžné statistiky přes mnoho běhů v konstantní paměti. Všechny akumulátory jdou
+# sloučit (merge), takže každý worker může agregovat své běhy a rodič jen sčítá výsledky.
+
+# Třída RunningStats - průměr a rozptyl Welfordovým algoritmem
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Součet čtverců odchylek od průměru
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=float)
+        if len(values):
+            other = RunningStats()
+            other.count = len(values)
+            other.mean = float(values.mean())
+            other.m2 = float(((values - other.mean) ** 2).sum())
+            other.min = float(values.min())
+            other.max = float(values.max())
+            self.merge(other)
+
+    def merge(self, other):
+        # Chanův vzorec pro sloučení dvou skupin
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.variance))
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2, 'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count, stats.mean, stats.m2, stats.min, stats.max = (data[name] for name in
+                                                                   ('count', 'mean', 'm2', 'min', 'max'))
+        return stats
+
+# Třída TickHistogram - přesné kvantily celočíselných počtů tiků
+class TickHistogram:
+    """
+    Počty tiků jsou malá celá čísla, takže histogram po jednom tiku je přesný
+    "sketch": paměť roste s nejdelším během, ne s počtem běhů, a kvantily jsou
+    stejné jako z úplného seznamu (np.quantile s method='inverted_cdf').
+    """
+    def __init__(self):
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def grow(self, size):
+        if size > len(self.counts):
+            self.counts = np.concatenate([self.counts, np.zeros(max(size, 2 * len(self.counts)) - len(self.counts),
+                                                                dtype=np.int64)])
+
+    def add_many(self, ticks):
+        ticks = np.asarray(ticks, dtype=np.int64)
+        if len(ticks) and ticks.min() < 0:
+            raise ValueError("Záporný počet tiků - nedokončený běh patří do RunAggregate.add_unfinished")
+        if len(ticks):
+            self.grow(int(ticks.max()) + 1)
+            np.add.at(self.counts, ticks, 1)
+
+    def add(self, ticks):
+        self.add_many([ticks])
+
+    def merge(self, other):
+        self.grow(len(other.counts))
+        self.counts[:len(other.counts)] += other.counts
+        return self
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def quantile(self, q):
+        # Nejmenší počet tiků, pod kterým (včetně) je alespoň podíl q běhů
+        cumulative = np.cumsum(self.counts)
+        if len(cumulative) == 0 or cumulative[-1] == 0:
+            return np.nan
+        return int(np.searchsorted(cumulative, max(q * cumulative[-1], 1), side='left'))
+
+    def to_dict(self):
+        nonzero = np.flatnonzero(self.counts)
+        return {'ticks': nonzero.tolist(), 'counts': self.counts[nonzero].tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        if data['ticks']:
+            histogram.grow(max(data['ticks']) + 1)
+            histogram.counts[data['ticks']] = data['counts']
+        return histogram
+
+# Třída SeatedBand - pás "usazení v čase" přes běhy (medián a kvantily křivky)
+class SeatedBand:
+    """
+    Pro každý časový koš (bin_size tiků) drží histogram počtu usazených pasažérů
+    přes běhy: counts[koš, počet usazených]. Paměť je koše x (počet sedadel + 1)
+    bez ohledu na počet běhů, kvantily křivky jsou přesné na hranicích košů.
+    final je histogram konečného počtu usazených (běhy přerušené max_ticks nemají všechny).
+    """
+    def __init__(self, n_seats, bin_size=1):
+        self.n_seats = n_seats
+        self.bin_size = bin_size
+        self.runs = 0
+        self.counts = np.zeros((0, n_seats + 1), dtype=np.int64)
+        self.final = np.zeros(n_seats + 1, dtype=np.int64)
+
+    def grow(self, bins):
+        if bins > len(self.counts):
+            # Dřívější běhy už v pozdějších koších mají svůj konečný počet usazených
+            extra = np.tile(self.final, (max(bins, 2 * len(self.counts)) - len(self.counts), 1))
+            self.counts = np.concatenate([self.counts, extra])
+
+    def add(self, seated_at):
+        """
+        seated_at jsou tiky usazení jednoho běhu (v libovolném pořadí, -1 = neusazen).
+        """
+        seated_at = np.sort(np.asarray(seated_at, dtype=np.int64))
+        seated_at = seated_at[seated_at >= 0]
+        last = int(seated_at[-1]) if len(seated_at) else 0
+        self.grow(-(-last // self.bin_size) + 1)  # Poslední hranice koše až po posledním usazení
+        edges = np.arange(len(self.counts)) * self.bin_size
+        seated = np.searchsorted(seated_at, edges, side='right')  # Usazení do konce tiku na hranici koše
+        self.counts[np.arange(len(self.counts)), seated] += 1
+        self.final[len(seated_at)] += 1
+        self.runs += 1
+
+    def add_many(self, seated_at):
+        """
+        Dávka běhů najednou - seated_at má tvar (běhy, sedadla), -1 = neusazen.
+        """
+        seated_at = np.asarray(seated_at, dtype=np.int64)
+        runs = len(seated_at)
+        if runs == 0:
+            return
+        seated = seated_at >= 0
+        self.grow(-(-int(seated_at.max(initial=0)) // self.bin_size) + 1)
+        bins = len(self.counts)
+
+        # První hranice koše, ve které už pasažér sedí, a z toho kumulativní počty usazených
+        first_bin = -(-seated_at // self.bin_size)
+        per_bin = np.zeros((runs, bins + 1), dtype=np.int64)
+        np.add.at(per_bin, (np.nonzero(seated)[0], first_bin[seated]), 1)
+        seated_counts = np.cumsum(per_bin[:, :bins], axis=1)
+
+        np.add.at(self.counts, (np.broadcast_to(np.arange(bins), (runs, bins)), seated_counts), 1)
+        np.add.at(self.final, seated.sum(axis=1), 1)
+        self.runs += runs
+
+    def merge(self, other):
+        if (other.n_seats, other.bin_size) != (self.n_seats, self.bin_size):
+            raise ValueError("Nelze sloučit pásy s jiným počtem sedadel nebo velikostí koše")
+        self.grow(len(other.counts))
+        other_counts = other.counts
+        if len(other_counts) < len(self.counts):
+            other_counts = np.concatenate([other_counts, np.tile(other.final, (len(self.counts) - len(other_counts), 1))])
+        self.counts += other_counts
+        self.final += other.final
+        self.runs += other.runs
+        return self
+
+    @property
+    def ticks(self):
+        # Tik na hranici každého koše, dokud se alespoň v jednom běhu ještě usazuje
+        busy = np.flatnonzero((self.counts != self.final).any(axis=1))
+        bins = busy[-1] + 2 if len(busy) else 1
+        return np.arange(min(bins, len(self.counts))) * self.bin_size
+
+    def quantile(self, q):
+        """
+        Počet usazených v časech self.ticks, pod kterým je podíl q běhů.
+        """
+        cumulative = np.cumsum(self.counts[:len(self.ticks)], axis=1)
+        target = np.maximum(q * self.runs, 1)
+        return np.argmax(cumulative >= target, axis=1)
+
+    def to_dict(self):
+        return {'n_seats': self.n_seats, 'bin_size': self.bin_size, 'runs': self.runs,
+                'counts': self.counts[:len(self.ticks)].tolist(), 'final': self.final.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        band = cls(data['n_seats'], data['bin_size'])
+        band.runs = data['runs']
+        band.counts = np.array(data['counts'], dtype=np.int64).reshape(-1, band.n_seats + 1)
+        band.final = np.array(data['final'], dtype=np.int64)
+        return band
+
+# Třída RunAggregate - všechny statistiky jedné konfigurace
+class RunAggregate:
+    """
+    Přijímá výsledky běhů (počet tiků, tiky usazení) a drží z nich jen RunningStats
+    a TickHistogram počtu tiků a SeatedBand křivky usazení. Agregáty z workerů
+    se sloučí přes merge, výsledek nezávisí na pořadí běhů ani rozdělení mezi workery.
+    Běhy přerušené max_ticks nemají počet tiků - add_unfinished je jen spočítá
+    (unfinished) a přidá do křivky usazení, statistiky tiků jsou jen z dokončených.
+    """
+    def __init__(self, n_seats, bin_size=1):
+        self.stats = RunningStats()
+        self.histogram = TickHistogram()
+        self.band = SeatedBand(n_seats, bin_size)
+        self.unfinished = 0
+
+    def add(self, ticks, seated_at=None):
+        self.histogram.add(ticks)  # Jako první - záporné tiky vyvolají ValueError před změnou stats
+        self.stats.add(ticks)
+        if seated_at is not None:
+            self.band.add(seated_at)
+
+    def add_many(self, ticks, seated_at=None):
+        # Dávka dokončených běhů, např. z EnsembleSimulation: ticks (R,), seated_at (R, počet sedadel)
+        self.histogram.add_many(ticks)
+        self.stats.add_many(ticks)
+        if seated_at is not None:
+            self.band.add_many(seated_at)
+
+    def add_unfinished(self, runs=1, seated_at=None):
+        # seated_at tvaru (runs, sedadla), -1 = neusazen
+        self.unfinished += runs
+        if seated_at is not None:
+            self.band.add_many(seated_at)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.histogram.merge(other.histogram)
+        self.band.merge(other.band)
+        self.unfinished += other.unfinished
+        return self
+
+    @property
+    def count(self):
+        return self.stats.count
+
+    def summary(self, quantiles=(0.05, 0.5, 0.95)):
+        summary = {'runs': self.stats.count, 'unfinished': self.unfinished, 'mean': self.stats.mean, 'std': self.stats.std,
+                   'min': self.stats.min, 'max': self.stats.max}
+        for q in quantiles:
+            summary[f"p{q * 100:g}"] = self.histogram.quantile(q)
+        return summary
+
+    def to_dict(self):
+        return {'stats': self.stats.to_dict(), 'histogram': self.histogram.to_dict(), 'band': self.band.to_dict(),
+                'unfinished': self.unfinished}
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregate = cls(data['band']['n_seats'], data['band']['bin_size'])
+        aggregate.stats = RunningStats.from_dict(data['stats'])
+        aggregate.histogram = TickHistogram.from_dict(data['histogram'])
+        aggregate.band = SeatedBand.from_dict(data['band'])
+        aggregate.unfinished = data.get('unfinished', 0)  # Soubory z dřívějších verzí pole nemají
+        return aggregate
@@ -0,0 +1,166 @@
+import json
+from collections import namedtuple
+
+# Plán nástupu, který strategie sestaví jednou při startu simulace:
+# groups - seznamy sedadel, každý je jedna fronta
+# door_groups - index fronty pro každé dveře (ve stejném pořadí jako door_positions)
+# ranks - pro každou frontu celočíselné pořadí sedadel (menší nastupuje dřív, stejné = náhodné pořadí)
+SeatingPlan = namedtuple('SeatingPlan', ['groups', 'door_groups', 'ranks'])
+
+# Registr strategií: jméno -> funkce(airplane) vracející SeatingPlan
+STRATEGIES = {}
+
+def register_strategy(name, builder=None):
+    """
+    Zaregistruje strategii. Lze použít přímo register_strategy('jméno', funkce)
+    nebo jako dekorátor @register_strategy('jméno').
+    """
+    def register(builder):
+        STRATEGIES[name] = builder
+        return builder
+    return register if builder is None else register(builder)
+
+def build_plan(strategy, airplane):
+    # strategy je jméno v registru nebo přímo builder (funkce airplane -> SeatingPlan)
+    builder = strategy if callable(strategy) else STRATEGIES.get(strategy)
+    if builder is None:
+        raise ValueError(f"Neznámá strategie {strategy}, dostupné: {', '.join(sorted(STRATEGIES))}")
+    return builder(airplane)
+
+def seat_tiers(seat_in_row):
+    """
+    Vrací {řádek matice: vzdálenost od nejbližší uličky} pro řádky se sedadly
+    (1 = sedadlo u uličky, největší = u okna). Počítá s rozložením z Airplane:
+    zeď, sekce sedadel oddělené uličkou, zeď.
+    """
+    tiers = {}
+    row = 1
+    last = len(seat_in_row) - 1
+    for section, seats in enumerate(seat_in_row):
+        for k in range(seats):
+            distances = []
+            if section > 0:
+                distances.append(k + 1)  # Ulička před sekcí
+            if section < last:
+                distances.append(seats - k)  # Ulička za sekcí
+            tiers[row + k] = min(distances) if distances else seats - k
+        row += seats + 1
+    return tiers
+
+def door_sections(seat_positions, door_positions):
+    """
+    Rozdělí sedadla podle pozice v trupu (sloupce) na stejně velké souvislé části,
+    jednu pro každé dveře - přední dveře dostanou přední část.
+    Vrací (seznamy sedadel, index části pro každé dveře).
+    """
+    seats = sorted(seat_positions, key=lambda seat: seat[1])
+    doors = sorted(range(len(door_positions)), key=lambda d: door_positions[d][1])
+    count = len(doors)
+    sections = [seats[k * len(seats) // count:(k + 1) * len(seats) // count] for k in range(count)]
+    door_groups = [0] * count
+    for section, door in enumerate(doors):
+        door_groups[door] = section
+    return sections, door_groups
+
+def window_ranks(seats, seat_in_row):
+    # Okno -> prostřední -> ulička
+    tiers = seat_tiers(seat_in_row)
+    widest = max(tiers.values())
+    return [widest - tiers.get(seat[0], 1) for seat in seats]
+
+@register_strategy('random')
+def random_strategy(airplane):
+    # Jedna společná fronta v náhodném pořadí
+    seats = list(airplane.seat_positions)
+    return SeatingPlan([seats], [0] * len(airplane.door_positions), [[0] * len(seats)])
+
+@register_strategy('door_wise')
+def door_wise_strategy(airplane):
+    # Každé dveře mají svou část letadla, uvnitř části náhodné pořadí
+    sections, door_groups = door_sections(airplane.seat_positions, airplane.door_positions)
+    return SeatingPlan(sections, door_groups, [[0] * len(section) for section in sections])
+
+@register_strategy('window_wise')
+def window_wise_strategy(airplane):
+    # Jedna fronta po vrstvách okno -> prostřední -> ulička, uvnitř vrstvy náhodně
+    seats = list(airplane.seat_positions)
+    return SeatingPlan([seats], [0] * len(airplane.door_positions), [window_ranks(seats, airplane.seat_in_row)])
+
+@register_strategy('optimal')
+def optimal_strategy(airplane):
+    # Fronta pro každé dveře: řady od nejvzdálenější ke dveřím, v řadě okno -> ulička
+    sections, door_groups = door_sections(airplane.seat_positions, airplane.door_positions)
+    tiers = seat_tiers(airplane.seat_in_row)
+    ranks = []
+    for section_index, section in enumerate(sections):
+        door = airplane.door_positions[door_groups.index(section_index)]
+        order = sorted(range(len(section)), key=lambda i: (-abs(section[i][1] - door[1]),
+                                                           -tiers.get(section[i][0], 1), -section[i][0]))
+        rank = [0] * len(section)
+        for position, i in enumerate(order):
+            rank[i] = position
+        ranks.append(rank)
+    return SeatingPlan(sections, door_groups, ranks)
+
+def door_zones(section, door, zones):
+    """
+    Rozdělí sloupce (řady sedadel) části na zones pásem podle vzdálenosti od dveří,
+    pásmo 0 je nejblíže dveřím. Vrací {sloupec: pásmo}.
+    """
+    cols = sorted({seat[1] for seat in section}, key=lambda col: (abs(col - door[1]), col))
+    zones = max(1, min(zones, len(cols)))
+    return {col: k * zones // len(cols) for k, col in enumerate(cols)}
+
+# Třída GroupOrder - strategie daná pořadím skupin sedadel (výstup optimizer.py)
+class GroupOrder:
+    """
+    Kabina se rozdělí na části podle dveří (door_sections), každá část na zones pásem
+    řad (door_zones) a každé pásmo na vrstvy podle seat_tiers (1 = ulička). Skupina je
+    (pásmo, vrstva), order[s] je pořadí skupin části s - jeden seznam platí pro všechny části.
+    Uvnitř skupiny se nastupuje náhodně. Instance je builder strategie: GroupOrder(...)(airplane)
+    vrací SeatingPlan, lze ji předat jako seating_strategy i do jiných procesů.
+    """
+    def __init__(self, order, zones, name='group_order'):
+        self.order = [[tuple(group) for group in section] for section in order]
+        self.zones = zones
+        self.name = name
+
+    def __call__(self, airplane):
+        sections, door_groups = door_sections(airplane.seat_positions, airplane.door_positions)
+        tiers = seat_tiers(airplane.seat_in_row)
+        ranks = []
+        for section_index, section in enumerate(sections):
+            door = airplane.door_positions[door_groups.index(section_index)]
+            zone_of = door_zones(section, door, self.zones)
+            order = self.order[section_index] if len(self.order) > 1 else self.order[0]
+            position = {group: k for k, group in enumerate(order)}
+            ranks.append([position.get((zone_of[seat[1]], tiers.get(seat[0], 1)), len(order)) for seat in section])
+        return SeatingPlan(sections, door_groups, ranks)
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def back_to_front(cls, zones, tiers, sections=1, name='group_order'):
+        # Výchozí pořadí jako optimal: nejvzdálenější pásmo první, v pásmu okno -> ulička
+        order = [(zone, tier) for zone in reversed(range(zones)) for tier in reversed(range(1, tiers + 1))]
+        return cls([order] * sections, zones, name)
+
+    def to_dict(self):
+        return {'name': self.name, 'zones': self.zones, 'order': [[list(group) for group in section] for section in self.order]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['order'], data['zones'], data.get('name', 'group_order'))
+
+def load_strategy(path, name=None):
+    """
+    Načte GroupOrder uložený optimizer.py (JSON) a zaregistruje ho pod name
+    (výchozí jméno uložené v souboru).
+    """
+    with open(path) as f:
+        strategy = GroupOrder.from_dict(json.load(f))
+    if name is not None:
+        strategy.name = name
+    register_strategy(strategy.name, strategy)
+    return strategy
@@ -0,0 +1,238 @@
+import itertools
+import json
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+
+from batch import BatchRunner, ENGINES, run_ensemble
+
+# Výchozí mřížka parametrů (jako run_simulation.py, navíc zavazadla)
+DEFAULT_GRID = {
+    'seat_rows': [5],
+    'seat_in_row': [[3, 3]],
+    'door_choice': ['both'],
+    'baggage_probability': [0.3, 0.6, 0.9],
+    'seating_strategy': ['random', 'door_wise', 'window_wise', 'optimal'],
+}
+
+# Klíč konfigurace - stejná konfigurace dává stejný klíč na všech strojích
+def config_key(config):
+    return json.dumps(config, sort_keys=True, separators=(',', ':'))
+
+def expand_grid(grid):
+    """
+    Vrací {klíč: konfigurace} pro všechny kombinace hodnot mřížky {parametr: [hodnoty]}.
+    """
+    names = sorted(grid)
+    configs = {}
+    for values in itertools.product(*(grid[name] for name in names)):
+        config = dict(zip(names, values))
+        configs[config_key(config)] = config
+    return configs
+
+def in_shard(key, replica, shard):
+    # shard = (index, počet) - rozdělení úloh podle stabilního hashe, nezávislé na pořadí mřížky
+    index, count = shard
+    return zlib.crc32(f"{key}#{replica}".encode()) % count == index
+
+def config_in_shard(key, shard):
+    # Engine ensemble počítá všechny repliky konfigurace najednou - dělí se celé konfigurace
+    index, count = shard
+    return zlib.crc32(key.encode()) % count == index
+
+def parse_shard(text):
+    index, count = (int(part) for part in text.split('/'))
+    if not 0 <= index < count:
+        raise ValueError(f"Chybný shard {text}, očekáváno i/n s 0 <= i < n")
+    return index, count
+
+# Třída ResultStore - výsledky běhů v lokální SQLite databázi
+class ResultStore:
+    """
+    Jeden řádek na (konfigurace, replika), zapisuje se hned po doběhnutí běhu,
+    takže přerušený sweep po restartu pokračuje jen chybějícími běhy.
+    Tiky usazení se ukládají jako int32 pole (BLOB).
+    Tabulka meta drží base_seed a engine - pokračování s jinými hodnotami by
+    míchalo nesrovnatelné výsledky, proto skončí chybou.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS results (
+                config_key TEXT NOT NULL,
+                replica INTEGER NOT NULL,
+                seed INTEGER NOT NULL,
+                ticks INTEGER NOT NULL,
+                seated_at BLOB,
+                wall_time REAL,
+                finished_at REAL,
+                PRIMARY KEY (config_key, replica)
+            );
+        """)
+
+    def check_meta(self, **values):
+        for name, value in values.items():
+            row = self.connection.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                self.connection.execute("INSERT INTO meta VALUES (?, ?)", (name, json.dumps(value)))
+            elif json.loads(row[0]) != value:
+                raise ValueError(f"{self.path} obsahuje výsledky s {name}={json.loads(row[0])}, ne {value}")
+        self.connection.commit()
+
+    def done(self):
+        return set(self.connection.execute("SELECT config_key, replica FROM results"))
+
+    def add(self, result):
+        seated_at = None if result.passenger_seated_at is None else np.asarray(result.passenger_seated_at, dtype=np.int32).tobytes()
+        self.connection.execute("INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                (result.key, result.replica, int(result.seed), int(result.ticks), seated_at,
+                                 result.wall_time, time.time()))
+        self.connection.commit()
+
+    def results(self):
+        """
+        Vrací {klíč konfigurace: [počet tiků pro repliku 0, 1, ...]} (jen uložené repliky).
+        """
+        results = {}
+        for key, ticks in self.connection.execute("SELECT config_key, ticks FROM results ORDER BY config_key, replica"):
+            results.setdefault(key, []).append(ticks)
+        return results
+
+    def seated_at(self, key, replica):
+        row = self.connection.execute("SELECT seated_at FROM results WHERE config_key = ? AND replica = ?",
+                                      (key, replica)).fetchone()
+        return None if row is None or row[0] is None else np.frombuffer(row[0], dtype=np.int32)
+
+    def merge(self, other_path):
+        """
+        Přidá výsledky z jiné databáze (např. jiného shardu). Vrací počet nových řádků.
+        """
+        other = ResultStore(other_path)
+        for name, value in other.connection.execute("SELECT name, value FROM meta"):
+            self.check_meta(**{name: json.loads(value)})
+        other.close()
+        before = self.count()
+        self.connection.execute("ATTACH DATABASE ? AS other", (other_path,))
+        self.connection.execute("INSERT OR IGNORE INTO results SELECT * FROM other.results")
+        self.connection.commit()
+        self.connection.execute("DETACH DATABASE other")
+        return self.count() - before
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+# Třída SweepRunner - BatchRunner, který vynechá hotové běhy a běhy jiných shardů
+class SweepRunner(BatchRunner):
+    def __init__(self, configs, store, shard=(0, 1), **kwargs):
+        super().__init__(configs, **kwargs)
+        self.store = store
+        self.shard = shard
+        self.finished = store.done()
+
+    def tasks(self):
+        for task in super().tasks():
+            key, replica = task[0], task[1]
+            if (key, replica) not in self.finished and in_shard(key, replica, self.shard):
+                yield task
+
+    def pending(self):
+        return sum(1 for _ in self.tasks())
+
+    def run(self, on_result=None):
+        def store_result(result):
+            self.store.add(result)
+            if on_result is not None:
+                on_result(result)
+        return super().run(on_result=store_result)
+
+def run_sweep(grid, store, num_runs=10, base_seed=0, engine='object', shard=(0, 1), workers=None,
+              chunk_size=1, max_ticks=None, on_result=None):
+    """
+    Spustí všechny chybějící běhy mřížky (v daném shardu) a uloží je do store.
+    Vrací počet nově spuštěných běhů.
+    """
+    store.check_meta(base_seed=base_seed, engine=engine)
+    configs = expand_grid(grid)
+    if engine == 'ensemble':
+        # Repliky jedné konfigurace běží najednou - shardy i pokračování jsou po celých konfiguracích
+        finished = store.done()
+        pending = {key: config for key, config in configs.items()
+                   if config_in_shard(key, shard) and any((key, replica) not in finished for replica in range(num_runs))}
+
+        def store_result(result):
+            if (result.key, result.replica) not in finished:
+                store.add(result)
+                if on_result is not None:
+                    on_result(result)
+        run_ensemble(pending, num_runs=num_runs, base_seed=base_seed, max_ticks=max_ticks, on_result=store_result)
+        return sum(1 for key in pending for replica in range(num_runs) if (key, replica) not in finished)
+
+    runner = SweepRunner(configs, store, shard=shard, num_runs=num_runs, workers=workers, base_seed=base_seed,
+                         engine=engine, chunk_size=chunk_size, max_ticks=max_ticks)
+    pending = runner.pending()
+    runner.run(on_result=on_result)
+    return pending
+
+def load_grid(path):
+    with open(path) as f:
+        return json.load(f)
+
+def print_summary(store):
+    results = store.results()
+    print(f"{'runs':>5} {'mean':>8} {'std':>7} {'p95':>7}  config")
+    for key, ticks in sorted(results.items(), key=lambda item: np.mean(item[1])):
+        print(f"{len(ticks):>5} {np.mean(ticks):>8.1f} {np.std(ticks):>7.1f} {np.percentile(ticks, 95):>7.1f}  {key}")
+
+if __name__ == "__main__":
+    import argparse  # ResultStore a run_sweep se importují i bez CLI
+    parser = argparse.ArgumentParser(description="Resumable parameter sweep with results stored in SQLite")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Run all missing (config, seed) runs of a grid')
+    run.add_argument('--db', type=str, default='sweep.db', help='SQLite file with results (created if missing)')
+    run.add_argument('--grid', type=str, default=None, help='JSON file {parameter: [values]} (default: built-in grid)')
+    run.add_argument('--num_runs', type=int, default=10, help='Runs (seeds) per configuration')
+    run.add_argument('--seed', type=int, default=0, help='Base seed from which every run derives its own seed')
+    run.add_argument('--engine', type=str, choices=sorted(ENGINES) + ['ensemble'], default='object',
+                     help='Simulation engine (vector = reference array engine, not faster for single runs; '
+                          'ensemble = all runs of a configuration in one batched array, the fast path)')
+    run.add_argument('--shard', type=str, default='0/1', help='Run only shard i of n (e.g. 0/3), for several machines')
+    run.add_argument('--workers', type=int, default=None)
+    run.add_argument('--chunk_size', type=int, default=1)
+    run.add_argument('--quiet', action='store_true', help='Do not print every finished run')
+
+    merge = commands.add_parser('merge', help='Merge shard databases into one')
+    merge.add_argument('output', type=str)
+    merge.add_argument('inputs', type=str, nargs='+')
+
+    summary = commands.add_parser('summary', help='Print mean/std/p95 ticks of every stored configuration')
+    summary.add_argument('db', type=str)
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        store = ResultStore(args.db)
+        grid = load_grid(args.grid) if args.grid else DEFAULT_GRID
+        report = None if args.quiet else (lambda r: print(f"{r.key} run {r.replica}: {r.ticks} ticks"))
+        started = run_sweep(grid, store, num_runs=args.num_runs, base_seed=args.seed, engine=args.engine,
+                            shard=parse_shard(args.shard), workers=args.workers, chunk_size=args.chunk_size,
+                            on_result=report)
+        print(f"Spuštěno {started} běhů, v {args.db} je celkem {store.count()} výsledků")
+        store.close()
+    elif args.command == 'merge':
+        store = ResultStore(args.output)
+        for path in args.inputs:
+            print(f"{path}: +{store.merge(path)}")
+        print(f"{args.output}: {store.count()} výsledků")
+        store.close()
+    else:
+        store = ResultStore(args.db)
+        print_summary(store)
+        store.close()
@@ -0,0 +1,43 @@
+import random
+
+import numpy as np
+
+from checkpoint import LatePassenger, continuations, take_checkpoint
+from model import Simulation
+
+def make_checkpoint(door_choice='both', seed=0, at_tick=30):
+    simulation = Simulation(seat_rows=10, seat_in_row=[3, 3], door_choice=door_choice, seed=seed)
+    while simulation.tick < at_tick and simulation.step():
+        pass
+    return take_checkpoint(simulation)
+
+def late_passengers(checkpoint, delay, count=3):
+    waiting = [seat for queue in checkpoint.state['seat_queues'] for seat in queue]
+    return lambda seed: [LatePassenger(seat, delay) for seat in random.Random(seed).sample(waiting, count)]
+
+def test_late_passenger_without_delay_changes_nothing():
+    checkpoint = make_checkpoint()
+    seeds = range(1, 21)
+    assert continuations(checkpoint, seeds, late_passengers(checkpoint, 0)) == continuations(checkpoint, seeds)
+
+def test_late_passenger_keeps_boarding_order():
+    checkpoint = make_checkpoint()
+    late = late_passengers(checkpoint, 10)(1)
+    baseline = checkpoint.fork(seed=1)
+    baseline.run_until_done()
+    disrupted = checkpoint.fork(seed=1, perturbations=late)
+    disrupted.run_until_done()
+    assert [p.seat_pos for p in disrupted.passengers] == [p.seat_pos for p in baseline.passengers]
+
+def test_late_passenger_never_finishes_sooner_on_average():
+    # Jedny dveře - se dvěma dveřmi posun spawnu mění, kterými dveřmi pasažéři nastoupí
+    for delay in (5, 30):
+        differences = []
+        for prefix_seed in range(3):
+            checkpoint = make_checkpoint(door_choice='left', seed=prefix_seed)
+            front = next(queue[-1] for queue in checkpoint.state['seat_queues'] if queue)
+            seeds = range(1, 21)
+            baseline = continuations(checkpoint, seeds)
+            disrupted = continuations(checkpoint, seeds, lambda seed: [LatePassenger(front, delay)])
+            differences.append(np.mean(disrupted) - np.mean(baseline))
+        assert np.mean(differences) >= 0
@@ -0,0 +1,571 @@
+import numpy as np
+
+from events import EventType
+from heatmap import LAYER_BLOCKED, LAYER_OCCUPANCY, LAYER_STORING, LAYER_SWAPPING
+from profiling import PHASE_APPLY, PHASE_CONFLICTS, PHASE_DECIDE, PHASE_OBSERVERS, PHASE_SPAWN, PHASE_SWAPPING
+from model import (DIRECTION_SHIFT, FLAG_BAGGAGE, STATE_NOT_SPAWNED, STATE_SEATED, STATE_SEATING,
+                   STATE_STORING, STATE_SWAPPING, STATE_WALKING, Simulation)
+from routing import DIRECTIONS, DIRECTION_BITS
+
+# Účely náhodných čísel - každý má vlastní proud v EnsembleSimulation
+DRAW_MOVE = 1
+DRAW_CONFLICT = 2
+DRAW_SEATING_DELAY = 3
+DRAW_BAGGAGE = 4
+DRAW_BAGGAGE_STEPS = 5
+DRAW_SWAPPING_SPEED = 6
+DRAW_SEAT_ORDER = 7
+
+# Vyhledávací tabulky pro 4bitové next-hop masky
+POPCOUNT = np.array([bin(mask).count('1') for mask in range(16)], dtype=np.int64)
+HIGHEST_BIT = np.array([max(mask.bit_length() - 1, 0) for mask in range(16)], dtype=np.int64)
+NTH_BIT = np.array([[([k for k in range(4) if mask >> k & 1] + [0] * 4)[n] for n in range(4)]
+                    for mask in range(16)], dtype=np.int64)
+
+# Třída VectorSimulation - stav pasažérů v paralelních NumPy polích (struct-of-arrays)
+class VectorSimulation(Simulation):
+    """
+    Referenční engine pro EnsembleSimulation se stejnými pravidly jako Simulation - každý tik běží
+    jako dávkové operace nad poli všech aktivních pasažérů: odpočty, next-hop
+    lookup v RoutingTable, detekce konfliktů a aplikace pohybů.
+
+    Pasažér i je prvek i ve všech polích, self.passengers zůstává prázdný.
+    Pozice jsou ploché indexy buněk (replika * počet buněk + řádek * počet sloupců + sloupec),
+    takže stejný kód obslouží i více replik najednou (EnsembleSimulation).
+    Náhodnost bere z vlastního numpy Generatoru se seedem simulace (seed=None -> odvozen z np.random).
+    Do EventLog posílá jen spawn, usazení a chyby - události jednotlivých kroků
+    by vyžadovaly smyčku přes pasažéry.
+
+    Jeden běh je referenční engine pro EnsembleSimulation, ne zrychlení: při ~100
+    aktivních pasažérech tik stojí hlavně režie desítek malých NumPy operací, takže
+    je srovnatelně rychlý nebo pomalejší než Simulation (50 řad 3-4-3: ~4.5k vs ~5.5k tiků/s).
+    Rychlá cesta pro mnoho běhů je EnsembleSimulation, kde se tatáž režie dělí mezi repliky.
+    """
+    def __init__(self, *args, seed=None, **kwargs):
+        super().__init__(*args, seed=seed, **kwargs)
+        self.rng = np.random.default_rng(self.seed)
+        self.allocate_state(replicas=1)
+        self.n_spawned = 0
+        self.n_seated = 0
+
+    def allocate_state(self, replicas):
+        rows, cols = self.matrix.shape
+        self.replicas = replicas
+        self.cols = cols
+        self.cells = rows * cols
+        self.offsets = np.array([dx * cols + dy for dx, dy in DIRECTIONS], dtype=np.int64)
+        self.bits = np.array(DIRECTION_BITS, dtype=np.uint8)
+        self.next_hops = self.routing.next_hops.reshape(len(self.routing.seat_positions), self.cells)
+
+        self.capacity = len(self.seat_positions)  # Pasažérů na repliku
+        size = replicas * self.capacity
+        self.active = np.zeros(0, dtype=np.int64)  # Spawnovaní a dosud nesedící pasažéři
+
+        # Pozice a cíle
+        self.replica = np.repeat(np.arange(replicas, dtype=np.int64), self.capacity)
+        self.pos = np.zeros(size, dtype=np.int64)
+        self.next_pos = np.zeros(size, dtype=np.int64)
+        self.seat = np.zeros(size, dtype=np.int64)
+        self.seat_row = np.zeros(size, dtype=np.int64)
+        self.seat_col = np.zeros(size, dtype=np.int64)
+        self.seat_index = np.zeros(size, dtype=np.int64)  # Řádek v RoutingTable
+        self.desired = np.full(size, -1, dtype=np.int64)  # -1 = žádný desired_move
+
+        # Příznaky
+        self.seated = np.zeros(size, dtype=bool)
+        self.has_baggage = np.zeros(size, dtype=bool)
+        self.baggage_stopped = np.zeros(size, dtype=bool)
+        self.seating_in_progress = np.zeros(size, dtype=bool)
+        self.swapping = np.zeros(size, dtype=bool)
+        self.is_blocked = np.zeros(size, dtype=bool)
+
+        # Odpočty
+        self.baggage_steps_remaining = np.zeros(size, dtype=np.int32)
+        self.seating_steps_remaining = np.zeros(size, dtype=np.int32)
+        self.swapping_speed = np.zeros(size, dtype=np.int32)
+        self.swapping_progress = np.zeros(size, dtype=np.int32)
+        self.seated_tick = np.full(size, -1, dtype=np.int64)
+
+        # Mřížky tvaru matice letadla (pro každou repliku)
+        self.occupancy = np.full(replicas * self.cells, -1, dtype=np.int64)  # id nesedícího pasažéra v buňce
+        self.claims = np.zeros(replicas * self.cells, dtype=np.int64)  # Pomocné mřížky pro resolve_conflicts
+        self.is_contested = np.zeros(replicas * self.cells, dtype=bool)
+        self.seated_grid = np.zeros(replicas * self.cells, dtype=bool)  # Obsazená sedadla (seat_status), ploše
+
+    # Náhodná čísla pro pasažéry ids - potomci mohou přepsat (vlastní proud pro každou repliku)
+    def random_uniform(self, ids, purpose):
+        return self.rng.random(len(ids))
+
+    def random_integers(self, ids, low, high, purpose):
+        return self.rng.integers(low, high, size=len(ids))
+
+    def add_passenger(self, i, door_cell, seat):
+        self.pos[i] = door_cell
+        self.seat[i] = self.replica[i] * self.cells + seat[0] * self.cols + seat[1]
+        self.seat_row[i] = seat[0]
+        self.seat_col[i] = seat[1]
+        self.seat_index[i] = self.routing.seat_index[seat]
+        self.occupancy[door_cell] = i
+
+    def spawn_passengers(self):
+        """
+        Spawnuje pasažéry na volných dveřích - atributy losuje po jednom prvku polí.
+        """
+        spawned_before = self.n_spawned
+        for door in self.spawn_attempts():
+            door_cell = door[0] * self.cols + door[1]
+            if self.occupancy[door_cell] >= 0:
+                continue
+            seat = self.assign_seat(door)
+            if seat is None:
+                continue
+            if seat not in self.routing.seat_index:
+                if self.events.enabled:
+                    self.events.emit(EventType.ROUTE_ERROR, pos=door, data=seat)
+                self.door_queues[door].append(seat)
+                self.seats_remaining += 1
+                continue
+
+            i = self.n_spawned
+            self.add_passenger(i, door_cell, seat)
+            self.swapping_speed[i] = self.rng.integers(1, 4)
+            self.has_baggage[i] = self.rng.random() < self.baggage_probability
+            if self.has_baggage[i]:
+                self.baggage_steps_remaining[i] = self.rng.integers(1, 4)
+            if self.events.enabled:
+                self.events.emit(EventType.SPAWN, i, door, seat)
+            self.n_spawned += 1
+            self.ped_id_counter += 1
+
+        if self.n_spawned > spawned_before:
+            self.active = np.concatenate([self.active, np.arange(spawned_before, self.n_spawned)])
+
+    def passenger_counts(self):
+        # V EnsembleSimulation součty přes všechny repliky
+        active = self.active
+        storing = self.has_baggage[active] & self.baggage_stopped[active]
+        swapping = self.swapping[active] & ~storing
+        return (int(np.sum(self.n_spawned)), int(np.sum(self.n_seated)),
+                int(np.count_nonzero(storing)), int(np.count_nonzero(swapping)))
+
+    def passenger_states(self, rows, cols, codes, replica=0):
+        """
+        Stejné kódy jako Passenger.state_code, dávkově pro pasažéry jedné repliky.
+        """
+        ids = replica * self.capacity + np.arange(self.capacity)
+        spawned = np.arange(self.capacity) < (self.n_spawned if np.ndim(self.n_spawned) == 0 else self.n_spawned[replica])
+        cell = self.pos[ids] - replica * self.cells
+        rows[:] = cell // self.cols
+        cols[:] = cell % self.cols
+
+        storing = self.has_baggage[ids] & self.baggage_stopped[ids]
+        swapping = self.swapping[ids]
+        state = np.select([self.seated[ids], storing, swapping, self.seating_in_progress[ids]],
+                          [STATE_SEATED, STATE_STORING, STATE_SWAPPING, STATE_SEATING], STATE_WALKING)
+        state |= np.where(self.has_baggage[ids] & (self.baggage_steps_remaining[ids] != 0), FLAG_BAGGAGE, 0)
+
+        # Směr výměny: rozdíl plochých indexů -> pořadí v DIRECTIONS (+1, 0 = žádný)
+        desired = self.desired[ids]
+        arrow = swapping & (desired >= 0)
+        direction = np.zeros(self.capacity, dtype=np.int64)
+        for k, offset in enumerate(self.offsets):
+            direction[arrow & (desired - self.pos[ids] == offset)] = k + 1
+        state |= direction << DIRECTION_SHIFT
+
+        codes[:] = np.where(spawned, state, STATE_NOT_SPAWNED)
+
+    def decide_moves(self, active):
+        """
+        Dávková verze Passenger.decide_move pro indexy active. Větve se vyhodnocují
+        ve stejném pořadí jako v decide_move, každý pasažér projde právě jednou.
+        Vrací indexy pasažérů, kteří chtějí jít na obsazenou buňku (blocked_passengers).
+        """
+        pos = self.pos[active]
+        same_col = (pos % self.cols) == self.seat_col[active]
+
+        # Zastavení a ukládání zavazadla
+        has_baggage = self.has_baggage[active]
+        baggage_stopped = self.baggage_stopped[active]
+        baggage_left = self.baggage_steps_remaining[active]
+        start_storing = has_baggage & ~baggage_stopped & same_col
+        storing = baggage_stopped & (baggage_left > 0)
+        self.baggage_stopped[active] = baggage_stopped | start_storing
+        self.baggage_steps_remaining[active] = baggage_left - storing
+        rest = ~(start_storing | storing)
+
+        # Usazování přes blokující sedadla
+        seating = rest & self.seating_in_progress[active]
+        seating_left = self.seating_steps_remaining[active] - seating
+        seating_done = seating & (seating_left == 0)
+        rest &= ~seating
+
+        check = rest & same_col
+        blocked_seat = check
+        if check.any():
+            # Počet sedících mezi uličkou a sedadlem - řad mezi nimi je nanejvýš šířka sekce
+            check_ids = active[check]
+            row = (pos[check] % self.cells) // self.cols
+            low = np.minimum(row, self.seat_row[check_ids])
+            between = np.maximum(row, self.seat_row[check_ids]) - low - 1
+            base = self.replica[check_ids] * self.cells + low * self.cols + self.seat_col[check_ids]
+            blocking_count = np.zeros(len(check_ids), dtype=np.int32)
+            for d in range(1, int(between.max(initial=0)) + 1):
+                # Kratší úseky čtou svou poslední buňku (maska je vynuluje) - index nepřeleze konec mřížky
+                cells = base + np.minimum(d, np.maximum(between, 0)) * self.cols
+                blocking_count += (self.seated_grid.take(cells) != 0) & (d <= between)
+            blocked_seat = check.copy()
+            blocked_seat[check] = blocking_count > 0
+            if blocked_seat.any():
+                delays = self.random_integers(active[blocked_seat], 3, 6, DRAW_SEATING_DELAY)
+                seating_left[blocked_seat] = blocking_count[blocking_count > 0] * delays
+            rest &= ~blocked_seat
+        self.seating_in_progress[active] = (self.seating_in_progress[active] & ~seating_done) | blocked_seat
+        self.seating_steps_remaining[active] = seating_left
+
+        # Odpočet výměny v uličce
+        swapping = rest & self.swapping[active]
+        swapping_left = self.swapping_progress[active] - swapping
+        swap_done = swapping & (swapping_left == 0)
+        self.swapping_progress[active] = swapping_left
+        rest &= ~swapping
+
+        next_pos = np.where(seating_done, self.seat[active], pos)
+        desired = self.desired[active]
+        next_pos = np.where(swap_done, desired, next_pos)
+        desired[swap_done] = -1
+        swapping_now = self.swapping[active] & ~swap_done
+
+        # Pohyb podle next-hop masky - stejné pořadí směrů a volba kandidátů jako decide_move
+        rows = np.flatnonzero(rest)
+        moving_ids = active[rows]
+        moving_pos = pos[rows]
+        masks = self.next_hops[self.seat_index[moving_ids], moving_pos % self.cells]
+
+        # Bitové masky přes 4 směry: obsazení sousedé, volní lepší sousedé, první volný
+        occupied_bits = np.packbits(self.occupancy.take(moving_pos[:, None] + self.offsets, mode='clip') >= 0,
+                                    axis=1, bitorder='little')[:, 0]
+        free_bits = masks & ~occupied_bits
+        first_free = free_bits & (0 - free_bits)  # Nejnižší nastavený bit
+        found = free_bits != 0
+
+        # desired_move = poslední obsazený lepší soused před prvním volným
+        blocked_bits = masks & occupied_bits & (first_free - 1)
+        desired[rows] = np.where(found, -1, np.where(blocked_bits != 0,
+                                                     moving_pos + self.offsets[HIGHEST_BIT[blocked_bits]],
+                                                     desired[rows]))
+
+        # Kandidáti = první volný a všichni lepší sousedé za ním; náhodná volba (random.choice)
+        candidate_bits = masks & ~(first_free - 1)
+        choice = (self.random_uniform(moving_ids, DRAW_MOVE) * POPCOUNT[candidate_bits]).astype(np.int64)
+        chosen = NTH_BIT[candidate_bits, choice]
+        next_pos[rows] = np.where(found, moving_pos + self.offsets[chosen], moving_pos)
+
+        self.desired[active] = desired
+        self.swapping[active] = swapping_now
+        self.next_pos[active] = next_pos
+        return moving_ids[~found & (masks != 0)]
+
+    def resolve_swapping(self, blocked):
+        """
+        Dva zablokovaní pasažéři, kteří chtějí jít jeden na místo druhého, se začnou vyměňovat.
+        """
+        if len(blocked) < 2:
+            return
+        self.is_blocked[blocked] = True
+
+        other = self.occupancy[self.desired[blocked]]
+        mutual = self.is_blocked[other] & (other >= 0)
+        mutual &= self.desired[other] == self.pos[blocked]
+        this_ids = blocked[mutual]
+        other_ids = other[mutual]
+        self.swapping[this_ids] = True
+        self.swapping_progress[this_ids] = np.maximum(self.swapping_speed[this_ids], self.swapping_speed[other_ids])
+
+        self.is_blocked[blocked] = False
+
+    def resolve_conflicts(self, movers):
+        """
+        Z pasažérů mířících do stejné buňky náhodně projde jeden, ostatní zůstanou stát.
+        Vrací indexy pasažérů, kteří zůstali stát.
+        """
+        if len(movers) < 2:
+            return movers[:0]
+        target = self.next_pos[movers]
+
+        # Většina cílů je jednoznačná - losuje se jen mezi pasažéry se sporným cílem
+        self.claims[target] = movers
+        contested = self.claims[target] != movers
+        if not contested.any():
+            return movers[:0]
+        self.is_contested[target[contested]] = True
+        involved = movers[self.is_contested[target]]
+        self.is_contested[target[contested]] = False
+
+        target = self.next_pos[involved]
+        order = np.lexsort((self.random_uniform(involved, DRAW_CONFLICT), target))
+        sorted_target = target[order]
+        losers = involved[order[1:][sorted_target[1:] == sorted_target[:-1]]]
+        self.next_pos[losers] = self.pos[losers]
+        return losers
+
+    def storing_ids(self, active):
+        # Pasažéři, kteří v tomto tiku stojí kvůli zavazadlu - před decide_moves, stejné větve
+        same_col = (self.pos[active] % self.cols) == self.seat_col[active]
+        storing = self.has_baggage[active] & np.where(self.baggage_stopped[active],
+                                                      self.baggage_steps_remaining[active] > 0, same_col)
+        return active[storing]
+
+    def record_congestion(self, active, storing, blocked, losers):
+        """
+        Dávková verze Simulation.record_congestion - buňky v rámci repliky, heatmapa sčítá přes repliky.
+        """
+        heatmap = self.heatmap
+        blocked = np.concatenate([blocked[~self.swapping[blocked]], losers])
+        heatmap.add_cells(LAYER_OCCUPANCY, self.pos[active] % self.cells)
+        heatmap.add_cells(LAYER_BLOCKED, self.pos[blocked] % self.cells)
+        heatmap.add_cells(LAYER_SWAPPING, self.pos[active[self.swapping[active]]] % self.cells)
+        heatmap.add_cells(LAYER_STORING, self.pos[storing] % self.cells)
+
+    def apply_moves(self, active):
+        next_pos = self.next_pos[active]
+        self.pos[active] = next_pos
+
+        arrived = active[next_pos == self.seat[active]]
+        if len(arrived):
+            self.seated[arrived] = True
+            self.seated_tick[arrived] = self.tick
+            self.seated_grid[self.seat[arrived]] = True
+            self.active = active[~self.seated[active]]
+        return arrived
+
+    def step(self):
+        if self.finished or self.stopped:
+            return False
+
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.begin_tick()
+
+        self.tick += 1
+        self.events.tick = self.tick
+
+        # Obsazenost buněk nesedícími pasažéry na začátku tiku
+        self.occupancy.fill(-1)
+        self.occupancy[self.pos[self.active]] = self.active
+
+        self.spawn_passengers()
+        if profiler is not None:
+            profiler.mark(PHASE_SPAWN)
+
+        active = self.active
+        heatmap = self.heatmap
+        if heatmap is not None:
+            storing = self.storing_ids(active)
+        blocked = self.decide_moves(active)
+        if profiler is not None:
+            profiler.mark(PHASE_DECIDE)
+        self.resolve_swapping(blocked)
+        if profiler is not None:
+            profiler.mark(PHASE_SWAPPING)
+
+        movers = active[self.next_pos[active] != self.pos[active]]
+        losers = self.resolve_conflicts(movers)
+        if profiler is not None:
+            profiler.mark(PHASE_CONFLICTS)
+            moved = int(np.count_nonzero(self.next_pos[movers] != self.pos[movers]))
+        if heatmap is not None:
+            self.record_congestion(active, storing, blocked, losers)
+        arrived = self.apply_moves(active)
+
+        if len(arrived):
+            for seat in zip(self.seat_row[arrived].tolist(), self.seat_col[arrived].tolist()):
+                self.seat_status[seat] = True
+            self.n_seated += len(arrived)
+            self.passenger_seated_at.extend([self.tick] * len(arrived))
+            if self.events.enabled:
+                for i, row, col in zip(arrived.tolist(), self.seat_row[arrived].tolist(), self.seat_col[arrived].tolist()):
+                    self.events.emit(EventType.SEATED, i, (row, col))
+
+        if not self.seats_remaining and self.n_seated == self.n_spawned:
+            self.finished = True
+            if self.events.enabled:
+                self.events.emit(EventType.ALL_SEATED)
+        if profiler is not None:
+            profiler.mark(PHASE_APPLY)
+
+        for observer in self.observers:
+            observer.on_tick(self)
+
+        if profiler is not None:
+            profiler.mark(PHASE_OBSERVERS)
+            profiler.end_tick(self.tick, moved,
+                              len(blocked), int(np.count_nonzero(self.swapping[self.active])))
+
+        return not (self.finished or self.stopped)
+
+# Míchací funkce splitmix64 - z čítače udělá pseudonáhodné 64bitové číslo
+def mix64(x):
+    x = np.asarray(x, dtype=np.uint64)
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xbf58476d1ce4e5b9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94d049bb133111eb)
+    return x ^ (x >> np.uint64(31))
+
+GOLDEN_GAMMA = np.uint64(0x9e3779b97f4a7c15)
+
+# Třída EnsembleSimulation - R nezávislých nástupů stejného letadla v jednom poli
+class EnsembleSimulation(VectorSimulation):
+    """
+    Posouvá R replik najednou: pasažérská pole mají navíc rozměr repliky
+    (zploštělý do indexu pasažéra i buňky), dokončené repliky se jen maskují.
+
+    Každá replika má vlastní náhodný proud - čísla jsou hash (klíč repliky, tik,
+    pasažér, účel), takže výsledek repliky nezávisí na R ani na ostatních replikách.
+    Atributy pasažérů a pořadí sedadel se losují hromadně při inicializaci.
+
+    run_until_done vrací počty tiků replik (R,) a tiky usazení (R, počet sedadel).
+    """
+    def __init__(self, replicas=1000, seat_rows=32, seat_in_row=[3, 3], door_choice='left',
+                 baggage_probability=0.6, seating_strategy='random', spawn_interval=1,
+                 seed=0, observers=None, distance_cache=None, layout=None, heatmap=None):
+        Simulation.__init__(self, seat_rows=seat_rows, seat_in_row=seat_in_row, door_choice=door_choice,
+                            baggage_probability=baggage_probability, seating_strategy=seating_strategy,
+                            spawn_interval=spawn_interval, observers=observers, distance_cache=distance_cache,
+                            layout=layout, seed=seed, heatmap=heatmap)
+        self.allocate_state(replicas)
+        self.replica_keys = mix64(np.full(replicas, seed, dtype=np.uint64) * GOLDEN_GAMMA + np.arange(1, replicas + 1, dtype=np.uint64))
+
+        # Pasažér slot i repliky r má index r * capacity + i
+        self.n_spawned = np.zeros(replicas, dtype=np.int64)
+        self.n_seated = np.zeros(replicas, dtype=np.int64)
+        self.replica_finished = np.zeros(replicas, dtype=bool)
+        self.replica_ticks = np.full(replicas, -1, dtype=np.int64)
+
+        # Hromadné losování atributů pasažérů
+        everyone = np.arange(replicas * self.capacity)
+        self.has_baggage[:] = self.random_uniform(everyone, DRAW_BAGGAGE) < baggage_probability
+        self.baggage_steps_remaining[:] = np.where(self.has_baggage,
+                                                   self.random_integers(everyone, 1, 4, DRAW_BAGGAGE_STEPS), 0)
+        self.swapping_speed[:] = self.random_integers(everyone, 1, 4, DRAW_SWAPPING_SPEED)
+
+        self.seat_table = np.array(self.routing.seat_positions, dtype=np.int64).reshape(-1, 2)
+        self.build_replica_queues()
+
+    def random_uniform(self, ids, purpose):
+        ids = np.asarray(ids, dtype=np.int64)
+        counter = (np.uint64(self.tick) << np.uint64(40)) ^ (ids % self.capacity).astype(np.uint64) ^ (np.uint64(purpose) << np.uint64(56))
+        bits = mix64(self.replica_keys[ids // self.capacity] ^ mix64(counter))
+        return (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+    def random_integers(self, ids, low, high, purpose):
+        return low + (self.random_uniform(ids, purpose) * (high - low)).astype(np.int64)
+
+    def build_replica_queues(self):
+        """
+        Předpočítá pořadí sedadel pro každou repliku ze stejného plánu strategie jako
+        build_seat_queues: klíč sedadla je pořadí ve strategii + náhodné číslo z [0, 1).
+        queues má tvar (replika, fronta, pozice), door_queue mapuje dveře na frontu.
+        """
+        plan = self.seating_plan
+        groups = plan.groups
+        self.door_queue = list(plan.door_groups)
+
+        # Fronty drží indexy sedadel v RoutingTable
+        length = max(len(group) for group in groups)
+        self.queue_lengths = np.array([len(group) for group in groups], dtype=np.int64)
+        self.queues = np.zeros((self.replicas, len(groups), length), dtype=np.int64)
+        self.queue_pointer = np.zeros((self.replicas, len(groups)), dtype=np.int64)
+
+        replica_ids = np.arange(self.replicas)[:, None] * self.capacity
+        for q, (group, ranks) in enumerate(zip(groups, plan.ranks)):
+            group_index = np.array([self.routing.seat_index[seat] for seat in group], dtype=np.int64)
+            keys = self.random_uniform((replica_ids + np.arange(len(group))[None, :]).ravel(), DRAW_SEAT_ORDER + 8 * q)
+            keys = keys.reshape(self.replicas, len(group)) + np.array(ranks, dtype=np.float64)[None, :]
+            order = np.argsort(keys, axis=1)
+            self.queues[:, q, :len(group)] = group_index[order]
+
+    def spawn_passengers(self):
+        spawned = []
+        door_queue = dict(zip(self.door_positions, self.door_queue))
+        for door in self.spawn_attempts():
+            q = door_queue[door]
+            door_cell = door[0] * self.cols + door[1]
+            replicas = np.flatnonzero(~self.replica_finished & (self.queue_pointer[:, q] < self.queue_lengths[q]))
+            replicas = replicas[self.occupancy[replicas * self.cells + door_cell] < 0]
+            if len(replicas) == 0:
+                continue
+
+            seat_index = self.queues[replicas, q, self.queue_pointer[replicas, q]]
+            seats = self.seat_table[seat_index]
+            ids = replicas * self.capacity + self.n_spawned[replicas]
+            self.pos[ids] = replicas * self.cells + door_cell
+            self.seat_row[ids] = seats[:, 0]
+            self.seat_col[ids] = seats[:, 1]
+            self.seat[ids] = replicas * self.cells + seats[:, 0] * self.cols + seats[:, 1]
+            self.seat_index[ids] = seat_index
+            self.occupancy[self.pos[ids]] = ids
+
+            self.queue_pointer[replicas, q] += 1
+            self.n_spawned[replicas] += 1
+            spawned.append(ids)
+
+        if spawned:
+            self.active = np.concatenate([self.active] + spawned)
+
+    def step(self):
+        if self.finished or self.stopped:
+            return False
+
+        self.tick += 1
+
+        self.occupancy.fill(-1)
+        self.occupancy[self.pos[self.active]] = self.active
+
+        self.spawn_passengers()
+
+        active = self.active
+        heatmap = self.heatmap
+        if heatmap is not None:
+            storing = self.storing_ids(active)
+        blocked = self.decide_moves(active)
+        self.resolve_swapping(blocked)
+
+        movers = active[self.next_pos[active] != self.pos[active]]
+        losers = self.resolve_conflicts(movers)
+        if heatmap is not None:
+            self.record_congestion(active, storing, blocked, losers)
+        arrived = self.apply_moves(active)
+
+        if len(arrived):
+            self.n_seated += np.bincount(self.replica[arrived], minlength=self.replicas)
+            done = (~self.replica_finished & (self.n_seated == self.n_spawned)
+                    & np.all(self.queue_pointer >= self.queue_lengths, axis=1))
+            self.replica_finished |= done
+            self.replica_ticks[done] = self.tick
+            self.finished = bool(self.replica_finished.all())
+
+        for observer in self.observers:
+            observer.on_tick(self)
+
+        return not (self.finished or self.stopped)
+
+    def run_until_done(self, max_ticks=None):
+        if self.heatmap is not None:
+            self.heatmap.begin_run(self)
+        for observer in self.observers:
+            observer.on_start(self)
+
+        while self.step():
+            if max_ticks is not None and self.tick >= max_ticks:
+                break
+
+        for observer in self.observers:
+            observer.on_finish(self)
+
+        # Tiky usazení seřazené v rámci repliky, neusazení (do max_ticks) jsou na konci jako -1
+        never = np.iinfo(np.int64).max
+        seated_at = self.seated_tick.reshape(self.replicas, self.capacity)
+        seated_at = np.sort(np.where(seated_at < 0, never, seated_at), axis=1)
+        seated_at[seated_at == never] = -1
+        return self.replica_ticks, seated_at
@@ -0,0 +1,385 @@
+import argparse
+
+import numpy as np
+import pygame
+
+from heatmap import LAYERS, load_heatmaps
+from model import (DIRECTION_SHIFT, FLAG_BAGGAGE, STATE_MASK, STATE_NOT_SPAWNED, STATE_SEATED, STATE_SEATING,
+                   STATE_STORING, STATE_SWAPPING, SimulationObserver)
+from profiling import PHASE_DRAW, PHASE_EVENTS
+from recording import Trace
+from routing import DIRECTIONS
+
+# Třída SimulationView - vizualizace simulace pomocí Pygame
+class SimulationView(SimulationObserver):
+    """
+    Volitelný pozorovatel simulace. Po každém render_every-tém tiku vykreslí letadlo
+    a pasažéry a drží tempo ticks_per_second (0 = bez omezení).
+
+    Kabina se vykreslí jednou do cache (background), v každém snímku se pak přes ni
+    překreslí jen buňky, kde se pasažér pohnul nebo změnil stav, a na obrazovku
+    se pošlou jen tyto obdélníky (dirty rects).
+
+    overlay = matice tvaru kabiny (např. vrstva CongestionHeatmap), buňky se podbarví
+    červeně podle hodnoty - je součástí pozadí, snímky tedy nezpomalí.
+    """
+    def __init__(self, simulation, ticks_per_second=None, screen_width=1200, bar_height=100, render_every=1,
+                 overlay=None):
+        self.simulation = simulation
+        self.ticks_per_second = simulation.ticks_per_second if ticks_per_second is None else ticks_per_second
+        self.render_every = render_every
+        self.setup_window(simulation.matrix, screen_width, bar_height, overlay)
+
+        # Pozice a kódy stavu pasažérů (Simulation.passenger_states), index = ped_id
+        capacity = len(simulation.seat_positions)
+        self.rows = np.zeros(capacity, dtype=np.int64)
+        self.cols = np.zeros(capacity, dtype=np.int64)
+        self.codes = np.zeros(capacity, dtype=np.int64)
+
+    def setup_window(self, matrix, screen_width, bar_height, overlay=None):
+        self.matrix = matrix
+        self.bar_height = bar_height
+        self.overlay = None if overlay is None else np.asarray(overlay, dtype=float)
+        if self.overlay is not None and self.overlay.shape != matrix.shape:
+            raise ValueError(f"Overlay má tvar {self.overlay.shape}, kabina {matrix.shape}")
+
+        # Inicializace Pygame
+        pygame.init()
+
+        # Výpočet velikosti buňky na základě šířky okna a počtu sloupců
+        self.cell_size = screen_width // self.matrix.shape[1]
+
+        # Výpočet výšky gridu
+        grid_height = self.matrix.shape[0] * self.cell_size
+
+        # Výpočet celkové výšky okna (grid + bar)
+        self.width = self.matrix.shape[1] * self.cell_size
+        self.height = grid_height + bar_height
+
+        self.screen = pygame.display.set_mode((self.width, self.height))
+        pygame.display.set_caption("Airplane Matrix with Passengers")
+
+        # Barvy
+        self.colors = {
+            0: (255, 255, 255),  # Bílá (volné místo)
+            np.inf: (0, 0, 0),    # Černá (zeď)
+            -1: (0, 0, 255),     # Modrá (dveře)
+            -3: (192, 192, 192), # Šedá (sedadla)
+        }
+
+        # Barvy pro pasažéry
+        self.passenger_color = (255, 165, 0)  # Oranžová
+        self.seated_color = (0, 255, 0)      # Zelená
+        self.storing_color = (0, 255, 255)   # Azurová (pro ukládání zavazadel)
+        self.seating_color = (255, 0, 0)  # Usazující se
+        self.swapping_color = (255, 100, 200)  # Switching protijdouci
+        self.state_colors = {
+            STATE_SEATED: self.seated_color,
+            STATE_STORING: self.storing_color,
+            STATE_SWAPPING: self.swapping_color,
+            STATE_SEATING: self.seating_color,
+        }
+
+        # Inicializace fontů
+        pygame.font.init()
+        self.font = pygame.font.SysFont('Arial', 20)  # Nastavení fontu a velikosti
+
+        self.clock = pygame.time.Clock()
+
+        # Statické pozadí kabiny a tvary šipek výměny se počítají jen jednou
+        self.background = self.render_background()
+        self.arrow_shapes = [None] + [self.arrow_shape(dx, dy, min(10, self.cell_size // 2)) for dx, dy in DIRECTIONS]
+        self.cell_offsets = np.array([0] + [dx * self.matrix.shape[1] + dy for dx, dy in DIRECTIONS], dtype=np.int64)
+
+        # Naposledy vykreslené buňky pasažérů (vlastní buňka, buňka šipky) a jejich kódy
+        self.drawn_cells = None
+        self.drawn_codes = None
+
+    def render_background(self):
+        background = pygame.Surface((self.width, self.height - self.bar_height))
+        # Intenzita overlay 0..1 vůči nejvytíženější buňce
+        heat = None
+        if self.overlay is not None and self.overlay.max() > 0:
+            heat = self.overlay / self.overlay.max()
+        for i in range(self.matrix.shape[0]):
+            for j in range(self.matrix.shape[1]):
+                value = self.matrix[i, j]
+                color = self.colors.get(value, (255, 0, 0))  # Defaultně červená pro neznámé hodnoty
+                if heat is not None and heat[i, j] > 0:
+                    alpha = 0.2 + 0.7 * heat[i, j]
+                    color = tuple(int((1 - alpha) * c + alpha * h) for c, h in zip(color, (220, 0, 0)))
+                pygame.draw.rect(background, color, (j * self.cell_size, i * self.cell_size, self.cell_size, self.cell_size))
+                pygame.draw.rect(background, (200, 200, 200), (j * self.cell_size, i * self.cell_size, self.cell_size, self.cell_size), 1)
+        return background
+
+    # Čára a dvě hrotové špičky mezi středem buňky a sousední buňkou (relativně ke středu)
+    def arrow_shape(self, dx, dy, arrow_length=10):
+        end = (dy * self.cell_size, dx * self.cell_size)
+        return end, self.arrowhead((0, 0), end, arrow_length), self.arrowhead(end, (0, 0), arrow_length)
+
+    def arrowhead(self, start, end, length=10):
+        angle = np.arctan2(end[1] - start[1], end[0] - start[0])
+        point1 = (
+            end[0] - length * np.cos(angle - np.pi / 6),
+            end[1] - length * np.sin(angle - np.pi / 6)
+        )
+        point2 = (
+            end[0] - length * np.cos(angle + np.pi / 6),
+            end[1] - length * np.sin(angle + np.pi / 6)
+        )
+        return [end, point1, point2]
+
+    def on_tick(self, simulation):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                simulation.stop()
+        profiler = simulation.profiler
+        if profiler is not None:
+            profiler.mark(PHASE_EVENTS)
+
+        if simulation.tick % self.render_every and not simulation.finished:
+            return
+
+        # Vykreslení
+        simulation.passenger_states(self.rows, self.cols, self.codes)
+        self.draw_frame(simulation.tick, self.rows, self.cols, self.codes)
+        if profiler is not None:
+            profiler.mark(PHASE_DRAW)
+
+    def draw_frame(self, tick, rows, cols, codes):
+        dirty_rects = self.draw_grid(rows, cols, codes)
+        dirty_rects.append(self.draw_bar(tick, codes))
+        pygame.display.update(dirty_rects)
+
+        # Časování vizualizace (jeden snímek = render_every tiků)
+        if self.ticks_per_second:
+            self.clock.tick(self.ticks_per_second / self.render_every)
+
+    def play(self, snapshots):
+        """
+        Vykreslí proud TickSnapshot s pozicemi (simulation.iter_ticks(positions=True))
+        místo volání jako pozorovatel. Zavření okna proud ukončí.
+        """
+        for snapshot in snapshots:
+            if any(event.type == pygame.QUIT for event in pygame.event.get()):
+                break
+            if snapshot.tick % self.render_every == 0 or snapshot.finished:
+                self.draw_frame(snapshot.tick, snapshot.rows, snapshot.cols, snapshot.codes)
+        snapshots.close()
+        pygame.quit()
+
+    def on_finish(self, simulation):
+        pygame.quit()
+
+    def cell_rect(self, cell):
+        row, col = divmod(int(cell), self.matrix.shape[1])
+        return pygame.Rect(col * self.cell_size, row * self.cell_size + self.bar_height, self.cell_size, self.cell_size)
+
+    def draw_grid(self, rows, cols, codes):
+        """
+        Překreslí buňky, které se od minulého snímku změnily, a vrátí jejich obdélníky.
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        spawned = codes != STATE_NOT_SPAWNED
+
+        # Buňky, které pasažér zabírá: vlastní a u výměny i sousední, kam míří šipka (-1 = žádná)
+        own = np.asarray(rows, dtype=np.int64) * self.matrix.shape[1] + cols
+        direction = codes >> DIRECTION_SHIFT
+        cells = np.stack([np.where(spawned, own, -1),
+                          np.where(spawned & (direction > 0), own + self.cell_offsets[direction], -1)], axis=1)
+
+        if self.drawn_cells is None:
+            # První snímek - celé pozadí
+            self.screen.blit(self.background, (0, self.bar_height))
+            redraw = spawned
+            dirty_rects = [pygame.Rect(0, self.bar_height, self.width, self.height - self.bar_height)]
+        else:
+            changed = (cells != self.drawn_cells).any(axis=1) | (codes != self.drawn_codes)
+            dirty = np.zeros(self.matrix.size + 1, dtype=bool)  # Poslední prvek zachytí -1
+            dirty[self.drawn_cells[changed].ravel()] = True
+            dirty[cells[changed].ravel()] = True
+            dirty[-1] = False
+
+            dirty_cells = np.flatnonzero(dirty)
+            dirty_rects = [self.cell_rect(cell) for cell in dirty_cells]
+            for rect in dirty_rects:
+                self.screen.blit(self.background, rect, rect.move(0, -self.bar_height))
+
+            # Znovu se kreslí všichni, jejichž buňky zasahují do obnoveného pozadí
+            redraw = spawned & dirty[cells].any(axis=1)
+
+        self.drawn_cells = cells
+        self.drawn_codes = codes.copy()
+
+        # Vykreslení pasažérů (kódy stavu viz Passenger.state_code)
+        ids = np.flatnonzero(redraw)
+        for x, y, code in zip(np.asarray(rows)[ids].tolist(), np.asarray(cols)[ids].tolist(), codes[ids].tolist()):
+            self.draw_passenger(x, y, code)
+        return dirty_rects
+
+    def draw_passenger(self, x, y, code):
+        color = self.state_colors.get(code & STATE_MASK, self.passenger_color)
+
+        center_x = int(y * self.cell_size + self.cell_size / 2)
+        center_y = int(x * self.cell_size + self.cell_size / 2) + self.bar_height  # Offset for the bar
+
+        pygame.draw.circle(
+            self.screen,
+            color,
+            (center_x, center_y),
+            self.cell_size // 3
+        )
+        if code & FLAG_BAGGAGE:
+            baggage_size = self.cell_size // 4
+            square_x = center_x - baggage_size // 2
+            square_y = center_y + self.cell_size // 4
+            pygame.draw.rect(
+                self.screen,
+                (0, 0, 155),  # Baggage color
+                (square_x, square_y, baggage_size, baggage_size)
+            )
+
+        direction = code >> DIRECTION_SHIFT
+        if direction:
+            end, head, tail = self.arrow_shapes[direction]
+            arrow_width = 2
+            arrow_color = (0, 0, 0)
+            pygame.draw.line(
+                self.screen,
+                arrow_color,
+                (center_x, center_y),
+                (center_x + end[0], center_y + end[1]),
+                arrow_width
+            )
+            for polygon in (head, tail):
+                pygame.draw.polygon(self.screen, arrow_color, [(center_x + px, center_y + py) for px, py in polygon])
+
+    def draw_bar(self, tick, codes):
+        bar = pygame.Rect(0, 0, self.width, self.bar_height)
+        self.screen.fill((0, 0, 0), bar)
+
+        # Výpočty pro text
+        total_seats = len(codes)
+        total_passengers = len(codes)
+        yet_to_spawn = int(np.count_nonzero(codes == STATE_NOT_SPAWNED))
+        seated = int(np.count_nonzero((codes & STATE_MASK) == STATE_SEATED))
+        in_simulation_not_seated = total_passengers - yet_to_spawn - seated
+
+        # Renderování textu
+        text_total = self.font.render(f"Total Passengers: {total_passengers} | Total Seats: {total_seats} | Tick: {tick}", True, (255, 255, 255))
+        text_yet_to_spawn = self.font.render(f"Passengers yet to spawn: {yet_to_spawn}", True, (255, 255, 255))
+        text_in_simulation = self.font.render(f"Passengers in simulation not seated: {in_simulation_not_seated}", True, (255, 255, 255))
+
+        # Blitování textu na obrazovku (v horním baru)
+        self.screen.blit(text_total, (10, 10))  # Horní levý roh
+        self.screen.blit(text_yet_to_spawn, (10, 40))  # Pod total
+        self.screen.blit(text_in_simulation, (10, 70))  # Pod yet_to_spawn
+        return bar
+
+# Třída TraceReplay - přehrávání záznamu (recording.Trace) bez opakování simulace
+class TraceReplay(SimulationView):
+    """
+    Přehrává uložený záznam libovolnou rychlostí.
+    Ovládání: mezerník = pauza, šipky vlevo/vpravo = o tik zpět/vpřed,
+    šipky nahoru/dolů = rychlost x2 / /2, Home/End = začátek/konec,
+    kliknutí nebo tažení myší v pruhu pod textem = přeskočení na daný tik.
+    """
+    def __init__(self, trace, ticks_per_second=10, screen_width=1200, bar_height=150, fps=30, overlay=None):
+        self.trace = trace
+        self.ticks_per_second = ticks_per_second
+        self.fps = fps
+        self.setup_window(trace.matrix, screen_width, bar_height, overlay)
+        self.first_tick = int(trace.ticks[0])
+        self.last_tick = int(trace.ticks[-1])
+        self.position = float(self.first_tick)  # Aktuální tik (necelý kvůli pomalému přehrávání)
+        self.playing = True
+        self.scrubbing = False
+        self.slider = pygame.Rect(10, bar_height - 20, self.width - 20, 10)
+
+    def seek(self, tick):
+        self.position = float(min(max(tick, self.first_tick), self.last_tick))
+
+    def seek_to_mouse(self, mouse_x):
+        fraction = (mouse_x - self.slider.x) / self.slider.width
+        self.seek(self.first_tick + fraction * (self.last_tick - self.first_tick))
+
+    def handle_events(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    self.playing = not self.playing
+                elif event.key == pygame.K_RIGHT:
+                    self.seek(int(self.position) + 1)
+                elif event.key == pygame.K_LEFT:
+                    self.seek(int(self.position) - 1)
+                elif event.key == pygame.K_UP:
+                    self.ticks_per_second *= 2
+                elif event.key == pygame.K_DOWN:
+                    self.ticks_per_second /= 2
+                elif event.key == pygame.K_HOME:
+                    self.seek(self.first_tick)
+                elif event.key == pygame.K_END:
+                    self.seek(self.last_tick)
+            elif event.type == pygame.MOUSEBUTTONDOWN and self.slider.inflate(0, 10).collidepoint(event.pos):
+                self.scrubbing = True
+                self.seek_to_mouse(event.pos[0])
+            elif event.type == pygame.MOUSEBUTTONUP:
+                self.scrubbing = False
+            elif event.type == pygame.MOUSEMOTION and self.scrubbing:
+                self.seek_to_mouse(event.pos[0])
+        return True
+
+    def run(self, start_tick=None):
+        if start_tick is not None:
+            self.seek(start_tick)
+
+        while self.handle_events():
+            if self.playing and not self.scrubbing:
+                self.seek(self.position + self.ticks_per_second / self.fps)
+
+            index = self.trace.index_of_tick(int(self.position))
+            rows, cols, codes = self.trace.frame(index)
+            codes = codes.astype(np.int64)
+
+            dirty_rects = self.draw_grid(rows, cols, codes)
+            dirty_rects.append(self.draw_bar(int(self.trace.ticks[index]), codes))
+            self.draw_controls()
+            pygame.display.update(dirty_rects)
+            self.clock.tick(self.fps)
+
+        pygame.quit()
+
+    def draw_controls(self):
+        state = "Playing" if self.playing else "Paused"
+        text = self.font.render(f"{state} | Speed: {self.ticks_per_second:g} ticks/s | Last tick: {self.last_tick}",
+                                True, (255, 255, 255))
+        self.screen.blit(text, (10, 100))
+
+        # Pruh s pozicí v záznamu
+        pygame.draw.rect(self.screen, (80, 80, 80), self.slider)
+        span = max(self.last_tick - self.first_tick, 1)
+        done = int(self.slider.width * (self.position - self.first_tick) / span)
+        pygame.draw.rect(self.screen, (255, 165, 0), (self.slider.x, self.slider.y, done, self.slider.height))
+
+# Přehrání uloženého záznamu: python view.py run.trace
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded boarding trace")
+    parser.add_argument('trace', type=str, help='Trace file written by TraceRecorder (python model.py --trace run.trace)')
+    parser.add_argument('--ticks_per_second', type=float, default=None,
+                        help='Replay speed (default: speed stored in the trace)')
+    parser.add_argument('--start_tick', type=int, default=None, help='Tick at which the replay starts')
+    parser.add_argument('--heatmap', type=str, default=None,
+                        help='Tint cells by a congestion heatmap (JSON from run_simulation.py --heatmap or model.py --heatmap)')
+    parser.add_argument('--layer', type=str, choices=LAYERS, default='blocked', help='Heatmap layer shown as overlay')
+    parser.add_argument('--key', type=str, default=None, help='Heatmap of this configuration (default: the first one)')
+    args = parser.parse_args()
+
+    trace = Trace(args.trace)
+    ticks_per_second = args.ticks_per_second or trace.meta.get('ticks_per_second') or 10
+    overlay = None
+    if args.heatmap:
+        heatmaps = load_heatmaps(args.heatmap)
+        overlay = heatmaps[args.key or next(iter(heatmaps))].per_run(args.layer)
+    TraceReplay(trace, ticks_per_second, overlay=overlay).run(args.start_tick)